@@ -1,7 +1,12 @@
 # app.py - Flask API wrapper for Legal RAG Pipeline (Production Version)
 
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import os
+import atexit
 import logging
+import threading
 from datetime import datetime
 from typing import List
 from flask import Flask, request, jsonify, send_file
@@ -12,8 +17,10 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Import your main pipeline
+# Import your main pipeline (cheap: models and heavy libraries are loaded on first use)
+from config import Config
 from main_pipeline import LegalRAGPipeline
+from services import get_services
 
 # ------------------------
 # Logging
@@ -34,16 +41,49 @@ app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max
 # ------------------------
 pipeline = None
 
+# Where startup time went; logged once warm-up finishes and returned by /status
+startup_report = {
+    'app_import_seconds': None,  # Importing this module, until requests can be served
+    'warm_up': 'pending',  # pending, running, done, failed or disabled
+    'warm_up_seconds': None,
+    'service_build_seconds': {},
+    'model_init_seconds': {}
+}
+
 def init_pipeline():
     global pipeline
     try:
-        pipeline = LegalRAGPipeline()
+        # Cheap: the shared services are built by warm_up() or on first use
+        services = get_services()
+        atexit.register(services.shutdown)
+        
+        pipeline = LegalRAGPipeline(services)
         logger.info("Pipeline initialized successfully")
         return True
     except Exception as e:
         logger.error(f"Failed to initialize pipeline: {e}")
         return False
 
+def warm_up():
+    """Build the shared services, and with them the models, so the first request does not pay for it"""
+    from models import get_model_manager
+    
+    services = pipeline.services
+    started = time.perf_counter()
+    startup_report['warm_up'] = 'running'
+    
+    try:
+        services.start(Config.STARTUP_SETTINGS['warm_up_services'])
+        startup_report['warm_up'] = 'done'
+    except Exception as e:
+        startup_report['warm_up'] = 'failed'
+        logger.error(f"Warm-up failed, services will be built on first use: {e}")
+    
+    startup_report['warm_up_seconds'] = round(time.perf_counter() - started, 3)
+    startup_report['service_build_seconds'] = services.get_stats()['build_seconds']
+    startup_report['model_init_seconds'] = dict(get_model_manager().init_seconds)
+    logger.info(f"Startup report: {startup_report}")
+
 if not init_pipeline():
     logger.error("Pipeline failed to initialize!")
 
@@ -86,6 +126,7 @@ def health():
     return jsonify({
         "status": "healthy",
         "pipeline_ready": pipeline is not None and pipeline.pipeline_ready,
+        "warm_up": startup_report['warm_up'],
         "timestamp": datetime.now().isoformat()
     })
 
@@ -94,7 +135,8 @@ def status():
     try:
         if not pipeline:
             return handle_error("Pipeline not initialized", 503)
-        return jsonify({"success": True, "status": pipeline.get_enhanced_pipeline_status(), "timestamp": datetime.now().isoformat()})
+        return jsonify({"success": True, "status": pipeline.get_enhanced_pipeline_status(), "startup": startup_report,
+                        "timestamp": datetime.now().isoformat()})
     except Exception as e:
         return handle_error(str(e))
 
@@ -151,7 +193,8 @@ def process_documents():
             return handle_error(f"Files not found: {missing_files}", 404)
 
         store_prefix = data.get("store_prefix")
-        result = pipeline.process_new_documents_with_categories(file_paths, store_prefix)
+        mode = data.get("mode")  # Optional: 'batch', 'streaming' or 'pipelined'
+        result = pipeline.process_new_documents_with_categories(file_paths, store_prefix, mode)
         return jsonify({"success": True, "result": result, "timestamp": datetime.now().isoformat()})
     except Exception as e:
         return handle_error(str(e))
@@ -184,4 +227,13 @@ def query_documents():
 # Vercel handles the WSGI function automatically. No need for app.run()
 
 # This makes the app compatible with WSGI servers
-application = app
\ No newline at end of file
+application = app
+
+startup_report['app_import_seconds'] = round(time.perf_counter() - _IMPORT_STARTED, 3)
+logger.info(f"App ready to serve in {startup_report['app_import_seconds']:.3f}s")
+
+# Started once the routes exist, so /health is served while models load
+if pipeline is not None and Config.STARTUP_SETTINGS['warm_up_in_background']:
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+elif pipeline is not None:
+    startup_report['warm_up'] = 'disabled'
@@ -0,0 +1,269 @@
+# categorization_store.py - Persistent Categorization Cache on SQLite (WAL mode)
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CategorizationStore:
+    """
+    Persistent categorization cache keyed by content hash
+    
+    Backed by SQLite in WAL mode: an insert is a single-row upsert instead of a
+    rewrite of the whole cache, readers do not block the writer, and several
+    processes (e.g. gunicorn workers) can share one file. Supports the dict
+    operations the categorizer uses ('in', [], []=, len, clear), and with
+    max_entries evicts the least recently used entries. The excerpt each result
+    was derived from can be kept as well, as training data for the local classifier.
+    """
+    
+    def __init__(self, db_path: str, max_entries: Optional[int] = None, legacy_json_path: str = None):
+        """
+        Args:
+            db_path: SQLite database file, created if missing
+            max_entries: Keep at most about this many entries (checked every max_entries // 10 inserts)
+            legacy_json_path: JSON cache file imported once into an empty store
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._eviction_interval = max(1, max_entries // 10) if max_entries else None
+        self._inserts_since_eviction = 0
+        
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        
+        self._create_schema()
+        if legacy_json_path:
+            self.migrate_json(legacy_json_path)
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        
+        if connection is None:
+            # Autocommit: each statement is its own transaction unless BEGIN is issued
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        
+        return connection
+    
+    def _create_schema(self):
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS categorizations (
+                content_hash TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS idx_categorizations_last_used "
+                           "ON categorizations (last_used)")
+        connection.execute("CREATE TABLE IF NOT EXISTS excerpts (content_hash TEXT PRIMARY KEY, text TEXT NOT NULL)")
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_meta(self, key: str, value: str):
+        self._connection().execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+    
+    def migrate_json(self, json_path: str) -> int:
+        """
+        Import a JSON categorization cache (v2.0 or the legacy plain mapping) once
+        
+        Runs in an immediate transaction, so when several processes start at the
+        same time exactly one of them imports the file. Returns the entries imported.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if self._get_meta('migrated_from') is not None:
+                connection.execute("COMMIT")
+                return 0
+            
+            with open(json_path, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+            
+            if isinstance(cache_data, dict) and 'categorizations' in cache_data:
+                entries = cache_data['categorizations']
+                stats = cache_data.get('stats')
+            else:
+                entries = cache_data
+                stats = None
+            
+            now = time.time()
+            connection.executemany(
+                "INSERT OR IGNORE INTO categorizations (content_hash, result, created_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                [(content_hash, json.dumps(result, ensure_ascii=False), now, now)
+                 for content_hash, result in entries.items()]
+            )
+            
+            if stats:
+                self._set_meta('stats', json.dumps(stats))
+            self._set_meta('migrated_from', os.path.abspath(json_path))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        
+        logger.info(f"Migrated {len(entries)} categorizations from {json_path} to {self.db_path}")
+        return len(entries)
+    
+    def get(self, content_hash: str, default=None) -> Optional[Dict[str, Any]]:
+        connection = self._connection()
+        row = connection.execute("SELECT result FROM categorizations WHERE content_hash = ?",
+                                 (content_hash,)).fetchone()
+        if row is None:
+            return default
+        
+        if self.max_entries:
+            connection.execute("UPDATE categorizations SET last_used = ? WHERE content_hash = ?",
+                               (time.time(), content_hash))
+        return json.loads(row[0])
+    
+    def __getitem__(self, content_hash: str) -> Dict[str, Any]:
+        result = self.get(content_hash)
+        if result is None:
+            raise KeyError(content_hash)
+        return result
+    
+    def __contains__(self, content_hash: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM categorizations WHERE content_hash = ?",
+                                          (content_hash,)).fetchone() is not None
+    
+    def __setitem__(self, content_hash: str, result: Dict[str, Any]):
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO categorizations (content_hash, result, created_at, last_used) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (content_hash) DO UPDATE SET result = excluded.result, last_used = excluded.last_used",
+            (content_hash, json.dumps(result, ensure_ascii=False), now, now)
+        )
+        
+        if self._eviction_interval:
+            with self._lock:
+                self._inserts_since_eviction += 1
+                evict = self._inserts_since_eviction >= self._eviction_interval
+                if evict:
+                    self._inserts_since_eviction = 0
+            if evict:
+                self.evict()
+    
+    def set_excerpt(self, content_hash: str, text: str):
+        """Keep the text a cached result was derived from"""
+        self._connection().execute(
+            "INSERT INTO excerpts (content_hash, text) VALUES (?, ?) "
+            "ON CONFLICT (content_hash) DO UPDATE SET text = excluded.text",
+            (content_hash, text)
+        )
+    
+    def labelled_examples(self, methods: Iterable[str], min_confidence: float = 0.0) -> List[Tuple[str, str]]:
+        """
+        (excerpt, category) of cached results produced by one of methods with at
+        least min_confidence; results cached without an excerpt are left out
+        """
+        rows = self._connection().execute(
+            "SELECT excerpts.text, categorizations.result FROM categorizations "
+            "JOIN excerpts ON excerpts.content_hash = categorizations.content_hash "
+            "ORDER BY categorizations.content_hash"
+        ).fetchall()
+        
+        methods = set(methods)
+        examples = []
+        for text, result_json in rows:
+            result = json.loads(result_json)
+            if result.get('method') in methods and result.get('confidence', 0.0) >= min_confidence:
+                examples.append((text, result['category']))
+        return examples
+    
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM categorizations").fetchone()[0]
+    
+    def evict(self) -> int:
+        """Delete the least recently used entries beyond max_entries; returns how many"""
+        if not self.max_entries:
+            return 0
+        
+        cursor = self._connection().execute(
+            "DELETE FROM categorizations WHERE content_hash IN ("
+            "SELECT content_hash FROM categorizations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._connection().execute(
+            "DELETE FROM excerpts WHERE content_hash NOT IN (SELECT content_hash FROM categorizations)"
+        )
+        if cursor.rowcount:
+            logger.info(f"Evicted {cursor.rowcount} least recently used categorizations")
+        return cursor.rowcount
+    
+    def clear(self):
+        self._connection().execute("DELETE FROM categorizations")
+        self._connection().execute("DELETE FROM excerpts")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Categorizer statistics last saved to the store"""
+        value = self._get_meta('stats')
+        return json.loads(value) if value else {}
+    
+    def set_stats(self, stats: Dict[str, Any]):
+        self._set_meta('stats', json.dumps(stats))
+    
+    def close(self):
+        """Close the calling thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+# Example usage: insert cost compared with rewriting a JSON cache per entry
+if __name__ == "__main__":
+    import tempfile
+    
+    logging.basicConfig(level=logging.INFO)
+    
+    sample_result = {
+        'category': 'contract',
+        'confidence': 0.9,
+        'explanation': 'Service agreement between two parties with payment and termination terms',
+        'key_indicators': ['agreement', 'parties', 'termination']
+    }
+    entries = 1000
+    
+    with tempfile.TemporaryDirectory() as folder:
+        json_path = os.path.join(folder, 'categorization_cache.json')
+        json_cache = {}
+        started = time.perf_counter()
+        for i in range(entries):
+            json_cache[f"hash{i}"] = sample_result
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': '2.0', 'categorizations': json_cache, 'stats': {}}, f, indent=2)
+        json_seconds = time.perf_counter() - started
+        
+        store = CategorizationStore(os.path.join(folder, 'categorization_cache.sqlite3'), max_entries=500)
+        started = time.perf_counter()
+        for i in range(entries):
+            store[f"hash{i}"] = sample_result
+        store_seconds = time.perf_counter() - started
+        
+        print(f"{entries} inserts: JSON rewrite {json_seconds:.2f}s, SQLite store {store_seconds:.2f}s")
+        print(f"Entries kept with max_entries=500: {len(store)}; newest present: {f'hash{entries - 1}' in store}")
+        
+        migrated = CategorizationStore(os.path.join(folder, 'migrated.sqlite3'), legacy_json_path=json_path)
+        print(f"Migrated entries: {len(migrated)}")
+        store.close()
+        migrated.close()
\ No newline at end of file
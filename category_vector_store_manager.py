@@ -1,20 +1,23 @@
 # category_vector_store_manager.py - Category-based Vector Store Management
 
 import os
-# Fix OpenMP library conflict before importing FAISS
+# Fix OpenMP library conflict before FAISS is imported (on first use, see the methods below)
 os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
 
 import pickle
 import logging
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, TYPE_CHECKING
 import numpy as np
 
 # Updated imports for latest LangChain versions
-from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
 from config import Config
 from models import get_model_manager
+from text_chunker import ChunkSpans
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +40,8 @@ class CategoryVectorStoreManager:
                              store_prefix: str = "legal_docs") -> Dict[str, bool]:
         """Create separate vector stores for each category"""
         
+        from langchain_community.vectorstores import FAISS
+        
         if not categorized_documents:
             raise ValueError("No categorized documents provided")
         
@@ -52,10 +57,18 @@ class CategoryVectorStoreManager:
                 logger.info(f"Creating vector store for category '{category}' with {len(documents)} documents")
                 
                 # Create FAISS vector store for this category
-                vector_store = FAISS.from_documents(
-                    documents=documents,
-                    embedding=self.embeddings
-                )
+                if isinstance(documents, ChunkSpans):
+                    # Chunk text is only materialized here, right before embedding
+                    vector_store = FAISS.from_texts(
+                        texts=documents.texts(),
+                        embedding=self.embeddings,
+                        metadatas=documents.metadatas()
+                    )
+                else:
+                    vector_store = FAISS.from_documents(
+                        documents=documents,
+                        embedding=self.embeddings
+                    )
                 
                 # Store the vector store
                 self.category_stores[category] = vector_store
@@ -122,6 +135,8 @@ class CategoryVectorStoreManager:
     def load_category_stores(self, store_prefix: str = "legal_docs") -> Dict[str, bool]:
         """Load all available category vector stores"""
         
+        from langchain_community.vectorstores import FAISS
+        
         results = {}
         
         # Look for category stores in the category store folder
@@ -161,6 +176,8 @@ class CategoryVectorStoreManager:
     def load_specific_category_store(self, category: str, store_prefix: str = "legal_docs") -> bool:
         """Load vector store for a specific category"""
         
+        from langchain_community.vectorstores import FAISS
+        
         try:
             store_name = f"{store_prefix}_{category}"
             store_path = os.path.join(self.config.CATEGORY_STORE_FOLDER, store_name)
@@ -217,7 +234,93 @@ class CategoryVectorStoreManager:
             logger.error(f"Error adding documents to category '{category}': {e}")
             return False
     
-    def get_category_store(self, category: str) -> Optional[FAISS]:
+    def add_embedded_chunks(self, category: str, texts: List[str], vectors: List[List[float]],
+                            metadatas: List[Dict[str, Any]], store_prefix: str = "legal_docs",
+                            replace: bool = False) -> bool:
+        """
+        Index chunks whose embeddings were already computed (e.g. by a pipelined embed stage)
+        
+        Creates the category store when it does not exist yet or when replace is set,
+        otherwise appends to it.
+        """
+        from langchain_community.vectorstores import FAISS
+        
+        if not texts:
+            logger.warning("No chunks provided to index")
+            return False
+        
+        try:
+            text_embeddings = list(zip(texts, vectors))
+            
+            if replace or category not in self.category_stores:
+                self.category_stores[category] = FAISS.from_embeddings(
+                    text_embeddings=text_embeddings,
+                    embedding=self.embeddings,
+                    metadatas=metadatas
+                )
+                store_name = f"{store_prefix}_{category}"
+                self.category_paths[category] = os.path.join(self.config.CATEGORY_STORE_FOLDER, store_name)
+            else:
+                self.category_stores[category].add_embeddings(text_embeddings, metadatas=metadatas)
+            
+            logger.info(f"Indexed {len(texts)} embedded chunks in category '{category}'")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error indexing embedded chunks for category '{category}': {e}")
+            return False
+    
+    def upsert_category_chunks(self, category: str, documents: List[Document], ids: List[str],
+                               store_prefix: str = "legal_docs") -> bool:
+        """Add chunks under caller-chosen ids, creating the category store if needed"""
+        
+        from langchain_community.vectorstores import FAISS
+        
+        if not documents:
+            return True
+        
+        try:
+            if category in self.category_stores:
+                self.category_stores[category].add_documents(documents, ids=ids)
+            else:
+                self.category_stores[category] = FAISS.from_documents(
+                    documents=documents,
+                    embedding=self.embeddings,
+                    ids=ids
+                )
+                store_name = f"{store_prefix}_{category}"
+                self.category_paths[category] = os.path.join(self.config.CATEGORY_STORE_FOLDER, store_name)
+            
+            logger.info(f"Upserted {len(documents)} chunks into category '{category}'")
+            return True
+        
+        except Exception as e:
+            logger.error(f"Error upserting chunks into category '{category}': {e}")
+            return False
+    
+    def delete_category_chunks(self, category: str, ids: List[str]) -> int:
+        """Delete chunks by id from a category store, returning how many were removed"""
+        
+        vector_store = self.category_stores.get(category)
+        if vector_store is None:
+            return 0
+        
+        # FAISS.delete rejects the whole call if any id is unknown
+        present = set(vector_store.index_to_docstore_id.values())
+        existing_ids = [chunk_id for chunk_id in ids if chunk_id in present]
+        if not existing_ids:
+            return 0
+        
+        try:
+            vector_store.delete(existing_ids)
+            logger.info(f"Deleted {len(existing_ids)} chunks from category '{category}'")
+            return len(existing_ids)
+        
+        except Exception as e:
+            logger.error(f"Error deleting chunks from category '{category}': {e}")
+            return 0
+    
+    def get_category_store(self, category: str) -> Optional['FAISS']:
         """Get vector store for a specific category"""
         return self.category_stores.get(category)
     
@@ -296,6 +399,11 @@ class CategoryVectorStoreManager:
         """Get list of all loaded categories"""
         return list(self.category_stores.keys())
     
+    def unload_category_stores(self):
+        """Forget the loaded stores, leaving their files on disk (e.g. before switching store prefix)"""
+        self.category_stores.clear()
+        self.category_paths.clear()
+    
     def delete_category_store(self, category: str) -> bool:
         """Delete a category vector store"""
         
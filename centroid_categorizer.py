@@ -0,0 +1,210 @@
+# centroid_categorizer.py - Embedding-centroid Categorization Tier
+
+import os
+import re
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class CentroidCategorizer:
+    """
+    Classifies documents by cosine similarity to one centroid embedding per category
+    
+    Centroids start from each category's name, description and keywords, and move
+    towards the documents the LLM later categorizes with high confidence (see
+    learn()). Sums and counts are kept in LOGS_FOLDER, in one file per embedding
+    model, so learned examples survive restarts and switching backends back and
+    forth; they are rebuilt when the category definitions change.
+    """
+    
+    def __init__(self, embeddings):
+        self.config = Config()
+        self.settings = self.config.CATEGORIZATION_SETTINGS
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, 'model', self.config.EMBEDDING_MODEL)
+        
+        # Vectors of different models are not comparable, so each model learns into its own file
+        root, extension = os.path.splitext(self.settings['centroid_file'])
+        model_slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', self.model)
+        self.centroid_file = os.path.join(self.config.LOGS_FOLDER, f"{root}_{model_slug}{extension}")
+        # Before per-model files, all models shared this one; its signature says which model it holds
+        self.legacy_centroid_file = os.path.join(self.config.LOGS_FOLDER, self.settings['centroid_file'])
+        
+        self._lock = threading.Lock()
+        self.categories = []
+        self._sums = None  # (categories, dim) sums of unit vectors
+        self._counts = None
+        self._centroids = None  # (categories, dim) unit vectors
+    
+    def _seed_texts(self) -> Dict[str, List[str]]:
+        seeds = {}
+        for category, name in self.config.LEGAL_CATEGORIES.items():
+            texts = [f"{name}. {self.config.CATEGORY_DESCRIPTIONS.get(category, '')}".strip()]
+            keywords = self.config.CATEGORY_KEYWORDS.get(category, [])
+            if keywords:
+                texts.append(f"{name}: {', '.join(keywords)}")
+            seeds[category] = texts
+        return seeds
+    
+    def _seed_signature(self, seeds: Dict[str, List[str]]) -> str:
+        digest = hashlib.sha256(self.model.encode('utf-8'))
+        for category, texts in seeds.items():
+            digest.update(category.encode('utf-8'))
+            for text in texts:
+                digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+    
+    def _ensure_centroids(self):
+        """Load the saved centroids, or embed the category seeds (one embedding call)"""
+        with self._lock:
+            if self._centroids is not None:
+                return
+            
+            seeds = self._seed_texts()
+            signature = self._seed_signature(seeds)
+            
+            centroid_file = self.centroid_file
+            if not os.path.exists(centroid_file) and os.path.exists(self.legacy_centroid_file):
+                centroid_file = self.legacy_centroid_file
+            
+            try:
+                with np.load(centroid_file, allow_pickle=False) as saved:
+                    if str(saved['signature']) == signature:
+                        self.categories = [str(category) for category in saved['categories']]
+                        self._sums = saved['sums']
+                        self._counts = saved['counts']
+                        self._centroids = self._normalize(self._sums)
+                        logger.info(f"Loaded category centroids from {centroid_file} "
+                                    f"({int(self._counts.sum() - len(self.categories))} learned examples)")
+                        if centroid_file != self.centroid_file:
+                            self._save(signature)
+                        return
+                if centroid_file == self.centroid_file:
+                    logger.info("Category definitions changed, rebuilding category centroids")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Could not load category centroids: {e}")
+            
+            categories = list(seeds)
+            texts = [text for category in categories for text in seeds[category]]
+            vectors = self._normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+            
+            sums = []
+            position = 0
+            for category in categories:
+                count = len(seeds[category])
+                sums.append(self._normalize(vectors[position:position + count].mean(axis=0)))
+                position += count
+            
+            self.categories = categories
+            self._sums = np.stack(sums)
+            self._counts = np.ones(len(categories), dtype=np.int64)  # The seeds weigh as one example
+            self._centroids = self._normalize(self._sums)
+            self._save(signature)
+            
+            logger.info(f"Built centroids for {len(categories)} categories from their descriptions")
+    
+    def _save(self, signature: str = None):
+        if signature is None:
+            signature = self._seed_signature(self._seed_texts())
+        
+        temp_file = f"{self.centroid_file}.tmp.npz"
+        try:
+            np.savez(temp_file, signature=np.array(signature), categories=np.array(self.categories),
+                     sums=self._sums, counts=self._counts)
+            os.replace(temp_file, self.centroid_file)
+        except Exception as e:
+            logger.warning(f"Could not save category centroids: {e}")
+    
+    def classify(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Score texts against every category centroid, embedding them in one call
+        
+        Returns:
+            Per text: best 'category', its cosine 'similarity', the 'margin' over the
+            runner-up, the 'runner_up' category, 'scores' per category and the unit 'vector'
+        """
+        self._ensure_centroids()
+        
+        vectors = self._normalize(np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32))
+        with self._lock:
+            similarities = vectors @ self._centroids.T
+        
+        results = []
+        for vector, scores in zip(vectors, similarities):
+            best, runner_up = np.argsort(scores)[::-1][:2]
+            results.append({
+                'category': self.categories[best],
+                'similarity': float(scores[best]),
+                'margin': float(scores[best] - scores[runner_up]),
+                'runner_up': self.categories[runner_up],
+                'scores': {category: round(float(score), 4) for category, score in zip(self.categories, scores)},
+                'vector': vector
+            })
+        return results
+    
+    def learn(self, category: str, vector: np.ndarray):
+        """Move a category's centroid towards a confirmed document"""
+        self._ensure_centroids()
+        
+        with self._lock:
+            if category not in self.categories:
+                return
+            position = self.categories.index(category)
+            self._sums[position] += vector
+            self._counts[position] += 1
+            self._centroids[position] = self._normalize(self._sums[position])
+            self._save()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        if self._counts is None:
+            return {'built': False}
+        return {
+            'built': True,
+            'examples_per_category': {category: int(count) for category, count in zip(self.categories, self._counts)}
+        }
+# Example usage: with offline embeddings, similarities are low even for a clear winner;
+# such documents must reach the next tier instead of being defaulted to 'other'
+if __name__ == "__main__":
+    import tempfile
+    from langchain.schema import Document
+    from local_embeddings import LocalHashingEmbeddings
+    from local_llm import LocalChatModel
+    from document_categorizer import DocumentCategorizer
+    
+    Config.LOGS_FOLDER = tempfile.mkdtemp()
+    Config.CATEGORIZATION_SETTINGS['local_classifier_enabled'] = False
+    
+    embeddings = LocalHashingEmbeddings()
+    categorizer = DocumentCategorizer(llm=LocalChatModel(latency_distribution='fixed', latency_mean_seconds=0.0),
+                                      embeddings=embeddings)
+    
+    text = "The employee shall receive an annual salary and benefits; employment may be terminated with notice. " * 5
+    match = categorizer.centroid_categorizer.classify([text])[0]
+    result = categorizer.categorize_document(Document(page_content=text, metadata={'source': 'employment.txt'}))
+    
+    print(f"Centroid: {match['category']} (similarity {match['similarity']:.3f}, margin {match['margin']:.3f})")
+    print(f"Result: {result['category']} via {result['method']} (confidence {result['confidence']})")
+    assert result['category'] != 'other' and result['method'] != 'embedding_centroid'
+    
+    # Switching the embedding model and back keeps what each model learned
+    categorizer.centroid_categorizer.learn('employment', match['vector'])
+    other_model = CentroidCategorizer(LocalHashingEmbeddings(dimension=256))
+    other_model.classify([text])
+    back = CentroidCategorizer(embeddings)
+    back.classify([text])
+    print(f"Centroid files: {sorted(name for name in os.listdir(Config.LOGS_FOLDER) if name.endswith('.npz'))}")
+    print(f"Learned employment examples after switching back: {back.get_stats()['examples_per_category']['employment'] - 1}")
\ No newline at end of file
@@ -11,13 +11,15 @@ class Config:
     # Model Configuration
     EMBEDDING_MODEL = "models/text-embedding-004"
     LLM_MODEL = "gemini-2.0-flash-exp"
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "google")  # 'google' (Gemini API) or 'local' (offline, see LOCAL_EMBEDDING_SETTINGS)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "google")  # 'google' (Gemini API) or 'local' (stand-in for load tests, see LOCAL_LLM_SETTINGS)
     
     # API Keys
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
     @classmethod
     def validate_config(cls):
-        if not cls.GEMINI_API_KEY:
+        if cls.requires_gemini_api_key() and not cls.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY environment variable is not set. Please set it in your .env file or environment.")
     
     # Text Splitting Parameters
@@ -26,6 +28,7 @@ class Config:
     
     # Retrieval Parameters
     TOP_K = 5
+    RETRIEVAL_MAX_TOKENS = 4000  # Token budget for retrieved context in the conversational chains
     
     # Paths
     UPLOAD_FOLDER = "uploads"
@@ -118,13 +121,141 @@ class Config:
     # Categorization settings
     CATEGORIZATION_SETTINGS = {
         'use_cache': True,
-        'cache_file': 'categorization_cache.json',
+        'cache_file': 'categorization_cache.json',  # Legacy JSON cache, imported into cache_db_file once
+        'cache_db_file': 'categorization_cache.sqlite3',  # SQLite (WAL) cache shared by all worker processes
+        'cache_max_entries': None,  # Least recently used entries beyond this are evicted; None = unbounded
         'min_confidence_threshold': 0.3,
-        'max_content_length': 3000,  # Max chars to send to LLM for categorization
+        'max_content_length': 3000,  # Max chars to send to LLM for categorization, shared by the sampled pages
+        'sample_pages': 4,  # Pages sampled per document (start, middle, heading-dense); 1 = first page only
+        'sample_min_page_chars': 400,  # Shorter pages (covers, signature pages) are not picked for heading density
+        'batch_size': 8,  # Documents per categorization LLM call when loading several files; 1 = one call each
+        'max_concurrency': 4,  # Categorization LLM calls in flight at once
         'fallback_enabled': True,
+        'keyword_word_boundaries': False,  # False: substring counts, as str.count; True (opt-in): whole words and plurals only
+        'centroid_enabled': True,  # Categorize by embedding similarity to category centroids before asking the LLM
+        'centroid_min_margin': 0.05,  # Cosine lead over the runner-up needed to skip the LLM (similarity must also reach min_confidence_threshold)
+        'centroid_learn_min_confidence': 0.8,  # LLM results at least this confident move their category's centroid
+        'centroid_file': 'category_centroids.npz',  # In LOGS_FOLDER, one file per embedding model (name suffixed with the model)
+        'local_classifier_enabled': True,  # Offline TF-IDF classifier tier, used once trained (python local_classifier.py)
+        'local_classifier_file': 'local_classifier.npz',
+        'local_classifier_min_confidence': 0.85,  # Class probability needed to skip the centroid and LLM tiers
+        'local_classifier_min_examples': 30,  # Labelled excerpts needed before retraining
+        'local_classifier_training_min_confidence': 0.7,  # Cached LLM results at least this confident become training data
+        'store_training_excerpts': True,  # Keep the categorized excerpt next to each cached result, for retraining
+        'chunk_level': False,  # Also categorize each chunk, so mixed documents (e.g. a contract with a privacy annex) span stores
+        'chunk_min_chars': 200,  # Shorter chunks keep their document's category
+        'chunk_min_keyword_hits': 2,  # Keyword hits of another category that make a chunk worth categorizing on its own
+        'chunk_override_min_confidence': 0.6,  # Confidence a chunk needs to leave its document's category
         'export_reports': True
     }
     
+    # Client-side pacing of LLM calls, shared by all callers in the process; match to the API quota
+    LLM_RATE_LIMIT_SETTINGS = {
+        'requests_per_minute': 60,
+        'burst': 4,  # Calls that may start back to back before pacing applies
+        'max_retries': 5,  # Retries of a call answered with 429
+        'backoff_base_seconds': 1.0,  # Doubles per retry, with jitter
+        'backoff_max_seconds': 32.0
+    }
+    
+    # Ingestion settings for multi-file loading
+    INGESTION_SETTINGS = {
+        'parallel_enabled': True,
+        'parallel_min_files': 4,  # Below this, process pool startup costs more than it saves
+        'max_parse_workers': 4,  # Process pool size for PDF parsing and preprocessing
+        'max_categorization_workers': 4,  # Thread pool size for categorizer LLM calls
+        'mode': 'batch',  # 'batch' loads everything first, 'streaming' embeds page by page, 'pipelined' overlaps stages
+        'stream_embed_batch_size': 64,  # Chunks buffered per category before embedding when streaming or pipelined
+        'pipeline_queue_size': 4,  # Items buffered between pipelined stages; a full queue blocks the stage before it
+        'pipeline_load_workers': 1,
+        'pipeline_preprocess_workers': 1,
+        'pipeline_embed_workers': 2  # Concurrent embedding requests
+    }
+    
+    # PDF loader selection
+    PDF_LOADER_SETTINGS = {
+        'text_layer_sample_pages': 3,  # Pages probed for an extractable text layer
+        'min_text_chars_per_page': 100,  # Below this average the PDF is treated as scanned/layout-heavy
+        'unstructured_max_failures': 3  # Consecutive unstructured failures after which this process stops trying it
+    }
+    
+    # Parsed text cache (cleaned pages keyed by file content hash)
+    PARSED_TEXT_CACHE_SETTINGS = {
+        'enabled': True,
+        'folder': 'parsed_text_cache',  # Created under LOGS_FOLDER
+        'max_entries': 500,
+        'max_size_mb': 200
+    }
+    
+    # Persistent embedding cache keyed by (EMBEDDING_MODEL, sha256 of the text)
+    EMBEDDING_CACHE_SETTINGS = {
+        'enabled': True,
+        'folder': 'embedding_cache',  # Created under LOGS_FOLDER: index.sqlite3 plus one vector file per model
+        'cache_queries': True  # Also cache query embeddings (kept apart from document embeddings)
+    }
+    
+    # Offline feature-hashing embeddings (EMBEDDING_BACKEND = 'local'); stores must be rebuilt when switching backends
+    LOCAL_EMBEDDING_SETTINGS = {
+        'dimension': 768,
+        'use_bigrams': True  # Hash word bigrams as well as words, so phrases like 'personal data' count
+    }
+    
+    # Local stand-in chat model (LLM_BACKEND = 'local'): valid categorization JSON and templated answers,
+    # with injected latency and failures, so /query, /process and the CLI can be load-tested offline.
+    # Its categorizations are never cached, kept as training excerpts or learned into centroids
+    LOCAL_LLM_SETTINGS = {
+        'latency_distribution': os.getenv("LOCAL_LLM_LATENCY_DISTRIBUTION", "lognormal"),  # 'fixed', 'uniform' or 'lognormal'
+        'latency_mean_seconds': float(os.getenv("LOCAL_LLM_LATENCY_SECONDS", "0.8")),
+        'latency_spread': 0.5,  # Lognormal sigma, or half-width in seconds of the uniform range
+        'error_rate': float(os.getenv("LOCAL_LLM_ERROR_RATE", "0")),  # Share of calls failing with a 503
+        'rate_limit_rate': float(os.getenv("LOCAL_LLM_RATE_LIMIT_RATE", "0")),  # Share of calls failing with a 429
+        'tokens_per_second': 50,  # Streaming speed after the first token
+        'answer_template': "Local stand-in answer to: {question}",  # {question} and {prompt_chars} are filled in
+        'seed': None  # Set for reproducible latencies and failures
+    }
+    
+    # Embedding requests: fixed-size batches, several in flight, each retried on its own
+    EMBEDDING_EXECUTOR_SETTINGS = {
+        'batch_size': 100,  # Texts per embedding request (the Gemini batch limit)
+        'max_in_flight': 4,
+        'max_retries': 4,  # Per batch, for transient errors (timeouts, 5xx); the rate limiter handles 429s
+        'backoff_base_seconds': 1.0,
+        'backoff_max_seconds': 30.0,
+        'requests_per_minute': 1500
+    }
+    
+    # Chunking settings
+    CHUNKING_SETTINGS = {
+        'strategy': 'recursive',  # 'recursive' copies chunk text, 'spans' keeps character offsets into the pages,
+                                  # 'tokens' packs whole clauses up to a token budget,
+                                  # 'clauses' emits one chunk per detected clause or section
+        'target_tokens': None,  # None derives min(embedding_max_tokens, RETRIEVAL_MAX_TOKENS // TOP_K)
+        'overlap_tokens': 50,  # Only applied where a clause is too long and gets cut mid-sentence
+        'embedding_max_tokens': 2048,  # Input limit of the embedding model
+        'clause_min_chars': 300,  # Shorter clauses are merged with their neighbours
+        'clause_max_chars': 2000  # Longer clauses are sub-split with CHUNK_OVERLAP
+    }
+    
+    # Near-duplicate chunk elimination before embedding (MinHash/LSH)
+    DEDUP_SETTINGS = {
+        'enabled': True,
+        'num_permutations': 128,
+        'bands': 16,  # 16 bands of 8 rows propose pairs from roughly 0.7 similarity upwards
+        'shingle_size': 5,  # Words per shingle
+        'similarity_threshold': 0.85,  # Estimated Jaccard similarity needed to drop a chunk
+        'seed': 1
+    }
+    
+    # Incremental ingestion of the uploads folder into stable category stores
+    INCREMENTAL_SETTINGS = {
+        # Opt-in: the interactive CLI then syncs the uploads folder (initial load and "Reload Documents")
+        # instead of processing the documents it found into a new timestamped store
+        'enabled': os.getenv("INCREMENTAL_INGESTION", "false").lower() == "true",
+        'store_prefix': 'legal_docs_incremental',
+        'manifest_file': 'ingestion_manifest.json',  # Stored in LOGS_FOLDER, prefixed with the store prefix
+        'poll_interval_seconds': 5
+    }
+    
     # Vector store settings for categories
     CATEGORY_STORE_SETTINGS = {
         'similarity_threshold': 0.7,
@@ -142,10 +273,21 @@ class Config:
         'highlight_differences': True
     }
     
+    # App startup: /health answers right away, models and services are built afterwards
+    STARTUP_SETTINGS = {
+        'warm_up_in_background': os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true",  # Otherwise built on first request
+        'warm_up_services': None  # Service names to build during warm-up; None = all registered
+    }
+    
+    @classmethod
+    def requires_gemini_api_key(cls) -> bool:
+        """Whether any configured backend calls the Gemini API"""
+        return cls.EMBEDDING_BACKEND == 'google' or cls.LLM_BACKEND == 'google'
+    
     @classmethod
     def validate_config(cls):
         """Validate configuration settings"""
-        if not cls.GEMINI_API_KEY:
+        if cls.requires_gemini_api_key() and not cls.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
         # Validate category definitions
@@ -0,0 +1,181 @@
+# deduplication.py - MinHash/LSH Near-duplicate Chunk Elimination
+
+import re
+import zlib
+import logging
+from typing import List, Dict, Any, Tuple, Union
+
+import numpy as np
+from langchain.schema import Document
+
+from config import Config
+from text_chunker import ChunkSpans
+
+logger = logging.getLogger(__name__)
+
+# Largest prime below 2**32, so (a * h + b) over 32-bit values never overflows uint64
+_HASH_PRIME = np.uint64(4294967291)
+
+_WORD = re.compile(r'\w+')
+
+class NearDuplicateFilter:
+    """
+    Drops near-duplicate chunks (boilerplate definitions, signature blocks, clauses
+    shared across policies) before embedding, keeping the first chunk of each cluster
+    and recording every dropped copy in its 'duplicate_sources' metadata
+    """
+    
+    def __init__(self):
+        self.config = Config()
+        self.settings = self.config.DEDUP_SETTINGS
+        
+        num_permutations = self.settings['num_permutations']
+        bands = self.settings['bands']
+        if num_permutations % bands:
+            raise ValueError("DEDUP_SETTINGS num_permutations must be a multiple of bands")
+        
+        self.bands = bands
+        self.rows_per_band = num_permutations // bands
+        
+        # Fixed seed so signatures are comparable across runs and processes
+        rng = np.random.default_rng(self.settings['seed'])
+        self._perm_a = rng.integers(1, int(_HASH_PRIME), size=(num_permutations, 1), dtype=np.uint64)
+        self._perm_b = rng.integers(0, int(_HASH_PRIME), size=(num_permutations, 1), dtype=np.uint64)
+    
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        """Hash the word shingles of a chunk (crc32 is stable across processes, unlike hash())"""
+        words = _WORD.findall(text.lower())
+        size = self.settings['shingle_size']
+        
+        if len(words) <= size:
+            shingles = {' '.join(words)}
+        else:
+            shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        
+        return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                           dtype=np.uint64, count=len(shingles))
+    
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature: the minimum of each permuted shingle hash"""
+        hashes = self._shingle_hashes(text) % _HASH_PRIME
+        return ((self._perm_a * hashes + self._perm_b) % _HASH_PRIME).min(axis=1)
+    
+    def deduplicate(self, chunks: Union[List[Document], ChunkSpans]) -> Tuple[Union[List[Document], ChunkSpans], Dict[str, Any]]:
+        """
+        Remove near-duplicates from one group of chunks
+        
+        LSH banding proposes candidate matches among the chunks kept so far, and a
+        candidate is accepted when its estimated Jaccard similarity reaches
+        DEDUP_SETTINGS['similarity_threshold'].
+        """
+        is_spans = isinstance(chunks, ChunkSpans)
+        threshold = self.settings['similarity_threshold']
+        
+        band_buckets = [{} for _ in range(self.bands)]
+        kept_signatures = {}  # {position: signature}
+        duplicates = {}  # {kept position: [duplicate positions]}
+        kept = []
+        
+        for position in range(len(chunks)):
+            text = chunks.text(position) if is_spans else chunks[position].page_content
+            signature = self.signature(text)
+            band_keys = [signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+                         for band in range(self.bands)]
+            
+            match = None
+            for band, key in enumerate(band_keys):
+                for candidate in band_buckets[band].get(key, []):
+                    if np.mean(kept_signatures[candidate] == signature) >= threshold:
+                        match = candidate
+                        break
+                if match is not None:
+                    break
+            
+            if match is None:
+                kept.append(position)
+                kept_signatures[position] = signature
+                for band, key in enumerate(band_keys):
+                    band_buckets[band].setdefault(key, []).append(position)
+            else:
+                duplicates.setdefault(match, []).append(position)
+        
+        # Record every dropped copy on the chunk that represents its cluster
+        for kept_position, duplicate_positions in duplicates.items():
+            references = [self._source_reference(chunks, position, is_spans) for position in duplicate_positions]
+            if is_spans:
+                chunks.set_extra_metadata(kept_position, {'duplicate_sources': references})
+            else:
+                chunks[kept_position].metadata['duplicate_sources'] = references
+        
+        removed = len(chunks) - len(kept)
+        stats = {
+            'chunks_in': len(chunks),
+            'chunks_kept': len(kept),
+            'duplicates_removed': removed,
+            'duplicate_clusters': len(duplicates),
+            'embedding_calls_saved': removed  # One embedding per chunk is never requested
+        }
+        
+        kept_chunks = chunks.subset(kept) if is_spans else [chunks[position] for position in kept]
+        return kept_chunks, stats
+    
+    def deduplicate_categories(self, categorized_docs: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Deduplicate each category separately, since every category has its own vector store"""
+        
+        deduplicated = {}
+        category_stats = {}
+        
+        for category, chunks in categorized_docs.items():
+            deduplicated[category], category_stats[category] = self.deduplicate(chunks)
+        
+        stats = self.combine_stats(category_stats.values())
+        stats['by_category'] = category_stats
+        
+        logger.info(f"Near-duplicate filter removed {stats['duplicates_removed']} of {stats['chunks_in']} chunks "
+                    f"in {stats['duplicate_clusters']} clusters, saving {stats['embedding_calls_saved']} embedding calls")
+        
+        return deduplicated, stats
+    
+    @staticmethod
+    def combine_stats(stats_list) -> Dict[str, Any]:
+        """Sum the counters of several deduplicate() calls"""
+        combined = {
+            'chunks_in': 0,
+            'chunks_kept': 0,
+            'duplicates_removed': 0,
+            'duplicate_clusters': 0,
+            'embedding_calls_saved': 0
+        }
+        
+        for stats in stats_list:
+            for key in combined:
+                combined[key] += stats.get(key, 0)
+        
+        return combined
+    
+    @staticmethod
+    def _source_reference(chunks, position: int, is_spans: bool) -> Dict[str, Any]:
+        metadata = chunks.metadata(position) if is_spans else chunks[position].metadata
+        return {
+            'source': metadata.get('source', 'Unknown'),
+            'page_number': metadata.get('page_number'),
+            'chunk_id': metadata.get('chunk_id')
+        }
+
+# Example usage
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    clause = ("The insurer shall not be liable for any claim arising from pre-existing conditions "
+              "disclosed or undisclosed at the time of enrolment, except as provided in Section 7.")
+    chunks = [
+        Document(page_content=clause, metadata={"source": "Policy_A_Basic_Health.pdf", "page_number": 2, "chunk_id": 0}),
+        Document(page_content=clause.replace("Section 7", "Section 9"),
+                 metadata={"source": "Policy_B_Premium_Health.pdf", "page_number": 3, "chunk_id": 1}),
+        Document(page_content="Premiums are payable monthly in advance by direct debit.",
+                 metadata={"source": "Policy_B_Premium_Health.pdf", "page_number": 4, "chunk_id": 2})
+    ]
+    
+    kept, stats = NearDuplicateFilter().deduplicate(chunks)
+    print(f"Deduplication statistics: {stats}")
+    print(f"Duplicate sources of first chunk: {kept[0].metadata.get('duplicate_sources')}")
\ No newline at end of file
@@ -1,41 +1,96 @@
 # document_categorizer.py - Comprehensive Document Categorization Module
 
 import os
+import re
 import json
 import logging
 import hashlib
+import threading
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain.schema import Document
 from langchain.prompts import PromptTemplate
 
 from config import Config
 from models import get_model_manager
+from categorization_store import CategorizationStore
+from keyword_matcher import KeywordMatcher
+from centroid_categorizer import CentroidCategorizer
+from local_classifier import LocalClassifier, TRAINING_METHODS
+from rate_limiter import get_llm_rate_limiter
+from text_chunker import count_headings
 
 logger = logging.getLogger(__name__)
 
+# Marks where each sampled page starts in the content sent for categorization
+_PAGE_MARKER = re.compile(r'\[Page (\d+)\]\n')
+
+# Dot leaders or a contents title mark a table of contents, which is heading-dense but uninformative
+_CONTENTS_PAGE = re.compile(r'\.{4,}|\btable of contents\b', re.IGNORECASE)
+
 class DocumentCategorizer:
     """
     Advanced legal document categorization system using LLM analysis
     with fallback mechanisms and comprehensive reporting
     """
     
-    def __init__(self):
+    def __init__(self, llm=None, rate_limiter=None, embeddings=None):
+        """
+        Args:
+            llm: Chat model to categorize with; defaults to the model manager's LLM
+            rate_limiter: Limiter all LLM calls go through; defaults to the process-wide one
+            embeddings: Embedding model for the centroid tier; defaults to the model
+                        manager's, and without an llm the tier is off unless given
+        """
         self.config = Config()
-        self.model_manager = get_model_manager()
-        self.llm = self.model_manager.get_llm()
+        self.model_manager = get_model_manager() if llm is None else None
+        self.llm = llm if llm is not None else self.model_manager.get_llm()
+        self.rate_limiter = rate_limiter or get_llm_rate_limiter()
+        
+        # Stand-in answers are keyword guesses: they must not reach the persistent cache,
+        # the local classifier's training excerpts or the centroids a real model learns from
+        from local_llm import LocalChatModel
+        self.stand_in_llm = isinstance(self.llm, LocalChatModel)
+        if self.stand_in_llm:
+            logger.info("Local stand-in LLM: categorizations are not cached or learned from")
+        
+        if embeddings is None and self.model_manager is not None:
+            embeddings = self.model_manager.get_embeddings()
+        self.centroid_categorizer = (CentroidCategorizer(embeddings)
+                                     if self.config.CATEGORIZATION_SETTINGS['centroid_enabled'] and embeddings is not None
+                                     else None)
+        
+        # Trained offline from the cache by `python local_classifier.py`; absent until then
+        settings = self.config.CATEGORIZATION_SETTINGS
+        self.local_classifier = (LocalClassifier.load(os.path.join(self.config.LOGS_FOLDER, settings['local_classifier_file']))
+                                 if settings['local_classifier_enabled'] else None)
+        if self.local_classifier is not None:
+            logger.info(f"Local classifier loaded ({self.local_classifier.report.get('training_examples')} training examples)")
         
         # Initialize categorization components
         self._setup_categorization_prompt()
+        self.keyword_matcher = KeywordMatcher(
+            self.config.CATEGORY_KEYWORDS,
+            word_boundaries=self.config.CATEGORIZATION_SETTINGS['keyword_word_boundaries']
+        )
         self.categorization_cache = {}
+        # Guards the cache and its file when documents are categorized from a thread pool
+        self._cache_lock = threading.Lock()
+        # Counters are updated from the same worker threads
+        self._stats_lock = threading.Lock()
         self.categorization_stats = {
             'total_categorizations': 0,
             'cache_hits': 0,
             'llm_categorizations': 0,
             'fallback_categorizations': 0,
-            'failed_categorizations': 0
+            'failed_categorizations': 0,
+            'batch_llm_calls': 0,
+            'batched_categorizations': 0,
+            'centroid_categorizations': 0,
+            'local_classifier_categorizations': 0
         }
         
         # Load existing cache
@@ -62,6 +117,7 @@ class DocumentCategorizer:
 {category_info_text}
 
 **DOCUMENT CONTENT TO ANALYZE:**
+(The content may be a sample of several pages, each introduced by a [Page N] marker.)
 {{content}}
 
 **CLASSIFICATION INSTRUCTIONS:**
@@ -72,6 +128,7 @@ class DocumentCategorizer:
 5. **Confidence Assessment**: Rate your confidence in the classification (0.0 to 1.0)
 6. **Explanation Required**: Provide a clear explanation for your choice
 7. **Key Indicators**: List specific terms or phrases that influenced your decision
+8. **Evidence Pages**: If the content has [Page N] markers, list the page numbers that decided the category
 
 **CLASSIFICATION CRITERIA:**
 - **Content Analysis**: What is the main purpose and subject matter?
@@ -81,15 +138,16 @@ class DocumentCategorizer:
 - **Document Format**: What is the typical format and structure?
 
 **RESPONSE FORMAT (MUST BE VALID JSON):**
-{{
+{{{{
     "category": "category_key_from_list",
     "confidence": 0.85,
     "explanation": "Clear explanation of why this category was chosen based on document analysis",
     "key_indicators": ["specific", "terms", "or", "phrases", "found"],
     "alternative_category": "second_best_option_if_any",
     "document_type_detected": "specific type within category",
-    "analysis_notes": "Additional observations about the document"
-}}
+    "analysis_notes": "Additional observations about the document",
+    "evidence_pages": [3, 7]
+}}}}
 
 **IMPORTANT NOTES:**
 - Only use category keys from the provided list
@@ -105,57 +163,87 @@ class DocumentCategorizer:
             input_variables=["content"]
         )
         
+        # Batch variant: the category catalog is sent once for several documents
+        batch_categorization_template = f"""You are an expert legal document classifier with deep knowledge of legal document types and structures. Your task is to classify EACH of the documents below into the most appropriate category.
+
+**AVAILABLE CATEGORIES:**
+
+{category_info_text}
+
+**DOCUMENTS TO ANALYZE:**
+(Each document starts with <<<DOCUMENT id=N>>> and ends with <<<END DOCUMENT N>>>. Its content may be a sample of several pages, each introduced by a [Page N] marker.)
+
+{{documents}}
+
+**CLASSIFICATION INSTRUCTIONS:**
+1. Classify every document independently; never let one document influence another
+2. Choose the MOST APPROPRIATE category key from the list above for each document
+3. Rate your confidence in each classification (0.0 to 1.0) and explain it briefly
+4. List the specific terms or phrases that influenced each decision
+5. If a document has [Page N] markers, list the page numbers that decided its category
+
+**RESPONSE FORMAT (MUST BE A VALID JSON ARRAY WITH ONE OBJECT PER DOCUMENT):**
+[
+    {{{{
+        "id": 1,
+        "category": "category_key_from_list",
+        "confidence": 0.85,
+        "explanation": "Clear explanation of why this category was chosen",
+        "key_indicators": ["specific", "terms", "found"],
+        "alternative_category": "second_best_option_if_any",
+        "evidence_pages": [3, 7]
+    }}}}
+]
+
+**YOUR CLASSIFICATIONS:**"""
+
+        self.batch_categorization_prompt = PromptTemplate(
+            template=batch_categorization_template,
+            input_variables=["documents"]
+        )
+        
         logger.info("Comprehensive categorization prompt template created")
     
     def _load_categorization_cache(self):
-        """Load previously cached categorizations with error handling"""
-        cache_file = os.path.join(self.config.LOGS_FOLDER, self.config.CATEGORIZATION_SETTINGS['cache_file'])
+        """Open the persistent categorization cache, migrating the JSON cache file on first use"""
+        settings = self.config.CATEGORIZATION_SETTINGS
+        db_file = os.path.join(self.config.LOGS_FOLDER, settings['cache_db_file'])
+        json_file = os.path.join(self.config.LOGS_FOLDER, settings['cache_file'])
         
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    
-                # Validate cache format
-                if isinstance(cache_data, dict):
-                    self.categorization_cache = cache_data.get('categorizations', {})
-                    self.categorization_stats.update(cache_data.get('stats', {}))
-                    logger.info(f"Loaded {len(self.categorization_cache)} cached categorizations")
-                else:
-                    # Legacy format support
-                    self.categorization_cache = cache_data
-                    logger.info(f"Loaded {len(self.categorization_cache)} cached categorizations (legacy format)")
-                    
-            except Exception as e:
-                logger.warning(f"Could not load categorization cache: {e}")
-                self.categorization_cache = {}
-        else:
+        try:
+            self.categorization_cache = CategorizationStore(
+                db_file, max_entries=settings['cache_max_entries'], legacy_json_path=json_file
+            )
+            with self._stats_lock:
+                self.categorization_stats.update(self.categorization_cache.get_stats())
+            logger.info(f"Loaded categorization cache with {len(self.categorization_cache)} entries")
+        
+        except Exception as e:
+            # Keep working with a per-process cache rather than failing categorization
+            logger.warning(f"Could not open categorization cache {db_file}: {e}")
             self.categorization_cache = {}
-            logger.info("No existing categorization cache found, starting fresh")
+    
+    def _record(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.categorization_stats[key] += value
+    
+    def _stats_snapshot(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return self.categorization_stats.copy()
     
     def _save_categorization_cache(self):
-        """Save categorizations to cache with statistics"""
-        if not self.config.CATEGORIZATION_SETTINGS['use_cache']:
+        """Save categorizer statistics; cache entries are persisted as they are added"""
+        if not self.config.CATEGORIZATION_SETTINGS['use_cache'] or self.stand_in_llm:
             return
         
-        cache_file = os.path.join(self.config.LOGS_FOLDER, self.config.CATEGORIZATION_SETTINGS['cache_file'])
+        if not isinstance(self.categorization_cache, CategorizationStore):
+            return
         
         try:
-            cache_data = {
-                'version': '2.0',
-                'last_updated': datetime.now().isoformat(),
-                'total_entries': len(self.categorization_cache),
-                'categorizations': self.categorization_cache,
-                'stats': self.categorization_stats
-            }
-            
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"Categorization cache saved with {len(self.categorization_cache)} entries")
-            
+            self.categorization_cache.set_stats(self._stats_snapshot())
         except Exception as e:
-            logger.error(f"Could not save categorization cache: {e}")
+            logger.error(f"Could not save categorization statistics: {e}")
     
     def _create_content_hash(self, content: str) -> str:
         """Create a hash of document content for caching"""
@@ -179,12 +267,14 @@ class DocumentCategorizer:
             # Check cache first if enabled
             content_hash = self._create_content_hash(document.page_content)
             
-            if (self.config.CATEGORIZATION_SETTINGS['use_cache'] and 
-                content_hash in self.categorization_cache):
-                
-                self.categorization_stats['cache_hits'] += 1
+            # One lookup, since another process may evict the entry between two
+            cached_result = (self.categorization_cache.get(content_hash)
+                             if self.config.CATEGORIZATION_SETTINGS['use_cache'] else None)
+            
+            if cached_result is not None:
+                self._record(cache_hits=1)
                 logger.info("Using cached categorization")
-                return self.categorization_cache[content_hash]
+                return cached_result
             
             # Prepare content for analysis
             max_length = self.config.CATEGORIZATION_SETTINGS['max_content_length']
@@ -194,27 +284,47 @@ class DocumentCategorizer:
                 logger.warning("Document content too short for reliable categorization")
                 return self._create_default_categorization(document, "Content too short", content_hash)
             
-            # Try LLM categorization first
-            try:
-                categorization_result = self._llm_categorize(content, document)
-                self.categorization_stats['llm_categorizations'] += 1
+            # Cheap local tiers first: only documents neither settles cost an LLM call
+            local_result = self._local_classify([content])[0]
+            centroid_result, vector = None, None
+            if not self._is_confident_local(local_result):
+                centroid_result, vector = self._centroid_categorize([content])[0]
+            
+            if self._is_confident_local(local_result):
+                categorization_result = local_result
+                self._record(local_classifier_categorizations=1)
+            elif centroid_result is not None:
+                categorization_result = centroid_result
+                self._record(centroid_categorizations=1)
+            else:
+                try:
+                    categorization_result = self._llm_categorize(content, document)
+                    self._record(llm_categorizations=1)
                 
-            except Exception as llm_error:
-                logger.warning(f"LLM categorization failed: {llm_error}, using fallback")
-                categorization_result = self._fallback_categorization(content, document)
-                self.categorization_stats['fallback_categorizations'] += 1
+                except Exception as llm_error:
+                    if local_result is not None:
+                        # Offline, the trained classifier beats keyword counting even when unsure
+                        logger.warning(f"LLM categorization failed: {llm_error}, using the local classifier")
+                        categorization_result = local_result
+                        self._record(local_classifier_categorizations=1)
+                    else:
+                        logger.warning(f"LLM categorization failed: {llm_error}, using fallback")
+                        categorization_result = self._fallback_categorization(content, document)
+                        self._record(fallback_categorizations=1)
             
             # Validate and enhance result
             categorization_result = self._validate_and_enhance_result(
                 categorization_result, document, content_hash
             )
+            self._learn_centroid(categorization_result, vector)
             
             # Cache the result if enabled
             if self.config.CATEGORIZATION_SETTINGS['use_cache']:
-                self.categorization_cache[content_hash] = categorization_result
-                self._save_categorization_cache()
+                with self._cache_lock:
+                    self._cache_result(content_hash, categorization_result, content)
+                    self._save_categorization_cache()
             
-            self.categorization_stats['total_categorizations'] += 1
+            self._record(total_categorizations=1)
             
             logger.info(f"Document categorized as: {categorization_result['category']} "
                        f"(confidence: {categorization_result['confidence']:.2f})")
@@ -223,10 +333,290 @@ class DocumentCategorizer:
             
         except Exception as e:
             logger.error(f"Error categorizing document: {e}")
-            self.categorization_stats['failed_categorizations'] += 1
+            self._record(failed_categorizations=1)
             return self._create_default_categorization(document, f"Error: {str(e)}", 
                                                      self._create_content_hash(document.page_content))
     
+    def categorize_chunks(self, texts: List[str], document_categories: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Categorize the chunks of categorized documents, for mixed-content documents
+        
+        A chunk keeps its document's category unless there is evidence of another:
+        a confident local classifier result or more fallback-keyword hits for another
+        category. Only those chunks are categorized, through categorize_documents, so
+        the centroid tier comes first and LLM escalations are batched.
+        
+        Args:
+            texts: Chunk texts
+            document_categories: Category of the document each chunk comes from
+        
+        Returns:
+            Per chunk, its own categorization, or None where the document's category stands
+        """
+        settings = self.config.CATEGORIZATION_SETTINGS
+        max_length = settings['max_content_length']
+        
+        candidates = [index for index, text in enumerate(texts) if len(text.strip()) >= settings['chunk_min_chars']]
+        excerpts = [texts[index][:max_length].strip() for index in candidates]
+        
+        suspects = []
+        for index, excerpt, local_result in zip(candidates, excerpts, self._local_classify(excerpts)):
+            document_category = document_categories[index]
+            if self._is_confident_local(local_result):
+                if local_result['category'] != document_category:
+                    suspects.append(index)
+                continue
+            
+            keyword_scores = self.keyword_matcher.count(excerpt)
+            if not keyword_scores:
+                continue
+            
+            top_category = max(keyword_scores, key=keyword_scores.get)
+            if (top_category != document_category
+                    and keyword_scores[top_category] >= settings['chunk_min_keyword_hits']
+                    and keyword_scores[top_category] > keyword_scores.get(document_category, 0)):
+                suspects.append(index)
+        
+        results = [None] * len(texts)
+        if suspects:
+            categorizations = self.categorize_documents([
+                Document(page_content=texts[index], metadata={'source': f"chunk {index + 1}"}) for index in suspects
+            ])
+            for index, categorization in zip(suspects, categorizations):
+                if (categorization['category'] != document_categories[index]
+                        and categorization['confidence'] >= settings['chunk_override_min_confidence']):
+                    results[index] = categorization
+        
+        moved = sum(1 for result in results if result is not None)
+        logger.info(f"{moved} of {len(texts)} chunks categorized apart from their document "
+                    f"({len(suspects)} examined)")
+        return results
+    
+    def select_sample_pages(self, pages: List[Document]) -> List[Tuple[int, str]]:
+        """
+        Pick representative pages of a document for categorization
+        
+        The first and middle pages are always sampled; the remaining slots go to the
+        pages with the most clause headings per character, skipping short pages and
+        tables of contents.
+        
+        Returns:
+            (page position, reason) pairs in page order
+        """
+        sample_size = max(1, self.config.CATEGORIZATION_SETTINGS['sample_pages'])
+        min_chars = self.config.CATEGORIZATION_SETTINGS['sample_min_page_chars']
+        
+        selected = {0: 'start'}
+        if sample_size > 1 and len(pages) > 1:
+            selected.setdefault(len(pages) // 2, 'middle')
+        
+        densities = []
+        for position, page in enumerate(pages):
+            text = page.page_content
+            if position in selected or len(text) < min_chars or len(_CONTENTS_PAGE.findall(text)) >= 3:
+                continue
+            
+            headings = count_headings(text)
+            if headings:
+                densities.append((headings / len(text), position))
+        
+        for _, position in sorted(densities, reverse=True)[:max(0, sample_size - len(selected))]:
+            selected[position] = 'headings'
+        
+        return sorted(selected.items())
+    
+    def categorize_pages(self, pages: List[Document]) -> Dict[str, Any]:
+        """
+        Categorize a multi-page document from a sample of its pages in one LLM call
+        
+        The max_content_length budget is shared by the sampled pages, so the prompt
+        stays the same size as a first-page-only categorization. The result records
+        the pages sampled ('sampled_pages') and those that drove the decision
+        ('decisive_pages').
+        
+        Args:
+            pages: Cleaned pages of one document, in page order
+        
+        Returns:
+            Dictionary containing categorization results
+        """
+        
+        return self.categorize_document(self._sample_document(pages))
+    
+    def categorize_page_sets(self, page_sets: List[List[Document]]) -> List[Dict[str, Any]]:
+        """
+        Categorize several multi-page documents, batching their sampled pages into
+        shared LLM calls (see categorize_documents)
+        
+        Args:
+            page_sets: Cleaned pages of each document, in page order
+        
+        Returns:
+            List of categorization results in the order of page_sets
+        """
+        
+        return self.categorize_documents([self._sample_document(pages) for pages in page_sets])
+    
+    def _sample_document(self, pages: List[Document]) -> Document:
+        """Build the document a multi-page categorization is based on from sampled pages"""
+        
+        sample = self.select_sample_pages(pages)
+        budget = self.config.CATEGORIZATION_SETTINGS['max_content_length']
+        
+        sections = []
+        sampled_pages = []
+        used = 0
+        for index, (position, reason) in enumerate(sample):
+            page_number = pages[position].metadata.get('page_number', position + 1)
+            marker = f"[Page {page_number}]\n"
+            
+            # Short pages leave their unused share to the pages after them
+            share = (budget - used) // (len(sample) - index)
+            text = pages[position].page_content.strip()[:max(0, share - len(marker) - 2)]
+            
+            sections.append(marker + text)
+            sampled_pages.append({'page_number': page_number, 'reason': reason})
+            used += len(marker) + len(text) + 2
+        
+        metadata = dict(pages[0].metadata)
+        metadata['sampled_pages'] = sampled_pages
+        
+        logger.info(f"Sampled pages {', '.join(str(page['page_number']) for page in sampled_pages)} "
+                    f"of {metadata.get('source', 'Unknown')} for categorization")
+        
+        return Document(page_content="\n\n".join(sections), metadata=metadata)
+    
+    def _decisive_pages(self, result: Dict[str, Any], content: str,
+                        sampled_pages: List[Dict[str, Any]]) -> List[int]:
+        """
+        Pages that drove a sampled categorization: those the LLM cited, or else the
+        sampled pages with the most keywords of the chosen category
+        """
+        page_numbers = [page['page_number'] for page in sampled_pages]
+        
+        cited = []
+        for page in result.pop('evidence_pages', None) or []:
+            try:
+                page = int(page)
+            except (TypeError, ValueError):
+                continue
+            if page in page_numbers and page not in cited:
+                cited.append(page)
+        if cited:
+            return cited
+        
+        parts = _PAGE_MARKER.split(content)  # ['', number, text, number, text, ...]
+        
+        hits = []
+        for number, text in zip(parts[1::2], parts[2::2]):
+            count = self.keyword_matcher.count(text).get(result['category'], 0)
+            if count:
+                hits.append((count, int(number)))
+        
+        return [page for _, page in sorted(hits, key=lambda hit: (-hit[0], hit[1]))]
+    
+    def _cache_result(self, content_hash: str, result: Dict[str, Any], content: str):
+        """Cache a result; LLM results keep their excerpt as training data for the local classifier"""
+        if self.stand_in_llm:
+            return
+        
+        self.categorization_cache[content_hash] = result
+        
+        if (self.config.CATEGORIZATION_SETTINGS['store_training_excerpts']
+                and result.get('method') in TRAINING_METHODS
+                and isinstance(self.categorization_cache, CategorizationStore)):
+            self.categorization_cache.set_excerpt(content_hash, content)
+    
+    def _local_classify(self, contents: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Categorize excerpts with the local classifier; None per excerpt when there is no model"""
+        if self.local_classifier is None:
+            return [None] * len(contents)
+        
+        try:
+            predictions = self.local_classifier.predict_many(contents)
+        except Exception as e:
+            logger.warning(f"Local classifier failed: {e}")
+            return [None] * len(contents)
+        
+        return [{
+            'category': prediction['category'],
+            'confidence': round(prediction['probability'], 3),
+            'explanation': (f"Local classifier probability {prediction['probability']:.3f}, "
+                            f"ahead of '{prediction['runner_up']}' by {prediction['margin']:.3f}"),
+            'key_indicators': list(self.keyword_matcher.find_all(content).get(prediction['category'], {}))[:5],
+            'alternative_category': prediction['runner_up'],
+            'method': 'local_classifier'
+        } for content, prediction in zip(contents, predictions)]
+    
+    def _is_confident_local(self, result: Optional[Dict[str, Any]]) -> bool:
+        return (result is not None
+                and result['confidence'] >= self.config.CATEGORIZATION_SETTINGS['local_classifier_min_confidence'])
+    
+    def _centroid_categorize(self, contents: List[str]) -> List[Tuple[Optional[Dict[str, Any]], Any]]:
+        """
+        Categorize excerpts by similarity to the category centroids
+        
+        Returns:
+            Per excerpt, (result, embedding): the result is None when the margin between
+            the two closest categories is below 'centroid_min_margin', or the similarity
+            (the result's confidence) below 'min_confidence_threshold', and the excerpt has
+            to be escalated to the next tier; the embedding is None when the tier is unavailable
+        """
+        if self.centroid_categorizer is None:
+            return [(None, None)] * len(contents)
+        
+        try:
+            matches = self.centroid_categorizer.classify(contents)
+        except Exception as e:
+            logger.warning(f"Centroid categorization failed: {e}, escalating to the LLM")
+            return [(None, None)] * len(contents)
+        
+        min_margin = self.config.CATEGORIZATION_SETTINGS['centroid_min_margin']
+        # A clear winner with a low similarity would be turned into 'other' by _validate_and_enhance_result
+        min_similarity = self.config.CATEGORIZATION_SETTINGS['min_confidence_threshold']
+        outcomes = []
+        for content, match in zip(contents, matches):
+            if match['margin'] < min_margin or match['similarity'] < min_similarity:
+                outcomes.append((None, match['vector']))
+                continue
+            
+            keyword_hits = self.keyword_matcher.find_all(content).get(match['category'], {})
+            outcomes.append(({
+                'category': match['category'],
+                'confidence': round(max(0.0, min(1.0, match['similarity'])), 3),
+                'explanation': (f"Closest category centroid (cosine similarity {match['similarity']:.3f}, "
+                                f"{match['margin']:.3f} ahead of '{match['runner_up']}')"),
+                'key_indicators': list(keyword_hits)[:5],
+                'alternative_category': match['runner_up'],
+                'centroid_margin': round(match['margin'], 4),
+                'method': 'embedding_centroid'
+            }, match['vector']))
+        
+        escalated = sum(1 for result, _ in outcomes if result is None)
+        if escalated:
+            logger.info(f"{escalated} of {len(contents)} documents below the centroid margin or similarity, "
+                        f"escalating to the next tier")
+        
+        return outcomes
+    
+    def _learn_centroid(self, result: Dict[str, Any], vector):
+        """Feed a confident LLM categorization back into its category centroid"""
+        if vector is None or self.stand_in_llm or result.get('method') not in ('llm_analysis', 'llm_batch'):
+            return
+        
+        if result['confidence'] >= self.config.CATEGORIZATION_SETTINGS['centroid_learn_min_confidence']:
+            try:
+                self.centroid_categorizer.learn(result['category'], vector)
+            except Exception as e:
+                logger.warning(f"Could not update category centroid: {e}")
+    
+    def _invoke_llm(self, prompt: str):
+        """Call the LLM within the shared quota, backing off while it answers 429"""
+        return self.rate_limiter.call(self.llm.invoke, prompt)
+    
+    def _concurrency(self, tasks: int) -> int:
+        return max(1, min(self.config.CATEGORIZATION_SETTINGS['max_concurrency'], tasks))
+    
     def _llm_categorize(self, content: str, document: Document) -> Dict[str, Any]:
         """Perform LLM-based categorization"""
         
@@ -234,7 +624,7 @@ class DocumentCategorizer:
         prompt = self.categorization_prompt.format(content=content)
         
         # Get LLM response
-        response = self.llm.invoke(prompt)
+        response = self._invoke_llm(prompt)
         response_text = response.content if hasattr(response, 'content') else str(response)
         
         # Parse JSON response
@@ -256,6 +646,158 @@ class DocumentCategorizer:
         
         return categorization_result
     
+    def _llm_categorize_batch(self, contents: List[Tuple[int, str]]) -> Dict[int, Dict[str, Any]]:
+        """
+        Categorize several document excerpts in one LLM call
+        
+        Args:
+            contents: (id, excerpt) pairs
+        
+        Returns:
+            Parsed results keyed by id; ids missing from the response are left out
+        """
+        
+        documents_text = "\n\n".join(
+            f"<<<DOCUMENT id={doc_id}>>>\n{content}\n<<<END DOCUMENT {doc_id}>>>"
+            for doc_id, content in contents
+        )
+        prompt = self.batch_categorization_prompt.format(documents=documents_text)
+        
+        response = self._invoke_llm(prompt)
+        response_text = response.content if hasattr(response, 'content') else str(response)
+        
+        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+        if not json_match:
+            raise json.JSONDecodeError("No JSON array found in response", response_text, 0)
+        
+        items = json.loads(json_match.group())
+        if not isinstance(items, list):
+            raise ValueError("Batch categorization response is not a JSON array")
+        
+        results = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                doc_id = int(item.pop('id'))
+            except (KeyError, TypeError, ValueError):
+                continue
+            results.setdefault(doc_id, item)
+        
+        return results
+    
+    def _categorize_in_batches(self, documents: List[Document]) -> Dict[int, Dict[str, Any]]:
+        """
+        Categorize uncached documents with CATEGORIZATION_SETTINGS['batch_size']
+        documents per LLM call
+        
+        Returns:
+            Validated results keyed by position in documents. Documents that are
+            cached, too short, missing from a response or given an unusable result
+            are left out for categorize_document to handle one at a time.
+        """
+        
+        settings = self.config.CATEGORIZATION_SETTINGS
+        batch_size = settings['batch_size']
+        max_length = settings['max_content_length']
+        
+        pending = []
+        for index, document in enumerate(documents):
+            content = document.page_content[:max_length].strip()
+            if len(content) < 50:
+                continue
+            
+            content_hash = self._create_content_hash(document.page_content)
+            if settings['use_cache'] and content_hash in self.categorization_cache:
+                continue
+            
+            pending.append((index, content, content_hash))
+        
+        # Documents the local tiers settle never reach an LLM batch
+        results = {}
+        unsettled = []
+        for (index, content, content_hash), local_result in zip(
+                pending, self._local_classify([content for _, content, _ in pending])):
+            if not self._is_confident_local(local_result):
+                unsettled.append((index, content, content_hash))
+                continue
+            
+            results[index] = self._validate_and_enhance_result(local_result, documents[index], content_hash)
+            with self._cache_lock:
+                self._record(local_classifier_categorizations=1, total_categorizations=1)
+                if settings['use_cache']:
+                    self._cache_result(content_hash, results[index], content)
+        
+        vectors = {}
+        escalated = []
+        for (index, content, content_hash), (centroid_result, vector) in zip(
+                unsettled, self._centroid_categorize([content for _, content, _ in unsettled])):
+            vectors[index] = vector
+            if centroid_result is None:
+                escalated.append((index, content, content_hash))
+                continue
+            
+            results[index] = self._validate_and_enhance_result(centroid_result, documents[index], content_hash)
+            with self._cache_lock:
+                self._record(centroid_categorizations=1, total_categorizations=1)
+                if settings['use_cache']:
+                    self._cache_result(content_hash, results[index], content)
+        
+        # A trailing batch of one gains nothing over an individual call
+        batches = [escalated[start:start + batch_size] for start in range(0, len(escalated), batch_size)]
+        batches = [batch for batch in batches if len(batch) > 1]
+        
+        with ThreadPoolExecutor(max_workers=self._concurrency(len(batches))) as executor:
+            for batch_results in executor.map(lambda batch: self._categorize_batch(batch, documents), batches):
+                for index, result in batch_results.items():
+                    self._learn_centroid(result, vectors[index])
+                results.update(batch_results)
+        
+        if results and settings['use_cache']:
+            with self._cache_lock:
+                self._save_categorization_cache()
+        
+        return results
+    
+    def _categorize_batch(self, batch: List[Tuple[int, str, str]], documents: List[Document]) -> Dict[int, Dict[str, Any]]:
+        """Categorize one batch of (index, content, content hash) in a single LLM call"""
+        
+        try:
+            # Ids are positions within the batch, which keeps them short and unambiguous
+            items = self._llm_categorize_batch([(position, content) for position, (_, content, _) in enumerate(batch, 1)])
+        except Exception as e:
+            logger.warning(f"Batched categorization of {len(batch)} documents failed: {e}, "
+                           f"categorizing them individually")
+            return {}
+        
+        results = {}
+        for position, (index, _, content_hash) in enumerate(batch, 1):
+            item = items.get(position)
+            if not item or item.get('category') not in self.config.LEGAL_CATEGORIES:
+                continue
+            
+            try:
+                item['method'] = 'llm_batch'
+                results[index] = self._validate_and_enhance_result(item, documents[index], content_hash)
+            except Exception as e:
+                logger.warning(f"Unusable batched categorization for document {index + 1}: {e}")
+        
+        with self._cache_lock:
+            self._record(batch_llm_calls=1, llm_categorizations=len(results),
+                         batched_categorizations=len(results), total_categorizations=len(results))
+            
+            if self.config.CATEGORIZATION_SETTINGS['use_cache']:
+                for index, content, content_hash in batch:
+                    if index in results:
+                        self._cache_result(content_hash, results[index], content)
+        
+        missing = len(batch) - len(results)
+        if missing:
+            logger.info(f"{missing} of {len(batch)} documents missing from a batch response, "
+                        f"retrying them individually")
+        
+        return results
+    
     def _parse_non_json_response(self, response_text: str, content: str) -> Dict[str, Any]:
         """Parse non-JSON LLM responses as fallback"""
         
@@ -302,26 +844,13 @@ class DocumentCategorizer:
             Categorization result dictionary
         """
         
-        content_lower = content.lower()
-        
-        # Score each category based on keyword matches
+        # Score each category based on keyword matches, all counted in one pass
         category_scores = {}
         found_keywords = {}
         
-        for category, keywords in self.config.CATEGORY_KEYWORDS.items():
-            score = 0
-            matched_keywords = []
-            
-            for keyword in keywords:
-                # Count occurrences of each keyword
-                keyword_count = content_lower.count(keyword.lower())
-                if keyword_count > 0:
-                    score += keyword_count
-                    matched_keywords.append(keyword)
-            
-            if score > 0:
-                category_scores[category] = score
-                found_keywords[category] = matched_keywords
+        for category, keyword_hits in self.keyword_matcher.find_all(content).items():
+            category_scores[category] = sum(keyword_hits.values())
+            found_keywords[category] = list(keyword_hits)
         
         # Determine best category
         if category_scores:
@@ -417,6 +946,14 @@ class DocumentCategorizer:
         if 'key_indicators' not in result:
             result['key_indicators'] = []
         
+        # Record which pages a sampled categorization looked at and relied on
+        sampled_pages = document.metadata.get('sampled_pages') if document else None
+        if sampled_pages:
+            result['sampled_pages'] = sampled_pages
+            result['decisive_pages'] = self._decisive_pages(result, document.page_content, sampled_pages)
+        else:
+            result.pop('evidence_pages', None)
+        
         return result
     
     def _create_default_categorization(self, document: Document, reason: str, 
@@ -439,6 +976,12 @@ class DocumentCategorizer:
         """
         Categorize multiple documents with progress tracking
         
+        With CATEGORIZATION_SETTINGS['batch_size'] above 1, uncached documents are
+        sent several to an LLM call, so the category catalog in the prompt is paid
+        for once per batch; documents a batch response misses are retried one at a time.
+        Batches and individual calls run on up to 'max_concurrency' threads, paced by
+        the rate limiter; results keep the order of documents.
+        
         Args:
             documents: List of Document objects to categorize
             
@@ -451,12 +994,21 @@ class DocumentCategorizer:
         
         logger.info(f"Starting categorization of {total_docs} documents")
         
+        batched_results = {}
+        if (self.config.CATEGORIZATION_SETTINGS['batch_size'] > 1 or self.centroid_categorizer is not None) and total_docs > 1:
+            batched_results = self._categorize_in_batches(documents)
+        
+        # Start the remaining documents' calls up front; results are collected in input order below
+        remaining = [index for index in range(total_docs) if index not in batched_results]
+        executor = ThreadPoolExecutor(max_workers=self._concurrency(len(remaining)))
+        futures = {index: executor.submit(self.categorize_document, documents[index]) for index in remaining}
+        
         for i, document in enumerate(documents, 1):
             try:
                 logger.info(f"Categorizing document {i}/{total_docs}: "
                            f"{document.metadata.get('source', 'Unknown')}")
                 
-                categorization = self.categorize_document(document)
+                categorization = batched_results.get(i - 1) or futures[i - 1].result()
                 
                 # Add categorization info to document metadata
                 document.metadata.update({
@@ -490,6 +1042,8 @@ class DocumentCategorizer:
                     'category_name': 'Other Legal Document'
                 })
         
+        executor.shutdown()
+        
         logger.info(f"Categorization completed: {len(categorizations)} results")
         self._log_categorization_summary(categorizations)
         
@@ -604,7 +1158,7 @@ class DocumentCategorizer:
                 'name': self.config.LEGAL_CATEGORIES.get(least_common, least_common) if least_common else None,
                 'count': category_counts.get(least_common, 0) if least_common else 0
             },
-            'categorizer_stats': self.categorization_stats.copy()
+            'categorizer_stats': self._stats_snapshot()
         }
     
     def export_categorizations(self, categorizations: List[Dict[str, Any]], 
@@ -672,17 +1226,32 @@ class DocumentCategorizer:
         return {
             'cache_statistics': {
                 'cache_size': cache_size,
-                'cache_enabled': self.config.CATEGORIZATION_SETTINGS['use_cache']
+                'cache_enabled': self.config.CATEGORIZATION_SETTINGS['use_cache'],
+                'cache_backend': 'sqlite' if isinstance(self.categorization_cache, CategorizationStore) else 'memory',
+                'cache_max_entries': self.config.CATEGORIZATION_SETTINGS['cache_max_entries']
             },
-            'performance_stats': self.categorization_stats.copy(),
+            'performance_stats': self._stats_snapshot(),
+            'rate_limiter_stats': self.rate_limiter.get_stats(),
+            'centroid_stats': self.centroid_categorizer.get_stats() if self.centroid_categorizer else {'enabled': False},
+            'local_classifier_stats': self.local_classifier.report if self.local_classifier else {'trained': False},
             'configuration': {
                 'total_categories': len(self.config.LEGAL_CATEGORIES),
                 'min_confidence_threshold': self.config.CATEGORIZATION_SETTINGS['min_confidence_threshold'],
                 'max_content_length': self.config.CATEGORIZATION_SETTINGS['max_content_length'],
+                'sample_pages': self.config.CATEGORIZATION_SETTINGS['sample_pages'],
+                'batch_size': self.config.CATEGORIZATION_SETTINGS['batch_size'],
+                'max_concurrency': self.config.CATEGORIZATION_SETTINGS['max_concurrency'],
                 'fallback_enabled': self.config.CATEGORIZATION_SETTINGS['fallback_enabled']
             }
         }
     
+    def close(self):
+        """Save the statistics and close this thread's cache connection, e.g. at shutdown"""
+        with self._cache_lock:
+            self._save_categorization_cache()
+            if isinstance(self.categorization_cache, CategorizationStore):
+                self.categorization_cache.close()
+    
     def clear_cache(self) -> bool:
         """Clear categorization cache"""
         
@@ -697,13 +1266,10 @@ class DocumentCategorizer:
                 os.remove(cache_file)
             
             # Reset stats
-            self.categorization_stats = {
-                'total_categorizations': 0,
-                'cache_hits': 0,
-                'llm_categorizations': 0,
-                'fallback_categorizations': 0,
-                'failed_categorizations': 0
-            }
+            with self._stats_lock:
+                for key in self.categorization_stats:
+                    self.categorization_stats[key] = 0
+            self._save_categorization_cache()
             
             logger.info("Categorization cache cleared successfully")
             return True
@@ -1,30 +1,46 @@
 import os
-import re
+import time
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Iterable, Iterator, Union
 
-from langchain_community.document_loaders import (
-    UnstructuredPDFLoader,
-    PyPDFLoader, 
-    TextLoader,
-    Docx2txtLoader
-)
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
+from pypdf import PdfReader
 
 from config import Config
 from document_categorizer import DocumentCategorizer
+from parsed_text_cache import ParsedTextCache
+from text_chunker import ChunkSpans, SpanChunker, TokenChunker, ClauseChunker
+from text_normalizer import normalize_text
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever loading or _preprocess_text output changes, so cached parses are not reused
+PREPROCESSING_VERSION = "1"
+
+# PDF loader decisions remembered for the lifetime of this process
+_PDF_LOADER_STATE = {
+    'unstructured_unavailable': None,  # Reason UnstructuredPDFLoader cannot be used here, if any
+    'unstructured_failures': 0  # Consecutive runtime failures of UnstructuredPDFLoader
+}
+
+# Failures that come from the environment (missing poppler or tesseract), not from the file
+_MISSING_TOOL_MARKERS = ('poppler', 'tesseract', 'not installed', 'not in path')
+
 class DocumentProcessor:
     """Handles document loading, preprocessing, categorization, and text splitting"""
     
-    def __init__(self):
+    def __init__(self, enable_categorization: bool = True, categorizer: DocumentCategorizer = None):
         self.config = Config()
-        self.categorizer = DocumentCategorizer()
+        # Parse-only processors (e.g. ingestion worker processes) never touch the LLM
+        self.categorizer = (categorizer or DocumentCategorizer()) if enable_categorization else None
+        self.last_load_timings = []
+        self.parsed_text_cache = (ParsedTextCache(PREPROCESSING_VERSION)
+                                  if self.config.PARSED_TEXT_CACHE_SETTINGS['enabled'] else None)
         self._setup_text_splitter()
     
     def _setup_text_splitter(self):
@@ -35,27 +51,41 @@ class DocumentProcessor:
             length_function=len,
             separators=["\n\n", "\n", ". ", " ", ""]
         )
+        self.span_chunker = SpanChunker(
+            chunk_size=self.config.CHUNK_SIZE,
+            chunk_overlap=self.config.CHUNK_OVERLAP
+        )
+        
+        # Token budget: a chunk must fit the embedding model, and TOP_K chunks the retrieval context
+        chunking = self.config.CHUNKING_SETTINGS
+        target_tokens = chunking['target_tokens'] or min(
+            chunking['embedding_max_tokens'],
+            self.config.RETRIEVAL_MAX_TOKENS // self.config.TOP_K
+        )
+        self.token_chunker = TokenChunker(
+            target_tokens=target_tokens,
+            overlap_tokens=chunking['overlap_tokens']
+        )
+        self.clause_chunker = ClauseChunker(
+            min_chars=chunking['clause_min_chars'],
+            max_chars=chunking['clause_max_chars'],
+            chunk_overlap=self.config.CHUNK_OVERLAP
+        )
+    
+    def _get_span_splitter(self):
+        """Span-producing splitter for the configured chunking strategy, or None for 'recursive'"""
+        strategy = self.config.CHUNKING_SETTINGS['strategy']
+        if strategy == 'spans':
+            return self.span_chunker
+        if strategy == 'tokens':
+            return self.token_chunker
+        if strategy == 'clauses':
+            return self.clause_chunker
+        return None
     
     def _preprocess_text(self, text: str) -> str:
         """Basic text preprocessing and cleaning for legal documents"""
-        
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove excessive punctuation
-        text = re.sub(r'[.]{3,}', '...', text)
-        
-        # Clean up common PDF artifacts and special characters
-        text = re.sub(r'[^\w\s.,;:!?()"\'-]', ' ', text)
-        
-        # Fix common OCR issues in legal documents
-        text = re.sub(r'\b(\w)\s+(\w)\b', r'\1\2', text)  # Fix scattered letters
-        
-        # Normalize legal document formatting
-        text = re.sub(r'\n+', '\n', text)  # Multiple newlines to single
-        text = re.sub(r'\s*\n\s*', '\n', text)  # Clean up newline spacing
-        
-        return text.strip()
+        return normalize_text(text)
     
     def _extract_metadata(self, file_path: str, doc_type: str) -> Dict[str, Any]:
         """Extract metadata from document"""
@@ -83,8 +113,8 @@ class DocumentProcessor:
         
         return type_mapping.get(extension, 'Unknown Document Type')
     
-    def load_single_document(self, file_path: str, categorize: bool = True) -> Tuple[List[Document], Dict[str, Any]]:
-        """Load a single document and optionally categorize it"""
+    def _validate_file(self, file_path: str) -> str:
+        """Check that a file exists and has a supported extension, returning the extension"""
         
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File not found: {file_path}")
@@ -94,65 +124,286 @@ class DocumentProcessor:
         if file_extension not in self.config.ALLOWED_EXTENSIONS:
             raise ValueError(f"Unsupported file type: {file_extension}")
         
-        try:
-            documents = []
-            doc_type = self._detect_document_type(file_path)
-            
-            if file_extension == '.pdf':
-                # Try UnstructuredPDFLoader first, fallback to PyPDFLoader
+        return file_extension
+    
+    def _iter_raw_pages(self, file_path: str, file_extension: str) -> Iterator[Document]:
+        """Yield raw pages from the appropriate loader without holding the whole document"""
+        
+        # Loaders (and the unstructured/docx packages behind them) are imported on first use of their file type
+        if file_extension == '.pdf':
+            if self._select_pdf_loader(file_path) == 'unstructured':
+                yielded = False
                 try:
-                    loader = UnstructuredPDFLoader(file_path)
-                    documents = loader.load()
+                    from langchain_community.document_loaders import UnstructuredPDFLoader
+                    
+                    for doc in UnstructuredPDFLoader(file_path).lazy_load():
+                        yielded = True
+                        yield doc
+                    _PDF_LOADER_STATE['unstructured_failures'] = 0
                     logger.info(f"Loaded PDF using UnstructuredPDFLoader: {file_path}")
+                    return
+                except ImportError as e:
+                    if yielded:
+                        raise
+                    # A missing dependency fails the same way for every file, so stop trying it
+                    _PDF_LOADER_STATE['unstructured_unavailable'] = str(e)
+                    logger.warning(f"UnstructuredPDFLoader unavailable, using PyPDFLoader for this process: {e}")
                 except Exception as e:
+                    if yielded:
+                        raise
+                    self._record_unstructured_failure(e)
                     logger.warning(f"UnstructuredPDFLoader failed, trying PyPDFLoader: {e}")
-                    loader = PyPDFLoader(file_path)
-                    documents = loader.load()
-                    logger.info(f"Loaded PDF using PyPDFLoader: {file_path}")
-                
-            elif file_extension in ['.docx', '.doc']:
-                loader = Docx2txtLoader(file_path)
-                documents = loader.load()
-                logger.info(f"Loaded Word document: {file_path}")
-                
-            elif file_extension == '.txt':
-                loader = TextLoader(file_path, encoding='utf-8')
-                documents = loader.load()
-                logger.info(f"Loaded text file: {file_path}")
             
-            # Process and clean documents
-            metadata = self._extract_metadata(file_path, doc_type)
-            processed_docs = []
+            from langchain_community.document_loaders import PyPDFLoader
             
-            for i, doc in enumerate(documents):
-                # Preprocess content
-                doc.page_content = self._preprocess_text(doc.page_content)
-                
-                # Update metadata
-                doc.metadata.update(metadata)
-                doc.metadata['page_number'] = i + 1
-                doc.metadata['total_pages'] = len(documents)
-                
-                # Only keep documents with meaningful content
-                if len(doc.page_content.strip()) > 50:  # Minimum content threshold
-                    processed_docs.append(doc)
+            yield from PyPDFLoader(file_path).lazy_load()
+            logger.info(f"Loaded PDF using PyPDFLoader: {file_path}")
             
-            # Categorize the document if requested
-            categorization_result = None
-            if categorize and processed_docs:
-                # Use the first meaningful document for categorization
-                categorization_result = self.categorizer.categorize_document(processed_docs[0])
-                
-                # Add category information to all document chunks
-                for doc in processed_docs:
-                    doc.metadata.update({
+        elif file_extension in ['.docx', '.doc']:
+            from langchain_community.document_loaders import Docx2txtLoader
+            
+            yield from Docx2txtLoader(file_path).lazy_load()
+            logger.info(f"Loaded Word document: {file_path}")
+            
+        elif file_extension == '.txt':
+            from langchain_community.document_loaders import TextLoader
+            
+            yield from TextLoader(file_path, encoding='utf-8').lazy_load()
+            logger.info(f"Loaded text file: {file_path}")
+    
+    def _has_text_layer(self, file_path: str) -> bool:
+        """Cheaply check whether a PDF has an extractable text layer by sampling its first pages"""
+        settings = self.config.PDF_LOADER_SETTINGS
+        
+        try:
+            reader = PdfReader(file_path)
+            sample = reader.pages[:settings['text_layer_sample_pages']]
+            if not sample:
+                return False
+            
+            text_chars = sum(len((page.extract_text() or '').strip()) for page in sample)
+            return text_chars / len(sample) >= settings['min_text_chars_per_page']
+            
+        except Exception as e:
+            logger.warning(f"Could not probe PDF text layer for {file_path}: {e}")
+            return False
+    
+    def _record_unstructured_failure(self, error: Exception):
+        """
+        Stop trying UnstructuredPDFLoader for this process once its failures look environmental:
+        a missing tool, or several files in a row (one corrupt file alone does not disable it)
+        """
+        _PDF_LOADER_STATE['unstructured_failures'] += 1
+        failures = _PDF_LOADER_STATE['unstructured_failures']
+        message = f"{type(error).__name__} {error}".lower()
+        
+        if any(marker in message for marker in _MISSING_TOOL_MARKERS):
+            reason = f"required tool missing: {error}"
+        elif failures >= self.config.PDF_LOADER_SETTINGS['unstructured_max_failures']:
+            reason = f"{failures} consecutive failures, last: {error}"
+        else:
+            return
+        
+        _PDF_LOADER_STATE['unstructured_unavailable'] = reason
+        logger.warning(f"UnstructuredPDFLoader disabled, using PyPDFLoader for this process ({reason})")
+    
+    def _select_pdf_loader(self, file_path: str) -> str:
+        """Pick 'pypdf' for PDFs with a text layer and 'unstructured' for scanned or layout-heavy ones"""
+        
+        if _PDF_LOADER_STATE['unstructured_unavailable']:
+            return 'pypdf'
+        
+        strategy = 'pypdf' if self._has_text_layer(file_path) else 'unstructured'
+        logger.info(f"Selected {strategy} loader for PDF: {file_path}")
+        return strategy
+    
+    def _clean_page(self, doc: Document, metadata: Dict[str, Any], page_number: int) -> Optional[Document]:
+        """Preprocess one page and attach file metadata, dropping pages without meaningful content"""
+        
+        # Preprocess content
+        doc.page_content = self._preprocess_text(doc.page_content)
+        
+        # Update metadata
+        doc.metadata.update(metadata)
+        doc.metadata['page_number'] = page_number
+        
+        # Only keep documents with meaningful content
+        if len(doc.page_content.strip()) > 50:  # Minimum content threshold
+            return doc
+        return None
+    
+    def _read_parsed_cache(self, file_path: str) -> Tuple[Optional[str], Optional[List[Document]]]:
+        """Look up a file in the parsed text cache, returning (cache key, cached pages or None)"""
+        
+        if self.parsed_text_cache is None:
+            return None, None
+        
+        cache_key = self.parsed_text_cache.make_key(file_path)
+        cached_pages = self.parsed_text_cache.get(cache_key)
+        if cached_pages is None:
+            return cache_key, None
+        
+        # File-specific metadata is refreshed, since the same bytes may arrive under another name
+        metadata = self._extract_metadata(file_path, self._detect_document_type(file_path))
+        documents = []
+        for page in cached_pages:
+            page_metadata = dict(page['metadata'])
+            page_metadata.update(metadata)
+            documents.append(Document(page_content=page['page_content'], metadata=page_metadata))
+        
+        logger.info(f"Loaded {len(documents)} cached pages for: {file_path}")
+        return cache_key, documents
+    
+    def parse_document(self, file_path: str) -> List[Document]:
+        """Load a single document and return its cleaned pages without categorization"""
+        
+        cache_key, documents, is_cached = self.load_raw_pages(file_path)
+        if is_cached:
+            return documents
+        
+        return self.preprocess_pages(file_path, documents, cache_key)
+    
+    def load_raw_pages(self, file_path: str) -> Tuple[Optional[str], List[Document], bool]:
+        """
+        Load step of parse_document: returns (cache key, pages, is_cached)
+        
+        On a parsed text cache hit the pages are already cleaned; otherwise they
+        are raw loader output for preprocess_pages.
+        """
+        file_extension = self._validate_file(file_path)
+        
+        cache_key, cached_docs = self._read_parsed_cache(file_path)
+        if cached_docs is not None:
+            return cache_key, cached_docs, True
+        
+        return cache_key, list(self._iter_raw_pages(file_path, file_extension)), False
+    
+    def preprocess_pages(self, file_path: str, documents: List[Document],
+                         cache_key: Optional[str] = None) -> List[Document]:
+        """Preprocess step of parse_document: clean raw pages and store them in the parsed text cache"""
+        
+        # Process and clean documents
+        metadata = self._extract_metadata(file_path, self._detect_document_type(file_path))
+        processed_docs = []
+        
+        for i, doc in enumerate(documents):
+            doc.metadata['total_pages'] = len(documents)
+            cleaned = self._clean_page(doc, metadata, i + 1)
+            if cleaned is not None:
+                processed_docs.append(cleaned)
+        
+        if cache_key is not None:
+            self.parsed_text_cache.put(cache_key, [
+                {'page_content': doc.page_content, 'metadata': doc.metadata}
+                for doc in processed_docs
+            ])
+        
+        return processed_docs
+    
+    def iter_document_pages(self, file_path: str, categorize: bool = False,
+                            categorizations: List[Dict[str, Any]] = None) -> Iterator[Document]:
+        """
+        Stream cleaned pages of a document one at a time
+        
+        Unlike parse_document, only the current page is held in memory, so
+        'total_pages' is not known and is left out of the page metadata, and
+        the parsed text cache is bypassed.
+        
+        Args:
+            file_path: Path of the document to stream
+            categorize: Categorize on the first meaningful page and stamp the
+                        result onto every page yielded after it
+            categorizations: Optional list the categorization result is appended to
+        """
+        file_extension = self._validate_file(file_path)
+        metadata = self._extract_metadata(file_path, self._detect_document_type(file_path))
+        categorization_result = None
+        
+        for i, doc in enumerate(self._iter_raw_pages(file_path, file_extension)):
+            cleaned = self._clean_page(doc, metadata, i + 1)
+            if cleaned is None:
+                continue
+            
+            if categorize:
+                if categorization_result is None:
+                    categorization_result = self._categorize_pages([cleaned])
+                    if categorizations is not None:
+                        categorizations.append(categorization_result)
+                else:
+                    cleaned.metadata.update({
                         'category': categorization_result['category'],
                         'category_confidence': categorization_result['confidence'],
                         'category_explanation': categorization_result['explanation']
                     })
-                
-                logger.info(f"Document categorized as: {categorization_result['category']} "
-                          f"(confidence: {categorization_result['confidence']:.2f})")
+            
+            yield cleaned
+    
+    def _categorize_pages(self, processed_docs: List[Document]) -> Optional[Dict[str, Any]]:
+        """Categorize a parsed document and stamp the category onto all of its pages"""
+        
+        if not processed_docs:
+            return None
+        
+        if self.categorizer is None:
+            raise ValueError("Categorization is disabled for this DocumentProcessor")
+        
+        # Sample representative pages rather than only the first, which is often a cover or contents page
+        categorization_result = self.categorizer.categorize_pages(processed_docs)
+        self._stamp_category(processed_docs, categorization_result)
+        
+        logger.info(f"Document categorized as: {categorization_result['category']} "
+                  f"(confidence: {categorization_result['confidence']:.2f})")
+        
+        return categorization_result
+    
+    def _stamp_category(self, processed_docs: List[Document], categorization_result: Dict[str, Any]):
+        """Add category information to all pages of a document"""
+        for doc in processed_docs:
+            doc.metadata.update({
+                'category': categorization_result['category'],
+                'category_confidence': categorization_result['confidence'],
+                'category_explanation': categorization_result['explanation']
+            })
+    
+    def _batch_categorization_enabled(self) -> bool:
+        return self.categorizer is not None and self.config.CATEGORIZATION_SETTINGS['batch_size'] > 1
+    
+    def _categorize_parsed_batched(self, entries: List[list]):
+        """
+        Categorize parsed files together, several per LLM call
+        
+        Args:
+            entries: [file_path, docs, categorization, timing, error] lists, updated in place.
+                     The batch time is spread evenly over the files' categorize_seconds.
+        """
+        pending = [entry for entry in entries if entry[4] is None and entry[1]]
+        if not pending:
+            return
+        
+        start = time.perf_counter()
+        try:
+            categorizations = self.categorizer.categorize_page_sets([entry[1] for entry in pending])
+        except Exception as e:
+            for entry in pending:
+                entry[4] = e
+            return
+        per_file_seconds = round((time.perf_counter() - start) / len(pending), 4)
+        
+        for entry, categorization in zip(pending, categorizations):
+            self._stamp_category(entry[1], categorization)
+            entry[2] = categorization
+            entry[3]['categorize_seconds'] = per_file_seconds
+    
+    def load_single_document(self, file_path: str, categorize: bool = True) -> Tuple[List[Document], Dict[str, Any]]:
+        """Load a single document and optionally categorize it"""
+        
+        try:
+            processed_docs = self.parse_document(file_path)
+            
+            # Categorize the document if requested
+            categorization_result = None
+            if categorize and processed_docs:
+                categorization_result = self._categorize_pages(processed_docs)
             
             logger.info(f"Processed {len(processed_docs)} pages from {file_path}")
             return processed_docs, categorization_result
@@ -161,31 +412,58 @@ class DocumentProcessor:
             logger.error(f"Error loading document {file_path}: {e}")
             raise
     
-    def load_multiple_documents(self, file_paths: List[str], categorize: bool = True) -> Tuple[List[Document], List[Dict[str, Any]]]:
-        """Load multiple documents and categorize them"""
+    def load_multiple_documents(self, file_paths: List[str], categorize: bool = True,
+                                parallel: bool = None) -> Tuple[List[Document], List[Dict[str, Any]]]:
+        """
+        Load multiple documents and categorize them
+        
+        Args:
+            file_paths: Paths of the documents to load
+            categorize: Whether to categorize each document
+            parallel: Parse in a process pool and categorize in a thread pool.
+                      Defaults to INGESTION_SETTINGS, which only parallelizes larger batches.
+        
+        Returns:
+            Tuple of (all pages in input file order, categorizations in input file order).
+            Per-file timings are available afterwards in ``last_load_timings``.
+        """
+        settings = self.config.INGESTION_SETTINGS
+        if parallel is None:
+            parallel = (settings['parallel_enabled'] and
+                        len(file_paths) >= settings['parallel_min_files'])
+        
+        if parallel:
+            results = self._load_files_parallel(file_paths, categorize)
+        else:
+            results = self._load_files_sequential(file_paths, categorize)
+        
         all_documents = []
         all_categorizations = []
         failed_files = []
+        self.last_load_timings = []
         
-        for file_path in file_paths:
-            try:
-                docs, categorization = self.load_single_document(file_path, categorize=categorize)
-                all_documents.extend(docs)
-                
-                if categorization:
-                    all_categorizations.append(categorization)
-                
-                logger.info(f"Successfully loaded: {file_path} "
-                          f"(Category: {categorization['category'] if categorization else 'N/A'})")
-                
-            except Exception as e:
-                logger.error(f"Failed to load {file_path}: {e}")
+        # Results are ordered like file_paths, whatever order the workers finished in
+        for file_path, docs, categorization, timing, error in results:
+            self.last_load_timings.append(timing)
+            
+            if error is not None:
+                logger.error(f"Failed to load {file_path}: {error}")
                 failed_files.append(file_path)
                 continue
+            
+            all_documents.extend(docs)
+            
+            if categorization:
+                all_categorizations.append(categorization)
+            
+            logger.info(f"Successfully loaded: {file_path} "
+                      f"(Category: {categorization['category'] if categorization else 'N/A'})")
         
         if failed_files:
             logger.warning(f"Failed to load {len(failed_files)} files: {failed_files}")
         
+        self._log_load_timings()
+        
         if not all_documents:
             raise ValueError("No documents were successfully loaded")
         
@@ -194,8 +472,139 @@ class DocumentProcessor:
         
         return all_documents, all_categorizations
     
-    def split_documents(self, documents: List[Document]) -> List[Document]:
-        """Split documents into smaller chunks for processing"""
+    def _load_files_sequential(self, file_paths: List[str], categorize: bool) -> List[Tuple]:
+        """Parse and categorize files one at a time, or categorize them in batches once all are parsed"""
+        results = []
+        batched = categorize and self._batch_categorization_enabled() and len(file_paths) > 1
+        
+        for file_path in file_paths:
+            timing = {'file': file_path, 'parse_seconds': 0.0, 'categorize_seconds': 0.0, 'pages': 0}
+            
+            try:
+                start = time.perf_counter()
+                docs = self.parse_document(file_path)
+                timing['parse_seconds'] = round(time.perf_counter() - start, 4)
+                timing['pages'] = len(docs)
+                
+                categorization = None
+                if categorize and docs and not batched:
+                    start = time.perf_counter()
+                    categorization = self._categorize_pages(docs)
+                    timing['categorize_seconds'] = round(time.perf_counter() - start, 4)
+                
+                results.append([file_path, docs, categorization, timing, None])
+            
+            except Exception as e:
+                results.append([file_path, [], None, timing, e])
+        
+        if batched:
+            self._categorize_parsed_batched(results)
+        
+        for entry in results:
+            entry[3]['status'] = 'success' if entry[4] is None else 'failed'
+        
+        return [tuple(entry) for entry in results]
+    
+    def _load_files_parallel(self, file_paths: List[str], categorize: bool) -> List[Tuple]:
+        """Parse files in a process pool, then categorize them in batches or a bounded thread pool"""
+        settings = self.config.INGESTION_SETTINGS
+        parse_workers = max(1, min(settings['max_parse_workers'], len(file_paths)))
+        
+        logger.info(f"Parsing {len(file_paths)} files with {parse_workers} worker processes")
+        
+        parsed = [None] * len(file_paths)
+        pending_parses = {}
+        
+        # Spawned workers avoid inheriting the parent's gRPC/LLM client threads
+        with ProcessPoolExecutor(max_workers=parse_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            for index, file_path in enumerate(file_paths):
+                timing = {'file': file_path, 'parse_seconds': 0.0, 'categorize_seconds': 0.0, 'pages': 0}
+                try:
+                    # Cache hits are served here, only misses go to a worker process
+                    start = time.perf_counter()
+                    self._validate_file(file_path)
+                    _, cached_docs = self._read_parsed_cache(file_path)
+                except Exception as e:
+                    timing['status'] = 'failed'
+                    parsed[index] = [file_path, [], None, timing, e]
+                    continue
+                
+                if cached_docs is not None:
+                    timing.update({'parse_seconds': round(time.perf_counter() - start, 4), 'pages': len(cached_docs)})
+                    parsed[index] = [file_path, cached_docs, None, timing, None]
+                else:
+                    pending_parses[index] = (timing, executor.submit(_parse_document_worker, file_path))
+            
+            for index, (timing, future) in pending_parses.items():
+                file_path = file_paths[index]
+                try:
+                    docs, parse_seconds = future.result()
+                    timing.update({'parse_seconds': round(parse_seconds, 4), 'pages': len(docs)})
+                    parsed[index] = [file_path, docs, None, timing, None]
+                except Exception as e:
+                    timing['status'] = 'failed'
+                    parsed[index] = [file_path, [], None, timing, e]
+        
+        if categorize and self._batch_categorization_enabled():
+            self._categorize_parsed_batched(parsed)
+        elif categorize:
+            pending = [entry for entry in parsed if entry[4] is None and entry[1]]
+            category_workers = max(1, min(settings['max_categorization_workers'], len(pending) or 1))
+            
+            with ThreadPoolExecutor(max_workers=category_workers) as executor:
+                futures = [(entry, executor.submit(self._timed_categorize_pages, entry[1])) for entry in pending]
+                
+                for entry, future in futures:
+                    try:
+                        entry[2], entry[3]['categorize_seconds'] = future.result()
+                    except Exception as e:
+                        entry[4] = e
+        
+        for entry in parsed:
+            entry[3].setdefault('status', 'success' if entry[4] is None else 'failed')
+        
+        return [tuple(entry) for entry in parsed]
+    
+    def _timed_categorize_pages(self, docs: List[Document]) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Categorize a parsed document and report how long it took"""
+        start = time.perf_counter()
+        categorization = self._categorize_pages(docs)
+        return categorization, round(time.perf_counter() - start, 4)
+    
+    def _log_load_timings(self, top_n: int = 5):
+        """Log the files that dominated the last multi-file load"""
+        
+        if not self.last_load_timings:
+            return
+        
+        slowest = sorted(
+            self.last_load_timings,
+            key=lambda t: t['parse_seconds'] + t['categorize_seconds'],
+            reverse=True
+        )[:top_n]
+        
+        logger.info("Slowest files in this batch:")
+        for timing in slowest:
+            logger.info(f"  {os.path.basename(timing['file'])}: parse {timing['parse_seconds']:.2f}s, "
+                        f"categorize {timing['categorize_seconds']:.2f}s, {timing['pages']} pages "
+                        f"({timing['status']})")
+    
+    def split_documents(self, documents: List[Document]) -> Union[List[Document], ChunkSpans]:
+        """
+        Split documents into smaller chunks for processing
+        
+        With the 'spans', 'tokens' and 'clauses' chunking strategies the chunks come
+        back as ChunkSpans, which holds character offsets into the pages and builds
+        chunk text on demand.
+        """
+        span_splitter = self._get_span_splitter()
+        if span_splitter is not None:
+            chunks = span_splitter.split_pages(documents)
+            logger.info(f"Split {len(documents)} documents into {len(chunks)} chunk spans")
+            self._categorize_chunks(chunks)
+            return chunks
+        
         try:
             chunks = self.text_splitter.split_documents(documents)
             
@@ -206,15 +615,76 @@ class DocumentProcessor:
                 chunk.metadata['total_chunks'] = len(chunks)
             
             logger.info(f"Split {len(documents)} documents into {len(chunks)} chunks")
+            self._categorize_chunks(chunks)
             return chunks
             
         except Exception as e:
             logger.error(f"Error splitting documents: {e}")
             raise
     
-    def group_documents_by_category(self, documents: List[Document]) -> Dict[str, List[Document]]:
+    def iter_split_documents(self, documents: Iterable[Document], start_chunk_id: int = 0) -> Iterator[Document]:
+        """Split a stream of pages into chunks lazily, one page at a time"""
+        
+        span_splitter = self._get_span_splitter()
+        chunk_id = start_chunk_id
+        for document in documents:
+            if span_splitter is not None:
+                page_chunks = span_splitter.split_pages([document])
+                page_chunks = [self._without_total_chunks(chunk) for chunk in page_chunks]
+            else:
+                page_chunks = self.text_splitter.split_documents([document])
+            
+            # A stream is categorized a page at a time, so LLM escalations batch within a page
+            self._categorize_chunks(page_chunks)
+            
+            for chunk in page_chunks:
+                chunk.metadata['chunk_id'] = chunk_id
+                chunk.metadata['chunk_size'] = len(chunk.page_content)
+                chunk_id += 1
+                yield chunk
+    
+    def _categorize_chunks(self, chunks: Union[List[Document], ChunkSpans]):
+        """
+        With CATEGORIZATION_SETTINGS['chunk_level'], give chunks that belong elsewhere
+        their own category, keeping the document's as 'document_category'
+        """
+        if self.categorizer is None or not self.config.CATEGORIZATION_SETTINGS['chunk_level'] or not len(chunks):
+            return
+        
+        if isinstance(chunks, ChunkSpans):
+            texts = chunks.texts()
+            document_categories = [chunks.pages[page_id].metadata.get('category', 'other') for page_id in chunks.page_ids]
+        else:
+            texts = [chunk.page_content for chunk in chunks]
+            document_categories = [chunk.metadata.get('category', 'other') for chunk in chunks]
+        
+        for index, categorization in enumerate(self.categorizer.categorize_chunks(texts, document_categories)):
+            if categorization is None:
+                continue
+            
+            values = {
+                'category': categorization['category'],
+                'category_confidence': categorization['confidence'],
+                'category_explanation': categorization['explanation'],
+                'document_category': document_categories[index]
+            }
+            if isinstance(chunks, ChunkSpans):
+                chunks.set_extra_metadata(index, values)
+            else:
+                chunks[index].metadata.update(values)
+    
+    @staticmethod
+    def _without_total_chunks(chunk: Document) -> Document:
+        # A per-page span count is not the document total, which a stream never knows
+        chunk.metadata.pop('total_chunks', None)
+        return chunk
+    
+    def group_documents_by_category(self, documents: Union[List[Document], ChunkSpans]) -> Dict[str, List[Document]]:
         """Group documents by their categories"""
         
+        if isinstance(documents, ChunkSpans):
+            return documents.group_by_category()
+        
         categorized_docs = {}
         
         for doc in documents:
@@ -290,11 +760,19 @@ class DocumentProcessor:
     def get_categories_summary(self, categorizations: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Get a summary of all document categories"""
         
-        if not categorizations:
+        if not categorizations or self.categorizer is None:
             return {}
         
         return self.categorizer.get_category_statistics(categorizations)
     
+    def get_parsed_text_cache_stats(self) -> Dict[str, Any]:
+        """Get parsed text cache hit/miss counters and size"""
+        
+        if self.parsed_text_cache is None:
+            return {'enabled': False}
+        
+        return {'enabled': True, **self.parsed_text_cache.get_stats()}
+    
     def export_categorization_report(self, categorizations: List[Dict[str, Any]], filepath: str = None) -> str:
         """Export categorization report"""
         
@@ -304,6 +782,19 @@ class DocumentProcessor:
         
         return self.categorizer.export_categorizations(categorizations, filepath)
 
+# Per-process parser used by the ingestion process pool
+_worker_processor = None
+
+def _parse_document_worker(file_path: str) -> Tuple[List[Document], float]:
+    """Parse and preprocess one file inside a worker process"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor(enable_categorization=False)
+    
+    start = time.perf_counter()
+    docs = _worker_processor.parse_document(file_path)
+    return docs, time.perf_counter() - start
+
 # Example usage
 if __name__ == "__main__":
     # Configure logging
@@ -0,0 +1,240 @@
+# embedding_cache.py - Persistent Content-addressed Embedding Cache
+
+import os
+import re
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import List, Dict, Any, Callable
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    Embeddings on disk, keyed by (model, task, sha256 of the text)
+    
+    Vectors are appended to one float32 file per model, read through a memory
+    map; a SQLite index (WAL mode) maps keys to rows. Appends happen inside an
+    immediate transaction, so several processes can share the folder.
+    """
+    
+    # SQLite limits the parameters of one statement
+    LOOKUP_BATCH = 500
+    
+    def __init__(self, folder: str):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.index_path = os.path.join(folder, 'index.sqlite3')
+        
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._maps = {}  # {model: (rows, memmap)}
+        
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                task TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (model, task, text_hash)
+            )
+        """)
+        connection.execute("CREATE TABLE IF NOT EXISTS vector_files "
+                           "(model TEXT PRIMARY KEY, dimension INTEGER NOT NULL, rows INTEGER NOT NULL)")
+    
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        
+        if connection is None:
+            connection = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        
+        return connection
+    
+    def _vector_path(self, model: str) -> str:
+        return os.path.join(self.folder, f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', model)}.f32")
+    
+    def _vectors(self, model: str, rows_needed: int) -> np.ndarray:
+        """Memory map of a model's vector file covering at least rows_needed rows"""
+        with self._lock:
+            mapped_rows, vectors = self._maps.get(model, (0, None))
+            if vectors is not None and mapped_rows >= rows_needed:
+                return vectors
+            
+            # The file has grown since it was mapped
+            rows, dimension = self._connection().execute(
+                "SELECT rows, dimension FROM vector_files WHERE model = ?", (model,)
+            ).fetchone()
+            vectors = np.memmap(self._vector_path(model), dtype=np.float32, mode='r', shape=(rows, dimension))
+            self._maps[model] = (rows, vectors)
+            return vectors
+    
+    def lookup(self, model: str, task: str, text_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors of the given hashes; misses are left out"""
+        connection = self._connection()
+        rows = {}
+        
+        for start in range(0, len(text_hashes), self.LOOKUP_BATCH):
+            batch = text_hashes[start:start + self.LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows.update(connection.execute(
+                f"SELECT text_hash, row FROM embeddings WHERE model = ? AND task = ? AND text_hash IN ({placeholders})",
+                (model, task, *batch)
+            ).fetchall())
+        
+        if not rows:
+            return {}
+        
+        vectors = self._vectors(model, max(rows.values()) + 1)
+        return {text_hash: np.array(vectors[row]) for text_hash, row in rows.items()}
+    
+    def add(self, model: str, task: str, text_hashes: List[str], vectors: np.ndarray):
+        """Append vectors and index them; hashes another process added meanwhile are kept as they are"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        connection = self._connection()
+        
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            entry = connection.execute("SELECT rows, dimension FROM vector_files WHERE model = ?", (model,)).fetchone()
+            rows, dimension = entry if entry else (0, vectors.shape[1])
+            if dimension != vectors.shape[1]:
+                raise ValueError(f"Embedding dimension changed for {model}: {dimension} -> {vectors.shape[1]}")
+            
+            # Rows past the recorded count belong to an append that never committed
+            with open(self._vector_path(model), 'ab+') as f:
+                f.truncate(rows * dimension * 4)
+                f.write(vectors.tobytes())
+            
+            connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, task, text_hash, row) VALUES (?, ?, ?, ?)",
+                [(model, task, text_hash, rows + offset) for offset, text_hash in enumerate(text_hashes)]
+            )
+            connection.execute(
+                "INSERT INTO vector_files (model, dimension, rows) VALUES (?, ?, ?) "
+                "ON CONFLICT (model) DO UPDATE SET rows = excluded.rows",
+                (model, dimension, rows + len(vectors))
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+    
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that only sends texts to the wrapped model when they are
+    not in the EmbeddingCache yet, so re-ingesting an unchanged corpus (under any
+    store prefix) makes no embedding API calls
+    """
+    
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str, cache_queries: bool = True):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+        self.cache_queries = cache_queries
+        
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'api_calls': 0
+        }
+    
+    def _record(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+    
+    def _embed(self, texts: List[str], task: str, embed: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        text_hashes = [hashlib.sha256(text.encode('utf-8')).hexdigest() for text in texts]
+        texts_by_hash = dict(zip(text_hashes, texts))
+        
+        try:
+            vectors = self.cache.lookup(self.model, task, list(texts_by_hash))
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            vectors = {}
+        
+        missing = [text_hash for text_hash in texts_by_hash if text_hash not in vectors]
+        if missing:
+            missing_texts = [texts_by_hash[text_hash] for text_hash in missing]
+            self._record(api_calls=1)
+            
+            if task == 'document' and hasattr(self.embeddings, 'embed_batches'):
+                # Checkpoint every finished batch, so a failed run keeps what it embedded
+                embedded = self.embeddings.embed_batches(
+                    missing_texts,
+                    on_batch=lambda start, batch: self._store(task, missing[start:start + len(batch)], batch)
+                )
+            else:
+                embedded = np.asarray(embed(missing_texts), dtype=np.float32)
+                self._store(task, missing, embedded)
+            vectors.update(zip(missing, embedded))
+        
+        self._record(hits=len(texts) - len(missing), misses=len(missing))
+        return [vectors[text_hash].tolist() for text_hash in text_hashes]
+    
+    def _store(self, task: str, text_hashes: List[str], vectors: np.ndarray):
+        try:
+            self.cache.add(self.model, task, text_hashes, vectors)
+        except Exception as e:
+            logger.warning(f"Could not store {len(text_hashes)} embeddings in the cache: {e}")
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed(texts, 'document', self.embeddings.embed_documents)
+    
+    def embed_query(self, text: str) -> List[float]:
+        # Query and document embeddings of one text differ (task type), so they are cached apart
+        if not self.cache_queries:
+            return self.embeddings.embed_query(text)
+        return self._embed([text], 'query', lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = self.stats.copy()
+        stats['cached_vectors'] = self.cache.count()
+        return stats
+
+# Example usage: a second ingestion of the same chunks makes no embedding calls
+if __name__ == "__main__":
+    import tempfile
+    
+    class CountingEmbeddings(Embeddings):
+        """Deterministic fake model that counts the texts it is asked to embed"""
+        
+        def __init__(self):
+            self.texts_embedded = 0
+        
+        def embed_documents(self, texts):
+            self.texts_embedded += len(texts)
+            return [np.random.default_rng(len(text)).random(8).tolist() for text in texts]
+        
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+    
+    chunks = [f"Clause {i}: the parties agree to the terms in section {i}." for i in range(1000)]
+    
+    with tempfile.TemporaryDirectory() as folder:
+        model = CountingEmbeddings()
+        embeddings = CachedEmbeddings(model, EmbeddingCache(folder), 'fake-model')
+        
+        first = embeddings.embed_documents(chunks)
+        print(f"First run: {model.texts_embedded} texts embedded")
+        
+        # A new process (or store prefix) with the same chunks
+        model.texts_embedded = 0
+        embeddings = CachedEmbeddings(model, EmbeddingCache(folder), 'fake-model')
+        second = embeddings.embed_documents(chunks[::-1] + ["A new clause."])
+        print(f"Second run: {model.texts_embedded} texts embedded, stats {embeddings.get_stats()}")
+        print(f"Vectors identical: {second[:-1][::-1] == first}")
\ No newline at end of file
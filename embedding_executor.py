@@ -0,0 +1,199 @@
+# embedding_executor.py - Batched, Concurrent Embedding Requests with Retry and Backoff
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import Config
+from rate_limiter import RateLimiter, is_transient_error
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBatchError(Exception):
+    """A batch still failed after its retries; batches that succeeded were already reported"""
+
+class EmbeddingExecutor(Embeddings):
+    """
+    Sends embed_documents() as fixed-size batches, several in flight at once
+    
+    Each batch is paced by a token bucket (which also backs off on 429s) and
+    retried with jittered exponential backoff on any other error, so one
+    transient failure no longer aborts a whole category. embed_batches() reports
+    every finished batch to a callback, which CachedEmbeddings uses to checkpoint
+    progress: after a failure, a rerun only embeds the batches that were missing.
+    """
+    
+    def __init__(self, embeddings: Embeddings, batch_size: int = None, max_in_flight: int = None,
+                 max_retries: int = None, rate_limiter: RateLimiter = None):
+        settings = Config.EMBEDDING_EXECUTOR_SETTINGS
+        
+        self.embeddings = embeddings
+        self.batch_size = batch_size or settings['batch_size']
+        self.max_in_flight = max_in_flight or settings['max_in_flight']
+        self.max_retries = settings['max_retries'] if max_retries is None else max_retries
+        self.backoff_base_seconds = settings['backoff_base_seconds']
+        self.backoff_max_seconds = settings['backoff_max_seconds']
+        self.rate_limiter = rate_limiter or RateLimiter(requests_per_minute=settings['requests_per_minute'],
+                                                        burst=self.max_in_flight)
+        
+        self._lock = threading.Lock()
+        self.stats = {
+            'runs': 0,
+            'texts': 0,
+            'batches': 0,
+            'retries': 0,
+            'failed_batches': 0,
+            'seconds': 0.0
+        }
+    
+    def _record(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+    
+    def _stat(self, key: str):
+        with self._lock:
+            return self.stats[key]
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+    
+    def _with_retries(self, func: Callable, *args):
+        """
+        Call func through the rate limiter, retrying transient errors (timeouts, 5xx) with backoff
+        
+        429s are not retried here: the rate limiter has already backed off on them and
+        given up. Permanent errors (bad credentials, invalid input) fail at once.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.rate_limiter.call(func, *args)
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient_error(e):
+                    raise
+                delay = self._backoff_delay(attempt)
+                self._record(retries=1)
+                logger.warning(f"Embedding request failed (attempt {attempt + 1}/{self.max_retries + 1}): {e}, "
+                               f"retrying in {delay:.2f}s")
+                time.sleep(delay)
+    
+    def embed_batches(self, texts: List[str], on_batch: Callable[[int, np.ndarray], None] = None) -> np.ndarray:
+        """
+        Embed texts batch by batch
+        
+        Args:
+            texts: Texts to embed
+            on_batch: Called with (start offset, vectors) as each batch finishes, from one thread at a time
+        
+        Returns:
+            float32 array of one vector per text, in input order
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        started = time.perf_counter()
+        retries_before = self._stat('retries')
+        starts = list(range(0, len(texts), self.batch_size))
+        results = {}
+        errors = []
+        callback_lock = threading.Lock()
+        
+        def embed_batch(start: int) -> np.ndarray:
+            batch = texts[start:start + self.batch_size]
+            return np.asarray(self._with_retries(self.embeddings.embed_documents, batch), dtype=np.float32)
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(starts))) as executor:
+            futures = {executor.submit(embed_batch, start): start for start in starts}
+            for future in as_completed(futures):
+                start = futures[future]
+                try:
+                    results[start] = future.result()
+                except Exception as e:
+                    errors.append((start, e))
+                    continue
+                
+                if on_batch is not None:
+                    with callback_lock:
+                        on_batch(start, results[start])
+        
+        elapsed = time.perf_counter() - started
+        embedded = sum(len(vectors) for vectors in results.values())
+        retries = self._stat('retries') - retries_before
+        self._record(runs=1, texts=embedded, batches=len(results), failed_batches=len(errors), seconds=elapsed)
+        logger.info(f"Embedded {embedded}/{len(texts)} texts in {len(results)} batches of up to {self.batch_size} "
+                    f"in {elapsed:.2f}s ({embedded / elapsed if elapsed else 0:.1f} chunks/s), "
+                    f"{retries} retries, {len(errors)} failed batches")
+        
+        if errors:
+            start, error = errors[0]
+            raise EmbeddingBatchError(f"{len(errors)} of {len(starts)} embedding batches failed "
+                                      f"(first at text {start}): {error}") from error
+        
+        return np.concatenate([results[start] for start in starts])
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_batches(texts).tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._with_retries(self.embeddings.embed_query, text)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = self.stats.copy()
+        stats['chunks_per_second'] = round(stats['texts'] / stats['seconds'], 1) if stats['seconds'] else None
+        stats['seconds'] = round(stats['seconds'], 3)
+        return stats
+
+# Example usage: 5,000 chunks against a fake model with latency and transient errors
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    class FlakyEmbeddings(Embeddings):
+        """100 ms per request, 10% of requests fail"""
+        
+        def __init__(self, seed: int = 3):
+            self._random = random.Random(seed)
+            self._lock = threading.Lock()
+        
+        def embed_documents(self, texts):
+            with self._lock:
+                fails = self._random.random() < 0.1
+            time.sleep(0.1)
+            if fails:
+                raise ConnectionError("503 Service Unavailable")
+            return [[float(len(text)), 1.0] for text in texts]
+        
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+    
+    Config.EMBEDDING_EXECUTOR_SETTINGS.update({'backoff_base_seconds': 0.05, 'backoff_max_seconds': 0.5})
+    chunks = [f"chunk {i}" for i in range(5000)]
+    
+    for in_flight in (1, 8):
+        executor = EmbeddingExecutor(FlakyEmbeddings(), batch_size=100, max_in_flight=in_flight,
+                                     rate_limiter=RateLimiter(requests_per_minute=60000, burst=in_flight))
+        vectors = executor.embed_documents(chunks)
+        print(f"max_in_flight={in_flight}: {executor.get_stats()}, "
+              f"order kept: {all(vector[0] == len(chunk) for vector, chunk in zip(vectors, chunks))}")
+    
+    class RejectingEmbeddings(FlakyEmbeddings):
+        """Every request fails with a permanent error"""
+        
+        def embed_documents(self, texts):
+            raise PermissionError("403 API key not valid")
+    
+    executor = EmbeddingExecutor(RejectingEmbeddings(), batch_size=100, max_in_flight=1,
+                                 rate_limiter=RateLimiter(requests_per_minute=60000, burst=1))
+    started = time.perf_counter()
+    try:
+        executor.embed_documents(chunks[:100])
+    except EmbeddingBatchError as e:
+        print(f"Permanent error failed in {time.perf_counter() - started:.2f}s without retries: "
+              f"{executor.get_stats()['retries'] == 0} ({e})")
\ No newline at end of file
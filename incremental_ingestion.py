@@ -0,0 +1,335 @@
+# incremental_ingestion.py - Manifest-based Incremental Ingestion of an Uploads Folder
+
+import os
+import json
+import time
+import logging
+import hashlib
+from datetime import datetime
+from typing import List, Dict, Any
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class IncrementalIngestor:
+    """
+    Keeps a set of category stores in sync with a folder
+    
+    A manifest records (path, size, mtime, sha256) per ingested file together with
+    the ids of its chunks, so a sync only parses, embeds and indexes files that were
+    added or changed, and deletes the chunks of changed or removed files by id.
+    Near-duplicate elimination is not applied here: a kept chunk would otherwise
+    vanish together with a removed file while its duplicates stay unindexed.
+    """
+    
+    MANIFEST_VERSION = "1.0"
+    
+    def __init__(self, document_processor, category_store_manager):
+        self.config = Config()
+        self.settings = self.config.INCREMENTAL_SETTINGS
+        self.document_processor = document_processor
+        self.category_store_manager = category_store_manager
+    
+    def _manifest_path(self, store_prefix: str) -> str:
+        return os.path.join(self.config.LOGS_FOLDER, f"{store_prefix}_{self.settings['manifest_file']}")
+    
+    def load_manifest(self, store_prefix: str) -> Dict[str, Any]:
+        """Load the manifest of a store prefix, or an empty one"""
+        manifest_path = self._manifest_path(store_prefix)
+        
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == self.MANIFEST_VERSION and manifest.get('store_prefix') == store_prefix:
+                return manifest
+            logger.warning(f"Ignoring incompatible ingestion manifest: {manifest_path}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not read ingestion manifest {manifest_path}: {e}")
+        
+        return {'version': self.MANIFEST_VERSION, 'store_prefix': store_prefix, 'files': {}}
+    
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        manifest_path = self._manifest_path(manifest['store_prefix'])
+        temp_path = f"{manifest_path}.tmp"
+        
+        manifest['last_updated'] = datetime.now().isoformat()
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(temp_path, manifest_path)
+    
+    @staticmethod
+    def _hash_file(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _list_files(self, folder: str) -> List[str]:
+        files = []
+        for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.config.ALLOWED_EXTENSIONS:
+                files.append(os.path.abspath(entry.path))
+        return files
+    
+    def scan(self, folder: str, store_prefix: str, manifest: Dict[str, Any] = None) -> Dict[str, List[str]]:
+        """
+        Compare a folder against the manifest
+        
+        Files whose size and mtime match the manifest are not read at all; others
+        are hashed, and a matching hash only counts as 'touched'.
+        """
+        manifest = manifest if manifest is not None else self.load_manifest(store_prefix)
+        known = manifest['files']
+        changes = {'added': [], 'changed': [], 'removed': [], 'touched': [], 'unchanged': []}
+        hashes = {}
+        
+        current_files = self._list_files(folder)
+        for file_path in current_files:
+            entry = known.get(file_path)
+            stat = os.stat(file_path)
+            
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                changes['unchanged'].append(file_path)
+                continue
+            
+            hashes[file_path] = self._hash_file(file_path)
+            if entry is None:
+                changes['added'].append(file_path)
+            elif entry['sha256'] == hashes[file_path]:
+                changes['touched'].append(file_path)
+            else:
+                changes['changed'].append(file_path)
+        
+        current = set(current_files)
+        changes['removed'] = sorted(path for path in known if path not in current)
+        changes['hashes'] = hashes
+        return changes
+    
+    def has_changes(self, changes: Dict[str, List[str]]) -> bool:
+        return any(changes[kind] for kind in ('added', 'changed', 'removed', 'touched'))
+    
+    def _prepare_stores(self, store_prefix: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Make the store manager hold exactly this prefix's stores, returning the
+        manifest to sync against (emptied when the stores cannot be trusted)
+        """
+        manager = self.category_store_manager
+        own_folder = os.path.join(self.config.CATEGORY_STORE_FOLDER, f"{store_prefix}_")
+        
+        if any(not path.startswith(own_folder) for path in manager.category_paths.values()):
+            # Stores of another prefix (e.g. a batch run) are loaded; start from this prefix's own
+            manager.unload_category_stores()
+        
+        expected = {category for entry in manifest['files'].values() for category in entry['chunk_ids']}
+        
+        if manifest['files'] and expected - set(manager.category_stores):
+            manager.load_category_stores(store_prefix)
+        
+        if not manifest['files'] or expected - set(manager.category_stores):
+            if manifest['files']:
+                logger.warning(f"Category stores for '{store_prefix}' do not match the manifest, rebuilding")
+            manager.unload_category_stores()
+            return {'version': self.MANIFEST_VERSION, 'store_prefix': store_prefix, 'files': {}}
+        
+        return manifest
+    
+    @staticmethod
+    def _chunk_ids(file_path: str, sha256: str, count: int) -> List[str]:
+        """Deterministic ids, so the chunks of a file can be deleted on its next change"""
+        path_id = hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:12]
+        return [f"{path_id}-{sha256[:16]}-{index}" for index in range(count)]
+    
+    def sync(self, folder: str, store_prefix: str) -> Dict[str, Any]:
+        """Embed and index only the files added or changed since the last sync"""
+        started = time.perf_counter()
+        manager = self.category_store_manager
+        
+        manifest = self._prepare_stores(store_prefix, self.load_manifest(store_prefix))
+        changes = self.scan(folder, store_prefix, manifest)
+        files = manifest['files']
+        
+        # Drop chunks of files that changed or disappeared
+        chunks_removed = 0
+        for file_path in changes['changed'] + changes['removed']:
+            for category, ids in files[file_path]['chunk_ids'].items():
+                chunks_removed += manager.delete_category_chunks(category, ids)
+            del files[file_path]
+        
+        for file_path in changes['touched']:
+            files[file_path]['mtime'] = os.stat(file_path).st_mtime
+        
+        # Parse, categorize, split and index the delta
+        to_ingest = changes['added'] + changes['changed']
+        chunks_created = 0
+        failed_files = []
+        store_results = {}
+        
+        if to_ingest:
+            try:
+                documents, categorizations = self.document_processor.load_multiple_documents(to_ingest, categorize=True)
+            except ValueError as e:
+                # Nothing in the delta could be loaded; removals and the manifest must still be saved,
+                # and the failed files are reported (and retried next sync) like any other failure
+                logger.warning(f"No documents loaded in this sync: {e}")
+                documents, categorizations = [], []
+            
+            pages_by_file = {}
+            for document in documents:
+                pages_by_file.setdefault(document.metadata['file_path'], []).append(document)
+            categorization_by_file = {
+                pages[0].metadata['file_path']: categorization
+                for pages, categorization in zip(pages_by_file.values(), categorizations)
+            }
+            
+            load_failures = {timing['file'] for timing in self.document_processor.last_load_timings
+                             if timing['status'] == 'failed'}
+            if not documents and not load_failures:
+                load_failures = set(to_ingest)
+            
+            for file_path in to_ingest:
+                if file_path in load_failures:
+                    failed_files.append(file_path)
+                    continue
+                
+                # A file without meaningful text is tracked with no chunks
+                pages = pages_by_file.get(file_path, [])
+                chunks = list(self.document_processor.split_documents(pages)) if pages else []
+                sha256 = changes['hashes'][file_path]
+                ids = self._chunk_ids(file_path, sha256, len(chunks))
+                
+                chunk_ids_by_category = {}
+                chunks_by_category = {}
+                for chunk, chunk_id in zip(chunks, ids):
+                    category = chunk.metadata.get('category', 'other')
+                    chunks_by_category.setdefault(category, []).append(chunk)
+                    chunk_ids_by_category.setdefault(category, []).append(chunk_id)
+                
+                indexed = True
+                for category, category_chunks in chunks_by_category.items():
+                    ok = manager.upsert_category_chunks(
+                        category, category_chunks, chunk_ids_by_category[category], store_prefix
+                    )
+                    store_results[category] = store_results.get(category, True) and ok
+                    indexed = indexed and ok
+                
+                if not indexed:
+                    # Leave the file out of the manifest so the next sync retries it
+                    for category, category_ids in chunk_ids_by_category.items():
+                        manager.delete_category_chunks(category, category_ids)
+                    failed_files.append(file_path)
+                    continue
+                
+                stat = os.stat(file_path)
+                files[file_path] = {
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'sha256': sha256,
+                    'chunk_ids': chunk_ids_by_category,
+                    'categorization': categorization_by_file.get(file_path),
+                    'ingested_at': datetime.now().isoformat()
+                }
+                chunks_created += len(chunks)
+        
+        category_distribution = {}
+        for entry in files.values():
+            for category, ids in entry['chunk_ids'].items():
+                category_distribution[category] = category_distribution.get(category, 0) + len(ids)
+        
+        # A category whose last file went away should not stay queryable as an empty store
+        for category in list(manager.category_stores):
+            if category not in category_distribution:
+                manager.delete_category_store(category)
+        
+        save_results = {}
+        if self.has_changes(changes) or not os.path.exists(self._manifest_path(store_prefix)):
+            if manager.category_stores:
+                save_results = manager.save_category_stores()
+            self._save_manifest(manifest)
+        
+        elapsed = time.perf_counter() - started
+        logger.info(f"Incremental sync of {folder}: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+                    f"{len(changes['removed'])} removed, {len(changes['unchanged'])} unchanged in {elapsed:.2f}s")
+        
+        return {
+            'added': changes['added'],
+            'changed': changes['changed'],
+            'removed': changes['removed'],
+            'touched': changes['touched'],
+            'unchanged_count': len(changes['unchanged']),
+            'failed_files': failed_files,
+            'files_ingested': len(to_ingest) - len(failed_files),
+            'files_tracked': len(files),
+            'chunks_created': chunks_created,
+            'chunks_removed': chunks_removed,
+            'category_distribution': category_distribution,
+            'categorizations': [entry['categorization'] for entry in files.values() if entry.get('categorization')],
+            'store_creation_results': store_results,
+            'store_save_results': save_results,
+            'elapsed_seconds': round(elapsed, 3)
+        }
+
+# Example usage: python incremental_ingestion.py [--synthetic]
+if __name__ == "__main__":
+    import sys
+    
+    if '--synthetic' not in sys.argv:
+        from main_pipeline import LegalRAGPipeline
+        
+        pipeline = LegalRAGPipeline()
+        result = pipeline.sync_folder()
+        
+        print(f"Store prefix: {result['store_prefix']}")
+        print(f"Added: {len(result['added'])}, changed: {len(result['changed'])}, removed: {len(result['removed'])}")
+        print(f"Chunks created: {result['chunks_created']}, removed: {result['chunks_removed']}")
+        print(f"Sync took {result['elapsed_seconds']:.2f}s")
+    else:
+        # Offline check: an unparseable file must not block later syncs, nor the removal of other files
+        import shutil
+        import tempfile
+        
+        Config.EMBEDDING_BACKEND = 'local'
+        Config.LLM_BACKEND = 'local'
+        Config.LOCAL_LLM_SETTINGS['latency_mean_seconds'] = 0.0
+        Config.CATEGORIZATION_SETTINGS['centroid_enabled'] = False
+        Config.CATEGORIZATION_SETTINGS['local_classifier_enabled'] = False
+        
+        work = tempfile.mkdtemp()
+        Config.LOGS_FOLDER = os.path.join(work, 'logs')
+        Config.CATEGORY_STORE_FOLDER = os.path.join(work, 'stores')
+        folder = os.path.join(work, 'uploads')
+        for path in (Config.LOGS_FOLDER, Config.CATEGORY_STORE_FOLDER, folder):
+            os.makedirs(path)
+        
+        from services import get_services
+        
+        services = get_services()
+        ingestor = IncrementalIngestor(services.get('document_processor'), services.get('category_store_manager'))
+        
+        try:
+            with open(os.path.join(folder, 'employment.txt'), 'w', encoding='utf-8') as f:
+                f.write("The employee shall receive an annual salary and benefits. " * 40)
+            with open(os.path.join(folder, 'privacy.txt'), 'w', encoding='utf-8') as f:
+                f.write("We collect personal data and cookies under GDPR. " * 40)
+            first = ingestor.sync(folder, 'synthetic')
+            
+            with open(os.path.join(folder, 'broken.pdf'), 'w', encoding='utf-8') as f:
+                f.write("not a pdf")
+            second = ingestor.sync(folder, 'synthetic')
+            
+            os.remove(os.path.join(folder, 'privacy.txt'))
+            third = ingestor.sync(folder, 'synthetic')
+            tracked = sorted(os.path.basename(path) for path in ingestor.load_manifest('synthetic')['files'])
+            
+            print(f"Initial sync: {len(first['added'])} added, {first['chunks_created']} chunks")
+            print(f"With broken.pdf: failed {[os.path.basename(path) for path in second['failed_files']]}")
+            print(f"After removing privacy.txt: removed {len(third['removed'])}, "
+                  f"{third['chunks_removed']} chunks deleted, failed {len(third['failed_files'])}, "
+                  f"manifest tracks {tracked}")
+            assert second['failed_files'] and third['removed'] and tracked == ['employment.txt']
+        finally:
+            services.shutdown()
+            shutil.rmtree(work, ignore_errors=True)
\ No newline at end of file
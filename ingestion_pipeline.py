@@ -0,0 +1,339 @@
+# ingestion_pipeline.py - Staged Producer/Consumer Ingestion with Bounded Queues
+
+import time
+import queue
+import logging
+import threading
+from typing import List, Dict, Any, Callable, Iterable, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# End-of-stream marker passed down the queues
+_STOP = object()
+
+class _Stage:
+    """One pipeline stage: worker threads reading an input queue and writing an output queue"""
+    
+    def __init__(self, name: str, process: Callable[[Any], Iterable[Any]], workers: int,
+                 input_queue: queue.Queue, output_queue: Optional[queue.Queue],
+                 finish: Callable[[], Iterable[Any]] = None):
+        self.name = name
+        self.process = process
+        self.finish = finish
+        self.workers = workers
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        
+        self._lock = threading.Lock()
+        self._running_workers = workers
+        self.counters = {
+            'items_in': 0,
+            'items_out': 0,
+            'errors': 0,
+            'busy_seconds': 0.0,
+            'max_queue_depth': 0
+        }
+    
+    def start(self) -> List[threading.Thread]:
+        threads = [
+            threading.Thread(target=self._work, name=f"ingest-{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+    
+    def _emit(self, item: Any):
+        if self.output_queue is None:
+            return
+        
+        # Blocks while the next stage is behind, which is what bounds memory
+        self.output_queue.put(item)
+        
+        with self._lock:
+            self.counters['items_out'] += 1
+    
+    def _work(self):
+        while True:
+            item = self.input_queue.get()
+            
+            if item is _STOP:
+                break
+            
+            with self._lock:
+                self.counters['items_in'] += 1
+                self.counters['max_queue_depth'] = max(self.counters['max_queue_depth'],
+                                                       self.input_queue.qsize() + 1)
+            
+            started = time.perf_counter()
+            try:
+                for output in self.process(item):
+                    self._emit(output)
+            except Exception as e:
+                logger.error(f"Ingestion stage '{self.name}' failed on an item: {e}")
+                with self._lock:
+                    self.counters['errors'] += 1
+            finally:
+                with self._lock:
+                    self.counters['busy_seconds'] += time.perf_counter() - started
+        
+        with self._lock:
+            self._running_workers -= 1
+            last_worker = self._running_workers == 0
+        
+        if not last_worker:
+            # Pass the marker on to a sibling worker
+            self.input_queue.put(_STOP)
+        else:
+            # The last worker out flushes buffered state and closes the next queue
+            if self.finish is not None:
+                try:
+                    for output in self.finish():
+                        self._emit(output)
+                except Exception as e:
+                    logger.error(f"Ingestion stage '{self.name}' failed while flushing: {e}")
+                    with self._lock:
+                        self.counters['errors'] += 1
+            
+            if self.output_queue is not None:
+                self.output_queue.put(_STOP)
+    
+    def get_stats(self, elapsed_seconds: float) -> Dict[str, Any]:
+        with self._lock:
+            stats = self.counters.copy()
+        
+        stats.update({
+            'workers': self.workers,
+            'queue_depth': self.input_queue.qsize(),
+            'queue_capacity': self.input_queue.maxsize,
+            'busy_seconds': round(stats['busy_seconds'], 3),
+            'items_per_second': round(stats['items_in'] / elapsed_seconds, 2) if elapsed_seconds else 0.0
+        })
+        return stats
+
+class StagedIngestionPipeline:
+    """
+    Runs ingestion as load -> preprocess -> categorize -> split -> embed -> index
+    stages connected by bounded queues, so embedding of the first file overlaps
+    with parsing of later files
+    """
+    
+    STAGES = ['load', 'preprocess', 'categorize', 'split', 'embed', 'index']
+    
+    def __init__(self, document_processor, category_store_manager, duplicate_filter=None):
+        self.config = Config()
+        self.settings = self.config.INGESTION_SETTINGS
+        self.document_processor = document_processor
+        self.category_store_manager = category_store_manager
+        self.duplicate_filter = duplicate_filter
+        
+        self._stages = []
+        self._started_at = None
+        self._finished_at = None
+    
+    def run(self, file_paths: List[str], store_prefix: str) -> Dict[str, Any]:
+        """Ingest files through the staged pipeline and return what was indexed"""
+        
+        self._reset_run_state(store_prefix)
+        
+        queue_size = self.settings['pipeline_queue_size']
+        queues = [queue.Queue(maxsize=queue_size) for _ in self.STAGES]
+        
+        stage_specs = [
+            ('load', self._load, self.settings['pipeline_load_workers'], None),
+            ('preprocess', self._preprocess, self.settings['pipeline_preprocess_workers'], None),
+            ('categorize', self._categorize, self.settings['max_categorization_workers'], None),
+            ('split', self._split, 1, self._flush_split_buffers),
+            ('embed', self._embed, self.settings['pipeline_embed_workers'], None),
+            ('index', self._index, 1, None)  # FAISS stores are not safe for concurrent writes
+        ]
+        
+        self._stages = []
+        for position, (name, process, workers, finish) in enumerate(stage_specs):
+            output_queue = queues[position + 1] if position + 1 < len(queues) else None
+            self._stages.append(_Stage(name, process, max(1, workers), queues[position], output_queue, finish))
+        
+        self._started_at = time.perf_counter()
+        self._finished_at = None
+        
+        threads = []
+        for stage in self._stages:
+            threads.extend(stage.start())
+        
+        # The caller's thread is the producer for the first stage
+        for index, file_path in enumerate(file_paths):
+            queues[0].put((index, file_path))
+        queues[0].put(_STOP)
+        
+        for thread in threads:
+            thread.join()
+        
+        self._finished_at = time.perf_counter()
+        
+        categorizations = [result for _, result in sorted(self._categorizations, key=lambda pair: pair[0])]
+        stage_stats = self.get_stats()
+        
+        logger.info(f"Pipelined ingestion finished in {stage_stats['elapsed_seconds']:.2f}s")
+        for name in self.STAGES:
+            stats = stage_stats['stages'][name]
+            logger.info(f"  {name}: {stats['items_in']} items, {stats['items_per_second']}/s, "
+                        f"busy {stats['busy_seconds']:.2f}s, max queue depth {stats['max_queue_depth']}")
+        
+        return {
+            'categorizations': categorizations,
+            'failed_files': sorted(self._failed_files),
+            'chunks_created': self._chunks_created,
+            'total_characters': self._total_characters,
+            'source_files': sorted(self._source_files),
+            'category_distribution': dict(self._category_distribution),
+            'store_creation_results': dict(self._store_creation_results),
+            'failed_chunks': dict(self._failed_chunks),
+            'incomplete_files': sorted(self._incomplete_files),
+            'deduplication': (self.duplicate_filter.combine_stats(self._dedup_runs)
+                              if self.duplicate_filter is not None else None),
+            'stage_stats': stage_stats
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-stage throughput and queue-depth counters; safe to call while a run is in progress"""
+        if self._started_at is None:
+            return {'elapsed_seconds': 0.0, 'stages': {}}
+        
+        elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'stages': {stage.name: stage.get_stats(elapsed) for stage in self._stages}
+        }
+    
+    def _reset_run_state(self, store_prefix: str):
+        self._store_prefix = store_prefix
+        self._state_lock = threading.Lock()
+        self._categorizations = []  # [(input index, categorization)]
+        self._failed_files = []
+        self._pending_chunks = {}  # {category: chunks waiting to be embedded}
+        self._next_chunk_id = 0
+        self._chunks_created = 0
+        self._total_characters = 0
+        self._source_files = set()
+        self._category_distribution = {}
+        self._store_creation_results = {}  # {category: whether any batch was indexed}
+        self._failed_chunks = {}  # {category: chunks lost to failed embed or index batches}
+        self._incomplete_files = set()
+        self._dedup_runs = []
+    
+    def _record_failure(self, file_path: str, stage: str, error: Exception):
+        logger.error(f"Failed to {stage} {file_path}: {error}")
+        with self._state_lock:
+            self._failed_files.append(file_path)
+    
+    def _record_failed_batch(self, category: str, metadatas: List[Dict[str, Any]]):
+        """A failed batch costs only its own chunks; the category's other batches are still indexed"""
+        with self._state_lock:
+            self._store_creation_results.setdefault(category, False)
+            self._failed_chunks[category] = self._failed_chunks.get(category, 0) + len(metadatas)
+            self._incomplete_files.update(metadata.get('source', 'Unknown') for metadata in metadatas)
+    
+    # Stage functions: each takes one item and yields zero or more items for the next stage
+    
+    def _load(self, item):
+        index, file_path = item
+        try:
+            cache_key, pages, is_cached = self.document_processor.load_raw_pages(file_path)
+        except Exception as e:
+            self._record_failure(file_path, 'load', e)
+            return
+        
+        yield index, file_path, cache_key, pages, is_cached
+    
+    def _preprocess(self, item):
+        index, file_path, cache_key, pages, is_cached = item
+        try:
+            if not is_cached:
+                pages = self.document_processor.preprocess_pages(file_path, pages, cache_key)
+        except Exception as e:
+            self._record_failure(file_path, 'preprocess', e)
+            return
+        
+        if pages:
+            yield index, file_path, pages
+    
+    def _categorize(self, item):
+        index, file_path, pages = item
+        try:
+            categorization = self.document_processor._categorize_pages(pages)
+        except Exception as e:
+            self._record_failure(file_path, 'categorize', e)
+            return
+        
+        with self._state_lock:
+            self._categorizations.append((index, categorization))
+        
+        logger.info(f"Processed {len(pages)} pages from {file_path}")
+        yield pages
+    
+    def _split(self, pages):
+        batch_size = self.settings['stream_embed_batch_size']
+        
+        for chunk in self.document_processor.iter_split_documents(pages, start_chunk_id=self._next_chunk_id):
+            self._next_chunk_id += 1
+            category = chunk.metadata.get('category', 'other')
+            self._pending_chunks.setdefault(category, []).append(chunk)
+            
+            self._chunks_created += 1
+            self._total_characters += len(chunk.page_content)
+            self._category_distribution[category] = self._category_distribution.get(category, 0) + 1
+            self._source_files.add(chunk.metadata.get('source', 'Unknown'))
+            
+            if len(self._pending_chunks[category]) >= batch_size:
+                yield self._take_batch(category)
+    
+    def _flush_split_buffers(self):
+        for category in list(self._pending_chunks.keys()):
+            batch = self._take_batch(category)
+            if batch[1]:
+                yield batch
+    
+    def _take_batch(self, category: str):
+        chunks = self._pending_chunks.pop(category, [])
+        
+        if self.duplicate_filter is not None and chunks:
+            # Duplicates are only detected within a batch
+            chunks, stats = self.duplicate_filter.deduplicate(chunks)
+            self._dedup_runs.append(stats)
+        
+        return category, chunks
+    
+    def _embed(self, batch):
+        category, chunks = batch
+        texts = [chunk.page_content for chunk in chunks]
+        
+        try:
+            vectors = self.category_store_manager.embeddings.embed_documents(texts)
+        except Exception as e:
+            logger.error(f"Error embedding {len(texts)} chunks for category '{category}': {e}")
+            self._record_failed_batch(category, [chunk.metadata for chunk in chunks])
+            return
+        
+        yield category, texts, vectors, [chunk.metadata for chunk in chunks]
+    
+    def _index(self, batch):
+        category, texts, vectors, metadatas = batch
+        
+        with self._state_lock:
+            indexed = self._store_creation_results.get(category, False)
+        
+        # The first batch indexed for a category in this run replaces any previous store
+        result = self.category_store_manager.add_embedded_chunks(
+            category, texts, vectors, metadatas, self._store_prefix, replace=not indexed
+        )
+        
+        if not result:
+            self._record_failed_batch(category, metadatas)
+            return []
+        
+        with self._state_lock:
+            self._store_creation_results[category] = True
+        
+        return []
\ No newline at end of file
@@ -4,6 +4,7 @@ import os
 import logging
 import datetime
 from pathlib import Path
+from config import Config
 from main_pipeline import LegalRAGPipeline
 
 # Setup logging
@@ -67,19 +68,33 @@ class InteractiveLegalRAG:
     def initialize_pipeline(self, documents):
         """Initialize the enhanced RAG pipeline with found documents"""
         try:
-            print("🔧 Initializing Enhanced Legal RAG Pipeline with Categories...")
-            self.pipeline = LegalRAGPipeline()
+            # Incremental mode syncs uploads/ into a stable store prefix and reuses the pipeline
+            incremental = Config.INCREMENTAL_SETTINGS['enabled']
             
-            print(f"📂 Processing {len(documents)} document(s)...")
-            for doc in documents:
-                print(f"   📄 {Path(doc).name}")
+            if self.pipeline is None or not incremental:
+                print("🔧 Initializing Enhanced Legal RAG Pipeline with Categories...")
+                self.pipeline = LegalRAGPipeline()
+            
+            if incremental:
+                print(f"📂 Incremental mode: syncing the uploads folder {self.uploads_folder} "
+                      f"(INCREMENTAL_INGESTION=false to process the documents found instead)")
+            else:
+                print(f"📂 Processing {len(documents)} document(s)...")
+                for doc in documents:
+                    print(f"   📄 {Path(doc).name}")
             
                 # Process documents with categorization
                 logger.info("Processing documents with categorization.")
-            processing_result = self.pipeline.process_new_documents_with_categories(
-                documents, 
-                f"legal_docs_{self.session_timestamp}"
-            )
+            if incremental:
+                processing_result = self.pipeline.sync_folder(str(self.uploads_folder))
+                print(f"   🔁 Incremental sync: {len(processing_result['added'])} added, "
+                      f"{len(processing_result['changed'])} changed, {len(processing_result['removed'])} removed, "
+                      f"{processing_result['unchanged_count']} unchanged ({processing_result['elapsed_seconds']:.1f}s)")
+            else:
+                processing_result = self.pipeline.process_new_documents_with_categories(
+                    documents, 
+                    f"legal_docs_{self.session_timestamp}"
+                )
             
             print("✅ Enhanced pipeline initialized successfully!")
             print(f"   📊 Documents processed: {processing_result['documents_processed']}")
@@ -0,0 +1,164 @@
+# keyword_matcher.py - Aho-Corasick Multi-keyword Matching for Categorization
+
+import re
+import logging
+from collections import deque
+from typing import List, Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+
+class KeywordMatcher:
+    """
+    Counts the hits of every category keyword in a text
+    
+    By default keywords are counted as substrings, inside words too, with one
+    str.count() per precompiled lowercase keyword: CPython's C-level search is
+    faster here than any pure-Python single pass. word_boundaries=True is an
+    opt-in that runs an Aho-Corasick automaton, built once, over word tokens:
+    a keyword then only matches whole words ('nda' no longer matches
+    'calendar', 'lease' no longer 'release') or their plural ('employees'
+    matches 'employee'), which changes the counts.
+    """
+    
+    def __init__(self, keywords: Dict[str, List[str]], word_boundaries: bool = False):
+        self.word_boundaries = word_boundaries
+        
+        # (category, keyword) per keyword id, in configuration order
+        self._keywords = []
+        for category, category_keywords in keywords.items():
+            for keyword in category_keywords:
+                if list(self._symbols(keyword.lower())):
+                    self._keywords.append((category, keyword))
+        
+        if word_boundaries:
+            self._build()
+        else:
+            self._lowered = [keyword.lower() for _, keyword in self._keywords]
+    
+    def _symbols(self, text: str) -> Iterable[str]:
+        return _WORD.findall(text) if self.word_boundaries else text
+    
+    def _keyword_paths(self, keyword: str) -> List[List[str]]:
+        """Word sequences that count as a hit of keyword"""
+        symbols = list(self._symbols(keyword.lower()))
+        
+        # Plurals are added to the automaton, so scanning stays a plain pass over words
+        *head, last = symbols
+        paths = [symbols, head + [last + 's']]
+        if last.endswith('y'):
+            paths.append(head + [last[:-1] + 'ies'])
+        return paths
+    
+    def _build(self):
+        goto = [{}]
+        outputs = [()]
+        
+        for keyword_id, (_, keyword) in enumerate(self._keywords):
+            for path in self._keyword_paths(keyword):
+                state = 0
+                for symbol in path:
+                    next_state = goto[state].get(symbol)
+                    if next_state is None:
+                        next_state = len(goto)
+                        goto[state][symbol] = next_state
+                        goto.append({})
+                        outputs.append(())
+                    state = next_state
+                outputs[state] += ((keyword_id, len(path)),)
+        
+        # Failure links point at the longest proper suffix that is also a keyword prefix
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, next_state in goto[state].items():
+                queue.append(next_state)
+                
+                fallback = fail[state]
+                while fallback and symbol not in goto[fallback]:
+                    fallback = fail[fallback]
+                
+                target = goto[fallback].get(symbol, 0)
+                fail[next_state] = target if target != next_state else 0
+                outputs[next_state] += outputs[fail[next_state]]
+        
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+        
+        logger.debug(f"Keyword automaton built: {len(self._keywords)} keywords, {len(goto)} states")
+    
+    def _scan(self, text: str) -> List[int]:
+        if not self.word_boundaries:
+            text = text.lower()
+            return [text.count(keyword) for keyword in self._lowered]
+        
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        counts = [0] * len(self._keywords)
+        # Position after the last counted match of each keyword; overlapping matches are skipped, as in str.count
+        free_from = [0] * len(self._keywords)
+        state = 0
+        
+        for position, symbol in enumerate(self._symbols(text.lower())):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            
+            for keyword_id, length in outputs[state]:
+                if position - length + 1 >= free_from[keyword_id]:
+                    counts[keyword_id] += 1
+                    free_from[keyword_id] = position + 1
+        
+        return counts
+    
+    def find_all(self, text: str) -> Dict[str, Dict[str, int]]:
+        """Hits per keyword, grouped by category; keywords without hits are left out"""
+        hits = {}
+        for keyword_id, count in enumerate(self._scan(text)):
+            if count:
+                category, keyword = self._keywords[keyword_id]
+                hits.setdefault(category, {})[keyword] = count
+        return hits
+    
+    def count(self, text: str) -> Dict[str, int]:
+        """Total keyword hits per category; categories without hits are left out"""
+        return {category: sum(keyword_hits.values()) for category, keyword_hits in self.find_all(text).items()}
+
+# Example usage: compare with one str.count scan per keyword
+if __name__ == "__main__":
+    import time
+    from config import Config
+    
+    text = ("This Service Agreement is entered into between the parties for software services. "
+            "The contractor shall provide services per the statement of work. Payment terms are net 30, "
+            "and either party may terminate for breach. Confidential information is covered by the NDA; "
+            "the calendar of deliverables is attached. Salary and benefits of seconded employees remain "
+            "with the employer. This agreement is governed by applicable regulations. ") * 8
+    text = text[:3000]
+    keywords = Config.CATEGORY_KEYWORDS
+    
+    def count_per_keyword(content: str) -> Dict[str, int]:
+        content_lower = content.lower()
+        scores = {}
+        for category, category_keywords in keywords.items():
+            score = sum(content_lower.count(keyword.lower()) for keyword in category_keywords)
+            if score:
+                scores[category] = score
+        return scores
+    
+    def timed(func, runs: int = 500) -> float:
+        started = time.perf_counter()
+        for _ in range(runs):
+            func(text)
+        return (time.perf_counter() - started) / runs * 1e6
+    
+    substring_matcher = KeywordMatcher(keywords)
+    word_matcher = KeywordMatcher(keywords, word_boundaries=True)
+    
+    print(f"{len(text)} characters, {sum(len(k) for k in keywords.values())} keywords")
+    print(f"old str.count loop:             {timed(count_per_keyword):7.0f} us  {count_per_keyword(text)}")
+    print(f"default (substrings):           {timed(substring_matcher.count):7.0f} us  {substring_matcher.count(text)}")
+    print(f"word automaton (opt-in):        {timed(word_matcher.count):7.0f} us  {word_matcher.count(text)}")
+    print(f"Default matches the old counts: {substring_matcher.count(text) == count_per_keyword(text)}")
\ No newline at end of file
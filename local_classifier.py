@@ -0,0 +1,312 @@
+# local_classifier.py - Offline TF-IDF + Linear Categorization Tier Trained from the Cache
+
+import os
+import re
+import json
+import time
+import logging
+from datetime import datetime
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+
+# Cached results whose label came from the LLM; keyword, centroid and classifier results would teach the model itself
+TRAINING_METHODS = ('llm_analysis', 'llm_batch')
+
+def _terms(text: str) -> List[str]:
+    """Unigrams and bigrams of the lowercased words of text"""
+    words = _WORD.findall(text.lower())
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+class LocalClassifier:
+    """
+    Multinomial logistic regression over sublinear TF-IDF features, NumPy only
+    
+    Trained offline from excerpts the LLM categorized with high confidence, it
+    categorizes an excerpt without any network call in well under a millisecond.
+    The model (vocabulary, idf, weights and the held-out report) is one .npz file.
+    """
+    
+    def __init__(self, categories: List[str], vocabulary: List[str], idf: np.ndarray,
+                 weights: np.ndarray, bias: np.ndarray, report: Dict[str, Any] = None):
+        self.categories = categories
+        self.vocabulary = vocabulary
+        self.term_index = {term: index for index, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.weights = weights  # (terms, categories)
+        self.bias = bias
+        self.report = report or {}
+    
+    @staticmethod
+    def _vectorize(term_lists: List[List[str]], term_index: Dict[str, int],
+                   idf: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """L2-normalized TF-IDF rows as CSR arrays (indptr, indices, data)"""
+        indptr = [0]
+        indices = []
+        data = []
+        
+        for terms in term_lists:
+            ids = np.fromiter((term_index[term] for term in terms if term in term_index), dtype=np.int64)
+            row_indices, counts = np.unique(ids, return_counts=True)
+            values = (1.0 + np.log(counts)) * idf[row_indices]
+            norm = np.linalg.norm(values)
+            
+            indices.append(row_indices)
+            data.append(values / norm if norm else values)
+            indptr.append(indptr[-1] + len(row_indices))
+        
+        return (np.asarray(indptr, dtype=np.int64),
+                np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+                np.concatenate(data) if data else np.zeros(0))
+    
+    @staticmethod
+    def _segment_sums(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """Row sums of values over the segments [starts[i], starts[i + 1]), empty segments included"""
+        padded = np.concatenate([values, np.zeros((1,) + values.shape[1:])])
+        sums = np.add.reduceat(padded, np.minimum(starts[:-1], len(values)), axis=0)
+        sums[starts[:-1] == starts[1:]] = 0.0
+        return sums
+    
+    @classmethod
+    def _logits(cls, csr, weights: np.ndarray, bias: np.ndarray) -> np.ndarray:
+        indptr, indices, data = csr
+        return cls._segment_sums(data[:, None] * weights[indices], indptr) + bias
+    
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+    
+    @classmethod
+    def fit(cls, texts: List[str], labels: List[str], max_features: int = 20000, min_df: int = 2,
+            epochs: int = 200, learning_rate: float = 0.1, l2: float = 1e-4) -> 'LocalClassifier':
+        """Train on (texts, labels) with full-batch Adam"""
+        term_lists = [_terms(text) for text in texts]
+        
+        document_frequency = {}
+        for terms in term_lists:
+            for term in set(terms):
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        
+        # Small training sets keep every term; otherwise rare terms are noise
+        min_df = min_df if len(texts) >= 10 * min_df else 1
+        kept = sorted((term for term, frequency in document_frequency.items() if frequency >= min_df),
+                      key=lambda term: (-document_frequency[term], term))[:max_features]
+        term_index = {term: index for index, term in enumerate(kept)}
+        frequencies = np.array([document_frequency[term] for term in kept], dtype=np.float64)
+        idf = np.log((1 + len(texts)) / (1 + frequencies)) + 1.0
+        
+        categories = sorted(set(labels))
+        category_index = {category: index for index, category in enumerate(categories)}
+        targets = np.zeros((len(labels), len(categories)))
+        targets[np.arange(len(labels)), [category_index[label] for label in labels]] = 1.0
+        
+        csr = cls._vectorize(term_lists, term_index, idf)
+        indptr, indices, data = csr
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        
+        # Column-major view of the same entries, for the gradient of the weights
+        by_term = np.argsort(indices, kind='stable')
+        term_starts = np.searchsorted(indices[by_term], np.arange(len(kept) + 1))
+        
+        weights = np.zeros((len(kept), len(categories)))
+        bias = np.zeros(len(categories))
+        moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+        beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+        
+        for step in range(1, epochs + 1):
+            errors = (cls._softmax(cls._logits(csr, weights, bias)) - targets) / len(texts)
+            
+            weighted = (data[:, None] * errors[rows])[by_term]
+            weight_gradient = cls._segment_sums(weighted, term_starts) + l2 * weights
+            bias_gradient = errors.sum(axis=0)
+            
+            for parameter, gradient, first, second in ((weights, weight_gradient, moments[0], moments[1]),
+                                                       (bias, bias_gradient, moments[2], moments[3])):
+                first *= beta1
+                first += (1 - beta1) * gradient
+                second *= beta2
+                second += (1 - beta2) * gradient ** 2
+                parameter -= (learning_rate * (first / (1 - beta1 ** step))
+                              / (np.sqrt(second / (1 - beta2 ** step)) + epsilon))
+        
+        return cls(categories, kept, idf, weights, bias)
+    
+    def _prediction(self, probabilities: np.ndarray) -> Dict[str, Any]:
+        order = np.argsort(probabilities)[::-1]
+        runner_up = order[1] if len(order) > 1 else order[0]
+        return {
+            'category': self.categories[order[0]],
+            'probability': float(probabilities[order[0]]),
+            'margin': float(probabilities[order[0]] - probabilities[runner_up]) if len(order) > 1 else 1.0,
+            'runner_up': self.categories[runner_up]
+        }
+    
+    def predict(self, text: str) -> Dict[str, Any]:
+        """
+        Categorize one excerpt
+        
+        Returns:
+            'category', its 'probability', the 'margin' over the runner-up and the 'runner_up'
+        """
+        # Plain dict counting beats building CSR arrays for a single row
+        term_index = self.term_index
+        counts = {}
+        for term in _terms(text):
+            index = term_index.get(term)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))) * self.idf[ids]
+        norm = np.linalg.norm(values)
+        if norm:
+            values /= norm
+        
+        return self._prediction(self._softmax(values @ self.weights[ids] + self.bias))
+    
+    def predict_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        csr = self._vectorize([_terms(text) for text in texts], self.term_index, self.idf)
+        return [self._prediction(row) for row in self._softmax(self._logits(csr, self.weights, self.bias))]
+    
+    def evaluate(self, texts: List[str], labels: List[str]) -> Dict[str, Any]:
+        """Accuracy overall and per category (recall) on labelled examples"""
+        predicted = [prediction['category'] for prediction in self.predict_many(texts)]
+        
+        per_category = {}
+        for label, guess in zip(labels, predicted):
+            entry = per_category.setdefault(label, {'examples': 0, 'correct': 0})
+            entry['examples'] += 1
+            entry['correct'] += int(label == guess)
+        for entry in per_category.values():
+            entry['accuracy'] = round(entry['correct'] / entry['examples'], 4)
+        
+        correct = sum(entry['correct'] for entry in per_category.values())
+        return {
+            'examples': len(labels),
+            'accuracy': round(correct / len(labels), 4) if labels else None,
+            'per_category': per_category
+        }
+    
+    def save(self, path: str):
+        temp_file = f"{path}.tmp.npz"
+        np.savez(temp_file, categories=np.array(self.categories), vocabulary=np.array(self.vocabulary),
+                 idf=self.idf, weights=self.weights.astype(np.float32), bias=self.bias,
+                 report=np.array(json.dumps(self.report)))
+        os.replace(temp_file, path)
+    
+    @classmethod
+    def load(cls, path: str) -> Optional['LocalClassifier']:
+        """Load a saved model, or None when there is none (or it is unreadable)"""
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                return cls([str(category) for category in saved['categories']],
+                           [str(term) for term in saved['vocabulary']],
+                           saved['idf'], saved['weights'].astype(np.float64), saved['bias'],
+                           json.loads(str(saved['report'])))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Could not load local classifier {path}: {e}")
+            return None
+
+def train_local_classifier(examples: List[Tuple[str, str]], holdout_fraction: float = 0.2,
+                           seed: int = 13) -> Tuple[LocalClassifier, Dict[str, Any]]:
+    """
+    Train on (text, category) examples and report accuracy on a held-out split
+    
+    The reported model is trained on the remaining examples only; the returned
+    one is then refit on all examples, so no labelled excerpt goes unused.
+    """
+    order = np.random.default_rng(seed).permutation(len(examples))
+    holdout = max(1, int(len(examples) * holdout_fraction))
+    test = [examples[i] for i in order[:holdout]]
+    train = [examples[i] for i in order[holdout:]]
+    
+    started = time.perf_counter()
+    held_out_model = LocalClassifier.fit([text for text, _ in train], [label for _, label in train])
+    evaluation = held_out_model.evaluate([text for text, _ in test], [label for _, label in test])
+    
+    model = LocalClassifier.fit([text for text, _ in examples], [label for _, label in examples])
+    
+    model.report = {
+        'trained_at': datetime.now().isoformat(),
+        'training_examples': len(examples),
+        'train_examples': len(train),
+        'holdout': evaluation,
+        'vocabulary_size': len(model.vocabulary),
+        'training_seconds': round(time.perf_counter() - started, 3)
+    }
+    return model, model.report
+
+def retrain_from_cache() -> Dict[str, Any]:
+    """Retrain the local classifier from the categorization cache and save it next to the cache"""
+    from categorization_store import CategorizationStore
+    
+    config = Config()
+    settings = config.CATEGORIZATION_SETTINGS
+    store = CategorizationStore(os.path.join(config.LOGS_FOLDER, settings['cache_db_file']))
+    try:
+        examples = store.labelled_examples(TRAINING_METHODS, settings['local_classifier_training_min_confidence'])
+    finally:
+        store.close()
+    
+    categories = {category for _, category in examples}
+    if len(examples) < settings['local_classifier_min_examples'] or len(categories) < 2:
+        raise ValueError(f"Not enough labelled excerpts to train on: {len(examples)} examples in "
+                         f"{len(categories)} categories (need {settings['local_classifier_min_examples']} "
+                         f"in at least 2)")
+    
+    model, report = train_local_classifier(examples)
+    model_file = os.path.join(config.LOGS_FOLDER, settings['local_classifier_file'])
+    model.save(model_file)
+    
+    logger.info(f"Local classifier trained on {len(examples)} excerpts, held-out accuracy "
+                f"{report['holdout']['accuracy']:.3f}, saved to {model_file}")
+    return report
+
+# Retrain command: python local_classifier.py [--synthetic]
+if __name__ == "__main__":
+    import argparse
+    
+    logging.basicConfig(level=logging.INFO)
+    
+    parser = argparse.ArgumentParser(description="Retrain the local categorization classifier from the cache")
+    parser.add_argument('--synthetic', action='store_true',
+                        help="train and time on generated documents instead of the cache")
+    args = parser.parse_args()
+    
+    if not args.synthetic:
+        print(json.dumps(retrain_from_cache(), indent=2))
+    else:
+        rng = np.random.default_rng(0)
+        vocabularies = Config.CATEGORY_KEYWORDS
+        filler = "the of and to in shall be this any such with for by as may on or".split()
+        
+        def synthetic_document(category: str) -> str:
+            words = list(rng.choice(filler, 300))
+            own = vocabularies[category]
+            other = [keyword for keywords in vocabularies.values() for keyword in keywords]
+            words += list(rng.choice(own, 25)) + list(rng.choice(other, 15))
+            rng.shuffle(words)
+            return ' '.join(words)
+        
+        examples = [(synthetic_document(category), category)
+                    for category in vocabularies for _ in range(40)]
+        model, report = train_local_classifier(examples)
+        print(f"Held-out accuracy: {report['holdout']['accuracy']} on {report['holdout']['examples']} examples, "
+              f"trained in {report['training_seconds']}s")
+        
+        text = examples[0][0][:3000]
+        runs = 2000
+        started = time.perf_counter()
+        for _ in range(runs):
+            model.predict(text)
+        print(f"Prediction: {model.predict(text)}, "
+              f"{(time.perf_counter() - started) / runs * 1e6:.0f} us per excerpt")
\ No newline at end of file
@@ -0,0 +1,87 @@
+# local_embeddings.py - Offline Deterministic Feature-hashing Embeddings
+
+import re
+import zlib
+import logging
+from typing import List, Dict, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+
+class LocalHashingEmbeddings(Embeddings):
+    """
+    Embeds text without any network call by hashing words (and word bigrams)
+    into a fixed number of signed buckets
+    
+    Term counts are damped with log1p and the vector is L2-normalized, so cosine
+    similarity behaves like TF cosine over the hashed vocabulary. Hashing uses
+    CRC32, not Python's salted hash(), so vectors are identical across processes
+    and machines: stores built on one box can be queried on another.
+    """
+    
+    def __init__(self, dimension: int = 768, use_bigrams: bool = True):
+        self.dimension = dimension
+        self.use_bigrams = use_bigrams
+        self.model = f"local-hashing-{dimension}{'-bigrams' if use_bigrams else ''}"
+        
+        # term -> (bucket, sign); words repeat a lot, so hashing each once pays off
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+        self._max_cached_terms = 500000
+    
+    def _bucket(self, term: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(term)
+        if bucket is None:
+            digest = zlib.crc32(term.encode('utf-8'))
+            bucket = (digest % self.dimension, 1.0 if digest & 0x80000000 else -1.0)
+            if len(self._buckets) < self._max_cached_terms:
+                self._buckets[term] = bucket
+        return bucket
+    
+    def _embed(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        terms = words + [f"{first} {second}" for first, second in zip(words, words[1:])] if self.use_bigrams else words
+        
+        if not terms:
+            return np.zeros(self.dimension)
+        
+        buckets, signs = zip(*map(self._bucket, terms))
+        vector = np.bincount(buckets, weights=signs, minlength=self.dimension)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text).tolist() for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text).tolist()
+
+# Example usage: throughput and a retrieval sanity check, no network needed
+if __name__ == "__main__":
+    import time
+    
+    embeddings = LocalHashingEmbeddings()
+    documents = [
+        "The employee shall receive an annual salary and benefits, and may be terminated with notice.",
+        "We collect personal data such as cookies and process personal information under GDPR.",
+        "The licensee is granted a non-exclusive software license subject to the license fee.",
+        "The parties agree that the contractor provides services under this service agreement."
+    ]
+    queries = ["What salary does the employee get?", "How is personal data processed?",
+               "Is the software license exclusive?", "What services does the contractor provide?"]
+    
+    vectors = np.array(embeddings.embed_documents(documents))
+    hits = sum(int(np.argmax(vectors @ np.array(embeddings.embed_query(query)))) == i for i, query in enumerate(queries))
+    print(f"Queries answered by the right document: {hits}/{len(queries)}")
+    print(f"Deterministic: {embeddings.embed_query(documents[0]) == LocalHashingEmbeddings().embed_query(documents[0])}")
+    
+    chunks = [f"{documents[i % len(documents)]} Section {i}. " * 12 for i in range(2000)]
+    started = time.perf_counter()
+    embeddings.embed_documents(chunks)
+    elapsed = time.perf_counter() - started
+    print(f"{len(chunks)} chunks of ~{len(chunks[0])} characters in {elapsed:.2f}s ({len(chunks) / elapsed:.0f} chunks/s)")
\ No newline at end of file
@@ -0,0 +1,187 @@
+# local_llm.py - Offline Stand-in Chat Model for Load Testing
+
+import re
+import json
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from config import Config
+from keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+_BATCH_DOCUMENT = re.compile(r'<<<DOCUMENT id=(\d+)>>>(.*?)<<<END DOCUMENT \1>>>', re.DOTALL)
+_SINGLE_DOCUMENT = re.compile(r'\*\*DOCUMENT CONTENT TO ANALYZE:\*\*(.*?)\*\*CLASSIFICATION INSTRUCTIONS:\*\*', re.DOTALL)
+_QUESTION = re.compile(r'Question:\**[ \t]*(.+)')
+_FOLLOW_UP = re.compile(r'Follow Up Input:[ \t]*(.+)')
+_TOKEN = re.compile(r'\S+\s*')
+
+class LocalRateLimitError(Exception):
+    """Injected 429, recognized by rate_limiter.is_rate_limit_error like the Gemini one"""
+    code = 429
+
+class LocalServerError(Exception):
+    """Injected transient server error"""
+    code = 503
+
+class LocalChatModel(BaseChatModel):
+    """
+    Chat model that answers locally, for load tests and offline runs
+    
+    Categorization prompts (single and batched) get valid JSON, with the category
+    picked by fallback-keyword hits; every other prompt gets answer_template filled
+    with the question. Latency, server errors and 429s are injected as configured,
+    and streamed answers arrive at tokens_per_second, so pipeline overhead can be
+    measured apart from model latency.
+    """
+    
+    latency_distribution: str = 'lognormal'
+    latency_mean_seconds: float = 0.8
+    latency_spread: float = 0.5
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    tokens_per_second: float = 50.0
+    answer_template: str = "Local stand-in answer to: {question}"
+    seed: Optional[int] = None
+    
+    _random: Any = PrivateAttr()
+    _random_lock: Any = PrivateAttr()
+    _keyword_matcher: Any = PrivateAttr()
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._random = random.Random(self.seed)
+        self._random_lock = threading.Lock()
+        self._keyword_matcher = KeywordMatcher(Config.CATEGORY_KEYWORDS)
+    
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any] = None) -> 'LocalChatModel':
+        return cls(**(settings or Config.LOCAL_LLM_SETTINGS))
+    
+    @property
+    def _llm_type(self) -> str:
+        return "local-stand-in"
+    
+    def _draw(self) -> Dict[str, Any]:
+        """Latency and injected failure of one call"""
+        with self._random_lock:
+            if self.latency_distribution == 'fixed':
+                latency = self.latency_mean_seconds
+            elif self.latency_distribution == 'uniform':
+                latency = self._random.uniform(self.latency_mean_seconds - self.latency_spread,
+                                               self.latency_mean_seconds + self.latency_spread)
+            elif self.latency_distribution == 'lognormal':
+                # Mean of a lognormal is exp(mu + sigma^2 / 2)
+                mu = -self.latency_spread ** 2 / 2
+                latency = self.latency_mean_seconds * self._random.lognormvariate(mu, self.latency_spread)
+            else:
+                raise ValueError(f"Unknown latency distribution: {self.latency_distribution}")
+            
+            roll = self._random.random()
+        
+        failure = None
+        if roll < self.rate_limit_rate:
+            failure = LocalRateLimitError("429 Resource has been exhausted (local stand-in)")
+        elif roll < self.rate_limit_rate + self.error_rate:
+            failure = LocalServerError("503 Service Unavailable (local stand-in)")
+        return {'latency': max(0.0, latency), 'failure': failure}
+    
+    def _categorize(self, content: str) -> Dict[str, Any]:
+        scores = self._keyword_matcher.count(content)
+        if not scores:
+            return {'category': 'other', 'confidence': 0.5, 'explanation': "No category keywords found (local stand-in)",
+                    'key_indicators': []}
+        
+        category = max(scores, key=scores.get)
+        return {
+            'category': category,
+            'confidence': 0.9,
+            'explanation': f"{scores[category]} keyword hits for {category} (local stand-in)",
+            'key_indicators': list(self._keyword_matcher.find_all(content)[category])[:5]
+        }
+    
+    def _answer(self, prompt: str) -> str:
+        documents = _BATCH_DOCUMENT.findall(prompt)
+        if documents:
+            return json.dumps([{'id': int(document_id), **self._categorize(content)}
+                               for document_id, content in documents])
+        
+        single = _SINGLE_DOCUMENT.search(prompt)
+        if single:
+            return json.dumps(self._categorize(single.group(1)))
+        
+        # Conversational chains first condense the question; keep it as it was asked
+        follow_up = _FOLLOW_UP.search(prompt)
+        if follow_up:
+            return follow_up.group(1).strip()
+        
+        questions = _QUESTION.findall(prompt)
+        question = questions[-1].strip() if questions else prompt.strip().splitlines()[-1] if prompt.strip() else ""
+        return self.answer_template.format(question=question, prompt_chars=len(prompt))
+    
+    @staticmethod
+    def _prompt_text(messages: List[BaseMessage]) -> str:
+        return "\n".join(message.content if isinstance(message.content, str) else str(message.content)
+                         for message in messages)
+    
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        draw = self._draw()
+        time.sleep(draw['latency'])
+        if draw['failure'] is not None:
+            raise draw['failure']
+        
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(self._prompt_text(messages))))])
+    
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        draw = self._draw()
+        time.sleep(draw['latency'])  # Time to first token
+        if draw['failure'] is not None:
+            raise draw['failure']
+        
+        for token in _TOKEN.findall(self._answer(self._prompt_text(messages))):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            if self.tokens_per_second:
+                time.sleep(1.0 / self.tokens_per_second)
+
+# Example usage: latency, failure injection and streaming without network access
+if __name__ == "__main__":
+    from rate_limiter import is_rate_limit_error
+    
+    llm = LocalChatModel(latency_distribution='lognormal', latency_mean_seconds=0.05, latency_spread=0.5,
+                         error_rate=0.05, rate_limit_rate=0.1, tokens_per_second=200, seed=1)
+    
+    latencies = []
+    failures = {'rate_limited': 0, 'server_errors': 0}
+    for _ in range(100):
+        started = time.perf_counter()
+        try:
+            llm.invoke("Question: What is the notice period?")
+        except Exception as e:
+            failures['rate_limited' if is_rate_limit_error(e) else 'server_errors'] += 1
+        latencies.append(time.perf_counter() - started)
+    
+    latencies.sort()
+    print(f"100 calls: p50 {latencies[50] * 1000:.0f} ms, p95 {latencies[95] * 1000:.0f} ms, {failures}")
+    
+    llm = LocalChatModel(latency_distribution='fixed', latency_mean_seconds=0.0, tokens_per_second=200)
+    batch_prompt = ("<<<DOCUMENT id=1>>>\nThe employee salary and benefits...\n<<<END DOCUMENT 1>>>\n"
+                    "<<<DOCUMENT id=2>>>\nWe process personal data and cookies.\n<<<END DOCUMENT 2>>>")
+    print(f"Batch categorization: {llm.invoke(batch_prompt).content}")
+    
+    started = time.perf_counter()
+    tokens = [chunk.content for chunk in llm.stream("Question: Who are the parties?")]
+    print(f"Streamed {len(tokens)} tokens in {time.perf_counter() - started:.2f}s: {''.join(tokens)}")
\ No newline at end of file
@@ -2,16 +2,15 @@
 
 import os
 import logging
+import threading
 from typing import List, Dict, Any
 from datetime import datetime
 
 # Import all our custom modules
 from config import Config
-from models import get_model_manager
-from document_processor import DocumentProcessor
-from category_vector_store_manager import CategoryVectorStoreManager
-from retrieval_chain import LegalDocumentAnalyzer
-from document_categorizer import DocumentCategorizer
+from services import get_services
+from ingestion_pipeline import StagedIngestionPipeline
+from incremental_ingestion import IncrementalIngestor
 
 # Setup logging
 logging.basicConfig(
@@ -27,9 +26,8 @@ logger = logging.getLogger(__name__)
 class LegalRAGPipeline:
     def _get_file_content(self, file_path: str) -> str:
         """Utility to load and return the full text content of a file."""
-        from document_processor import DocumentProcessor
-        processor = DocumentProcessor()
-        docs, _ = processor.load_single_document(file_path, categorize=False)
+        # Reuse the pipeline's processor so repeat questions hit its parsed text cache
+        docs, _ = self.document_processor.load_single_document(file_path, categorize=False)
         return "\n\n".join([doc.page_content for doc in docs]) if docs else ""
     def compare_documents_by_file(self, question: str, file_path1: str, file_path2: str) -> Dict[str, Any]:
         """Compare two specific documents by file path (not by category)"""
@@ -48,16 +46,20 @@ class LegalRAGPipeline:
     Category-specific Vector Stores, and Document Comparison Features
     """
     
-    def __init__(self):
+    def __init__(self, services=None):
+        """
+        Args:
+            services: Registry of the shared processor, categorizer, store manager and
+                      analyzer; defaults to the process-wide one, so pipelines are cheap
+        """
         self.config = Config()
         self.config.validate_config()
         
-        # Initialize components
-        self.document_processor = DocumentProcessor()
-        self.categorizer = DocumentCategorizer()
-        self.category_store_manager = CategoryVectorStoreManager()
-        self.analyzer = LegalDocumentAnalyzer()
-        
+        # Shared components, built once per process on first use (see the properties below)
+        self.services = services or get_services()
+        self._staged_ingestion = None
+        self._incremental_ingestor = None
+
         # Pipeline state
         self.processed_documents = []
         self.categorizations = []
@@ -67,10 +69,49 @@ class LegalRAGPipeline:
         
         logger.info("Enhanced Legal RAG Pipeline initialized successfully")
     
+    @property
+    def document_processor(self):
+        return self.services.get('document_processor')
+    
+    @property
+    def categorizer(self):
+        return self.document_processor.categorizer
+    
+    @property
+    def category_store_manager(self):
+        return self.services.get('category_store_manager')
+    
+    @property
+    def analyzer(self):
+        return self.services.get('analyzer')
+    
+    @property
+    def duplicate_filter(self):
+        return self.services.get('duplicate_filter')
+    
+    @property
+    def staged_ingestion(self) -> StagedIngestionPipeline:
+        if self._staged_ingestion is None:
+            self._staged_ingestion = StagedIngestionPipeline(
+                self.document_processor,
+                self.category_store_manager,
+                self.duplicate_filter if self.config.DEDUP_SETTINGS['enabled'] else None
+            )
+        return self._staged_ingestion
+    
+    @property
+    def incremental_ingestor(self) -> IncrementalIngestor:
+        if self._incremental_ingestor is None:
+            self._incremental_ingestor = IncrementalIngestor(self.document_processor, self.category_store_manager)
+        return self._incremental_ingestor
+
     def process_new_documents_with_categories(self, file_paths: List[str], 
-                                            store_prefix: str = None) -> Dict[str, Any]:
+                                            store_prefix: str = None,
+                                            mode: str = None) -> Dict[str, Any]:
         """
         Complete enhanced pipeline: Load documents -> Categorize -> Create category-specific stores -> Setup RAG
+        
+        mode selects 'batch' (default), 'streaming' or 'pipelined' ingestion, see Config.INGESTION_SETTINGS
         """
         
         if not file_paths:
@@ -81,6 +122,14 @@ class LegalRAGPipeline:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             store_prefix = f"legal_docs_{timestamp}"
         
+        mode = mode or self.config.INGESTION_SETTINGS['mode']
+        if mode == 'streaming':
+            return self._process_documents_streaming(file_paths, store_prefix)
+        if mode == 'pipelined':
+            return self._process_documents_pipelined(file_paths, store_prefix)
+        if mode != 'batch':
+            raise ValueError(f"Unknown ingestion mode: {mode}")
+        
         try:
             logger.info(f"Starting enhanced document processing pipeline for {len(file_paths)} files")
             
@@ -98,8 +147,15 @@ class LegalRAGPipeline:
             logger.info("Step 3: Grouping documents by category...")
             categorized_docs = self.document_processor.group_documents_by_category(chunks)
             
+            # Step 3b: Embed each near-duplicate cluster only once
+            dedup_stats = None
+            if self.config.DEDUP_SETTINGS['enabled']:
+                logger.info("Step 3b: Removing near-duplicate chunks...")
+                categorized_docs, dedup_stats = self.duplicate_filter.deduplicate_categories(categorized_docs)
+            
             # Step 4: Create category-specific vector stores
             logger.info("Step 4: Creating category-specific vector stores...")
+            self.category_store_manager.unload_category_stores()
             store_creation_results = self.category_store_manager.create_category_stores(
                 categorized_docs, store_prefix
             )
@@ -108,9 +164,9 @@ class LegalRAGPipeline:
             logger.info("Step 5: Saving category vector stores...")
             save_results = self.category_store_manager.save_category_stores()
             
-            # Step 6: Setup enhanced RAG analyzer
+            # Step 6: Setup enhanced RAG analyzer (chains of the previous prefix are replaced)
             logger.info("Step 6: Setting up enhanced RAG analyzer...")
-            self.analyzer.setup_with_category_stores(store_prefix)
+            self.analyzer.setup_with_category_stores(store_prefix, rebuild_chains=True)
             
             # Update pipeline state
             self.processed_documents = documents
@@ -136,9 +192,11 @@ class LegalRAGPipeline:
                 },
                 "store_creation_results": store_creation_results,
                 "store_save_results": save_results,
+                "deduplication": dedup_stats,
                 "document_stats": doc_stats,
                 "category_stats": category_stats,
                 "store_info": store_info,
+                "file_timings": self.document_processor.last_load_timings,
                 "processing_timestamp": datetime.now().isoformat(),
                 "features_enabled": {
                     "categorization": True,
@@ -156,20 +214,299 @@ class LegalRAGPipeline:
             logger.error(f"Error in enhanced document processing pipeline: {e}")
             raise
     
+    def _process_documents_streaming(self, file_paths: List[str], store_prefix: str) -> Dict[str, Any]:
+        """
+        Streaming pipeline: pages flow one at a time through preprocessing and splitting,
+        and chunks are embedded in batches, so memory stays flat regardless of how many
+        documents there are. A document's chunks are held until it has streamed completely,
+        so a document failing part way leaves nothing indexed.
+        """
+        from deduplication import NearDuplicateFilter
+        
+        batch_size = self.config.INGESTION_SETTINGS['stream_embed_batch_size']
+        categorizations = []
+        failed_files = []
+        pending_chunks = {}  # {category: chunks waiting to be embedded}
+        store_creation_results = {}
+        dedup_runs = []
+        category_distribution = {}
+        source_files = set()
+        total_chunks = 0
+        total_characters = 0
+        
+        def flush(category: str):
+            chunks = pending_chunks.pop(category, [])
+            if not chunks:
+                return
+            
+            if self.config.DEDUP_SETTINGS['enabled']:
+                # Duplicates are only detected within a flushed batch
+                chunks, stats = self.duplicate_filter.deduplicate(chunks)
+                dedup_runs.append(stats)
+            
+            if category not in store_creation_results:
+                # First batch for this category in this run replaces any previous store
+                results = self.category_store_manager.create_category_stores({category: chunks}, store_prefix)
+                store_creation_results[category] = results[category]
+            elif store_creation_results[category]:
+                store_creation_results[category] = self.category_store_manager.add_documents_to_category(
+                    category, chunks
+                )
+        
+        try:
+            logger.info(f"Starting streaming document processing pipeline for {len(file_paths)} files")
+            
+            # Stores of the previous prefix would otherwise be saved and served alongside this run's
+            self.category_store_manager.unload_category_stores()
+            
+            for file_path in file_paths:
+                categorized = len(categorizations)
+                try:
+                    pages = self.document_processor.iter_document_pages(
+                        file_path, categorize=True, categorizations=categorizations
+                    )
+                    file_chunks = list(self.document_processor.iter_split_documents(pages, start_chunk_id=total_chunks))
+                
+                except Exception as e:
+                    logger.error(f"Failed to stream {file_path}: {e}")
+                    failed_files.append(file_path)
+                    del categorizations[categorized:]
+                    continue
+                
+                for chunk in file_chunks:
+                    category = chunk.metadata.get('category', 'other')
+                    pending_chunks.setdefault(category, []).append(chunk)
+                    
+                    total_chunks += 1
+                    total_characters += len(chunk.page_content)
+                    category_distribution[category] = category_distribution.get(category, 0) + 1
+                    source_files.add(chunk.metadata.get('source', 'Unknown'))
+                    
+                    if len(pending_chunks[category]) >= batch_size:
+                        flush(category)
+                
+                logger.info(f"Streamed: {file_path}")
+            
+            for category in list(pending_chunks.keys()):
+                flush(category)
+            
+            if not total_chunks:
+                raise ValueError("No documents were successfully loaded")
+            
+            save_results = self.category_store_manager.save_category_stores()
+            self.analyzer.setup_with_category_stores(store_prefix, rebuild_chains=True)
+            
+            # Update pipeline state (pages are not retained in streaming mode)
+            self.processed_documents = []
+            self.categorizations = categorizations
+            self.current_store_prefix = store_prefix
+            self.available_categories = list(category_distribution.keys())
+            self.pipeline_ready = True
+            
+            result = {
+                "success": True,
+                "store_prefix": store_prefix,
+                "ingestion_mode": "streaming",
+                "documents_processed": len(file_paths) - len(failed_files),
+                "failed_files": failed_files,
+                "chunks_created": total_chunks,
+                "categories_found": list(category_distribution.keys()),
+                "categorizations": categorizations,
+                "category_distribution": category_distribution,
+                "store_creation_results": store_creation_results,
+                "store_save_results": save_results,
+                "deduplication": (NearDuplicateFilter.combine_stats(dedup_runs)
+                                  if self.config.DEDUP_SETTINGS['enabled'] else None),
+                "document_stats": {
+                    'total_documents': total_chunks,
+                    'total_characters': total_characters,
+                    'average_chunk_size': total_characters / total_chunks,
+                    'unique_sources': len(source_files),
+                    'source_files': list(source_files),
+                    'categories': category_distribution
+                },
+                "category_stats": self.document_processor.get_categories_summary(categorizations),
+                "store_info": self.category_store_manager.get_category_info(),
+                "processing_timestamp": datetime.now().isoformat(),
+                "features_enabled": {
+                    "categorization": True,
+                    "category_specific_stores": True,
+                    "document_comparison": True
+                }
+            }
+            
+            logger.info(f"Streaming pipeline processing completed successfully: {store_prefix}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error in streaming document processing pipeline: {e}")
+            raise
+    
+    def _process_documents_pipelined(self, file_paths: List[str], store_prefix: str) -> Dict[str, Any]:
+        """
+        Pipelined ingestion: load, preprocess, categorize, split, embed and index run
+        as concurrent stages joined by bounded queues, see StagedIngestionPipeline
+        """
+        
+        try:
+            logger.info(f"Starting pipelined document processing for {len(file_paths)} files")
+            
+            # Stores of the previous prefix would otherwise be saved and served alongside this run's
+            self.category_store_manager.unload_category_stores()
+            run = self.staged_ingestion.run(file_paths, store_prefix)
+            
+            if not run['chunks_created']:
+                raise ValueError("No documents were successfully loaded")
+            
+            # Categories keep whatever batches were indexed; failed batches are reported, not hidden
+            indexed_categories = [category for category, indexed in run['store_creation_results'].items() if indexed]
+            if not indexed_categories:
+                raise ValueError("No chunks could be embedded and indexed")
+            if run['failed_chunks']:
+                logger.warning(f"{sum(run['failed_chunks'].values())} chunks could not be embedded or indexed "
+                               f"({run['failed_chunks']}); affected files: {run['incomplete_files']}")
+            
+            save_results = self.category_store_manager.save_category_stores()
+            self.analyzer.setup_with_category_stores(store_prefix, rebuild_chains=True)
+            
+            # Update pipeline state (pages are not retained in pipelined mode)
+            self.processed_documents = []
+            self.categorizations = run['categorizations']
+            self.current_store_prefix = store_prefix
+            self.available_categories = indexed_categories
+            self.pipeline_ready = True
+            
+            total_chunks = run['chunks_created']
+            result = {
+                "success": True,
+                "store_prefix": store_prefix,
+                "ingestion_mode": "pipelined",
+                "documents_processed": len(file_paths) - len(run['failed_files']),
+                "failed_files": run['failed_files'],
+                "chunks_created": total_chunks,
+                "categories_found": list(run['category_distribution'].keys()),
+                "categorizations": run['categorizations'],
+                "category_distribution": run['category_distribution'],
+                "store_creation_results": run['store_creation_results'],
+                "failed_chunks": run['failed_chunks'],
+                "incomplete_files": run['incomplete_files'],
+                "store_save_results": save_results,
+                "deduplication": run['deduplication'],
+                "stage_stats": run['stage_stats'],
+                "document_stats": {
+                    'total_documents': total_chunks,
+                    'total_characters': run['total_characters'],
+                    'average_chunk_size': run['total_characters'] / total_chunks,
+                    'unique_sources': len(run['source_files']),
+                    'source_files': run['source_files'],
+                    'categories': run['category_distribution']
+                },
+                "category_stats": self.document_processor.get_categories_summary(run['categorizations']),
+                "store_info": self.category_store_manager.get_category_info(),
+                "processing_timestamp": datetime.now().isoformat(),
+                "features_enabled": {
+                    "categorization": True,
+                    "category_specific_stores": True,
+                    "document_comparison": True
+                }
+            }
+            
+            logger.info(f"Pipelined processing completed successfully: {store_prefix}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error in pipelined document processing: {e}")
+            raise
+    
+    def sync_folder(self, folder: str = None, store_prefix: str = None) -> Dict[str, Any]:
+        """
+        Incremental ingestion: bring the category stores of a stable store prefix in
+        line with a folder, embedding only added or changed files
+        """
+        
+        folder = folder or self.config.UPLOAD_FOLDER
+        store_prefix = store_prefix or self.config.INCREMENTAL_SETTINGS['store_prefix']
+        
+        try:
+            sync = self.incremental_ingestor.sync(folder, store_prefix)
+            
+            if not sync['files_tracked']:
+                raise ValueError(f"No documents could be ingested from {folder}")
+            
+            stores_changed = bool(sync['added'] or sync['changed'] or sync['removed'])
+            if stores_changed or not self.pipeline_ready or self.current_store_prefix != store_prefix:
+                self.analyzer.setup_with_category_stores(store_prefix, rebuild_chains=True)
+            
+            # Update pipeline state (pages are not retained in incremental mode)
+            self.processed_documents = []
+            self.categorizations = sync['categorizations']
+            self.current_store_prefix = store_prefix
+            self.available_categories = list(sync['category_distribution'].keys())
+            self.pipeline_ready = True
+            
+            result = {
+                "success": True,
+                "store_prefix": store_prefix,
+                "ingestion_mode": "incremental",
+                "documents_processed": sync['files_ingested'],
+                "categories_found": self.available_categories,
+                "store_info": self.category_store_manager.get_category_info(),
+                "processing_timestamp": datetime.now().isoformat()
+            }
+            result.update(sync)
+            
+            logger.info(f"Incremental sync completed: {store_prefix}")
+            return result
+        
+        except Exception as e:
+            logger.error(f"Error in incremental sync of {folder}: {e}")
+            raise
+    
+    def watch_folder(self, folder: str = None, store_prefix: str = None, interval: float = None,
+                     stop_event: threading.Event = None, max_cycles: int = None):
+        """
+        Poll a folder and sync whenever files are added, changed or removed
+        
+        Polling is used because the standard library has no portable file watcher
+        (inotify is Linux-only); an unchanged folder costs one stat per file per poll.
+        """
+        
+        folder = folder or self.config.UPLOAD_FOLDER
+        store_prefix = store_prefix or self.config.INCREMENTAL_SETTINGS['store_prefix']
+        interval = interval or self.config.INCREMENTAL_SETTINGS['poll_interval_seconds']
+        stop_event = stop_event or threading.Event()
+        
+        logger.info(f"Watching {folder} every {interval}s for store prefix '{store_prefix}'")
+        
+        cycles = 0
+        while not stop_event.is_set():
+            try:
+                changes = self.incremental_ingestor.scan(folder, store_prefix)
+                if self.incremental_ingestor.has_changes(changes) or not self.pipeline_ready:
+                    self.sync_folder(folder, store_prefix)
+            except Exception as e:
+                logger.error(f"Watch cycle failed: {e}")
+            
+            cycles += 1
+            if max_cycles and cycles >= max_cycles:
+                break
+            stop_event.wait(interval)
+    
     def load_existing_category_stores(self, store_prefix: str) -> Dict[str, Any]:
         """Load documents from existing category-specific vector stores"""
         
         try:
             logger.info(f"Loading existing category stores with prefix: {store_prefix}")
             
-            # Load category stores
+            # Load category stores, replacing those of any other prefix
+            self.category_store_manager.unload_category_stores()
             load_results = self.category_store_manager.load_category_stores(store_prefix)
             
             if not any(load_results.values()):
                 raise ValueError(f"No category stores found with prefix: {store_prefix}")
             
             # Setup analyzer with loaded stores
-            self.analyzer.setup_with_category_stores(store_prefix)
+            self.analyzer.setup_with_category_stores(store_prefix, rebuild_chains=True)
             
             # Update pipeline state
             self.current_store_prefix = store_prefix
@@ -364,6 +701,11 @@ class LegalRAGPipeline:
                 "document_comparison": len(self.available_categories) >= 2,
                 "cross_category_queries": True
             },
+            # Reported only once built, so a status check right after startup does not build them
+            "parsed_text_cache": (self.document_processor.get_parsed_text_cache_stats()
+                                  if self.services.is_built('document_processor') else {'initialized': False}),
+            "ingestion_stage_stats": (self._staged_ingestion.get_stats()
+                                      if self._staged_ingestion is not None else {'initialized': False}),
             "analyzer_status": self.analyzer.get_status() if self.pipeline_ready else None,
             "category_info": self.get_category_info() if self.pipeline_ready else None
         }
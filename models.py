@@ -1,65 +1,140 @@
+import os
+import time
 import logging
+import threading
 from config import Config
 
-# Updated imports for latest LangChain versions
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-import google.generativeai as genai
+# Model SDKs (LangChain, langchain_google_genai, google.generativeai) take seconds to
+# import, so they are imported by the factories below when a model is first needed
 
 logger = logging.getLogger(__name__)
 
 class ModelManager:
-    """Manages AI models for embeddings and language generation"""
+    """
+    Manages AI models for embeddings and language generation
+    
+    Each model is created on first use, so processes that only serve health checks
+    or never query never pay for the model SDK imports.
+    """
     
     def __init__(self):
         self.config = Config()
         self.config.validate_config()
         
-        # Configure Google Generative AI
-        genai.configure(api_key=self.config.GEMINI_API_KEY)
-        
         self.embeddings = None
         self.llm = None
         
-        self._initialize_models()
+        self._lock = threading.Lock()
+        self._genai_configured = False
+        self.init_seconds = {}  # {'embeddings' | 'llm': seconds to import and create}
     
-    def _initialize_models(self):
-        """Initialize embedding and language models"""
-        try:
-            # Initialize embeddings with updated import
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model=self.config.EMBEDDING_MODEL,
-                google_api_key=self.config.GEMINI_API_KEY
+    def _configure_genai(self):
+        """Configure Google Generative AI once, before the first Gemini model is created"""
+        if self._genai_configured or not self.config.GEMINI_API_KEY:
+            return
+        
+        import google.generativeai as genai
+        genai.configure(api_key=self.config.GEMINI_API_KEY)
+        self._genai_configured = True
+    
+    def _create_embeddings(self):
+        """Create the embedding model of Config.EMBEDDING_BACKEND"""
+        backend = self.config.EMBEDDING_BACKEND
+        
+        if backend == 'local':
+            from local_embeddings import LocalHashingEmbeddings
+
+            # Cheaper to compute than to look up, so neither batched nor cached
+            settings = self.config.LOCAL_EMBEDDING_SETTINGS
+            return LocalHashingEmbeddings(settings['dimension'], settings['use_bigrams'])
+        
+        if backend != 'google':
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from embedding_cache import EmbeddingCache, CachedEmbeddings
+        from embedding_executor import EmbeddingExecutor
+        
+        self._configure_genai()
+        embeddings = EmbeddingExecutor(GoogleGenerativeAIEmbeddings(
+            model=self.config.EMBEDDING_MODEL,
+            google_api_key=self.config.GEMINI_API_KEY
+        ))
+        
+        # Only texts never embedded before (under any store prefix) reach the API
+        cache_settings = self.config.EMBEDDING_CACHE_SETTINGS
+        if cache_settings['enabled']:
+            embeddings = CachedEmbeddings(
+                embeddings,
+                EmbeddingCache(os.path.join(self.config.LOGS_FOLDER, cache_settings['folder'])),
+                self.config.EMBEDDING_MODEL,
+                cache_queries=cache_settings['cache_queries']
             )
+        
+        return embeddings
+    
+    def _create_llm(self):
+        """Create the chat model of Config.LLM_BACKEND"""
+        backend = self.config.LLM_BACKEND
+        
+        if backend == 'local':
+            from local_llm import LocalChatModel
             
-            # Initialize LLM with ChatGoogleGenerativeAI for better conversation handling
-            self.llm = ChatGoogleGenerativeAI(
-                model=self.config.LLM_MODEL,
-                google_api_key=self.config.GEMINI_API_KEY,
-                temperature=0.1,
-                max_output_tokens=2048,
-                convert_system_message_to_human=True  # For better system prompt handling
-            )
+            logger.warning("Using the local stand-in chat model: answers and categories are not real")
+            return LocalChatModel.from_settings(self.config.LOCAL_LLM_SETTINGS)
+        
+        if backend != 'google':
+            raise ValueError(f"Unknown LLM backend: {backend}")
+        
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        
+        self._configure_genai()
+        # ChatGoogleGenerativeAI for better conversation handling
+        return ChatGoogleGenerativeAI(
+            model=self.config.LLM_MODEL,
+            google_api_key=self.config.GEMINI_API_KEY,
+            temperature=0.1,
+            max_output_tokens=2048,
+            convert_system_message_to_human=True  # For better system prompt handling
+        )
+    
+    def _get_or_create(self, name: str, create):
+        """Create a model on first use; the lock keeps concurrent first requests from creating it twice"""
+        model = getattr(self, name)
+        if model is not None:
+            return model
+        
+        with self._lock:
+            model = getattr(self, name)
+            if model is not None:
+                return model
             
-            logger.info("Models initialized successfully")
+            try:
+                started = time.perf_counter()
+                model = create()
+                self.init_seconds[name] = round(time.perf_counter() - started, 3)
+            except Exception as e:
+                logger.error(f"Error initializing {name}: {e}")
+                raise
             
-        except Exception as e:
-            logger.error(f"Error initializing models: {e}")
-            raise
+            setattr(self, name, model)
+            logger.info(f"Initialized {name} in {self.init_seconds[name]:.2f}s")
+            return model
     
     def get_embeddings(self):
         """Get the embeddings model"""
-        return self.embeddings
+        return self._get_or_create('embeddings', self._create_embeddings)
     
     def get_llm(self):
         """Get the language model"""
-        return self.llm
+        return self._get_or_create('llm', self._create_llm)
     
     def test_models(self):
         """Test if models are working correctly"""
         try:
             # Test embeddings
             test_text = "This is a test document for legal analysis."
-            embedding_result = self.embeddings.embed_query(test_text)
+            embedding_result = self.get_embeddings().embed_query(test_text)
             
             if embedding_result and len(embedding_result) > 0:
                 logger.info(f"Embeddings test passed - dimension: {len(embedding_result)}")
@@ -67,7 +142,7 @@ class ModelManager:
                 raise Exception("Embeddings test failed")
             
             # Test LLM
-            llm_result = self.llm.invoke("Say 'Hello, Legal AI is working!'")
+            llm_result = self.get_llm().invoke("Say 'Hello, Legal AI is working!'")
             logger.info(f"LLM test passed - response: {llm_result.content[:100]}...")
             
             return True
@@ -78,10 +153,12 @@ class ModelManager:
 
 # Global model manager instance
 model_manager = None
+_model_manager_lock = threading.Lock()
 
 def get_model_manager():
-    """Get or create the global model manager instance"""
+    """Get or create the global model manager instance (models themselves are created on first use)"""
     global model_manager
-    if model_manager is None:
-        model_manager = ModelManager()
+    with _model_manager_lock:
+        if model_manager is None:
+            model_manager = ModelManager()
     return model_manager
\ No newline at end of file
@@ -0,0 +1,171 @@
+# parsed_text_cache.py - Content-addressed On-disk Cache of Parsed Document Text
+
+import os
+import json
+import logging
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class ParsedTextCache:
+    """
+    Stores the cleaned pages of parsed documents on disk, keyed by a SHA-256 of
+    the file bytes plus the preprocessing version, with LRU eviction
+    """
+    
+    def __init__(self, preprocessing_version: str):
+        self.config = Config()
+        self.settings = self.config.PARSED_TEXT_CACHE_SETTINGS
+        self.preprocessing_version = preprocessing_version
+        self.cache_folder = os.path.join(self.config.LOGS_FOLDER, self.settings['folder'])
+        self._lock = threading.Lock()
+        self.cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0
+        }
+        
+        os.makedirs(self.cache_folder, exist_ok=True)
+    
+    def make_key(self, file_path: str) -> str:
+        """Hash the file contents together with the preprocessing version"""
+        digest = hashlib.sha256()
+        
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        
+        digest.update(f"|preprocessing:{self.preprocessing_version}".encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_folder, f"{key}.json")
+    
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached pages for a key, or None on a miss"""
+        entry_path = self._entry_path(key)
+        
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                pages = json.load(f)['pages']
+            
+            # Touch the entry so eviction treats it as recently used
+            os.utime(entry_path, None)
+            
+            with self._lock:
+                self.cache_stats['hits'] += 1
+            return pages
+        
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Discarding unreadable parsed text cache entry {key}: {e}")
+            self._remove(entry_path)
+        
+        with self._lock:
+            self.cache_stats['misses'] += 1
+        return None
+    
+    def put(self, key: str, pages: List[Dict[str, Any]]):
+        """Store cleaned pages ({'page_content', 'metadata'} dicts) under a key"""
+        entry_path = self._entry_path(key)
+        temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'preprocessing_version': self.preprocessing_version, 'pages': pages},
+                          f, ensure_ascii=False, default=str)
+            
+            # Atomic rename so concurrent readers never see a partial entry
+            os.replace(temp_path, entry_path)
+            
+            with self._lock:
+                self.cache_stats['writes'] += 1
+            
+            self._evict()
+        
+        except Exception as e:
+            logger.warning(f"Could not write parsed text cache entry {key}: {e}")
+            self._remove(temp_path)
+    
+    def _evict(self):
+        """Drop least recently used entries until the cache is within its size caps"""
+        max_entries = self.settings['max_entries']
+        max_bytes = self.settings['max_size_mb'] * 1024 * 1024
+        
+        entries = []
+        for entry in os.scandir(self.cache_folder):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                except FileNotFoundError:
+                    continue
+        
+        total_bytes = sum(size for _, size, _ in entries)
+        entries.sort()  # Oldest access first
+        
+        while entries and (len(entries) > max_entries or total_bytes > max_bytes):
+            _, size, path = entries.pop(0)
+            self._remove(path)
+            total_bytes -= size
+            with self._lock:
+                self.cache_stats['evictions'] += 1
+    
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current cache size"""
+        entries = 0
+        total_bytes = 0
+        
+        try:
+            for entry in os.scandir(self.cache_folder):
+                if entry.name.endswith('.json'):
+                    entries += 1
+                    total_bytes += entry.stat().st_size
+        except OSError:
+            pass
+        
+        with self._lock:
+            stats = self.cache_stats.copy()
+        
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'hit_rate': round(stats['hits'] / lookups, 3) if lookups else 0.0,
+            'entries': entries,
+            'size_mb': round(total_bytes / (1024 * 1024), 2),
+            'max_entries': self.settings['max_entries'],
+            'max_size_mb': self.settings['max_size_mb'],
+            'preprocessing_version': self.preprocessing_version
+        })
+        return stats
+    
+    def clear(self) -> bool:
+        """Remove every cached entry"""
+        try:
+            for entry in os.scandir(self.cache_folder):
+                if entry.name.endswith('.json'):
+                    self._remove(entry.path)
+            logger.info("Parsed text cache cleared")
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing parsed text cache: {e}")
+            return False
+
+# Example usage
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    cache = ParsedTextCache(preprocessing_version="example")
+    print(f"Parsed text cache folder: {cache.cache_folder}")
+    print(f"Cache statistics: {cache.get_stats()}")
\ No newline at end of file
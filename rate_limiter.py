@@ -0,0 +1,226 @@
+# rate_limiter.py - Token-bucket Rate Limiting with Jittered Backoff for LLM Calls
+
+import re
+import time
+import random
+import logging
+import threading
+from typing import Callable, Dict, Any
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Server-error status codes as whole tokens, so '10500' or a port number is not taken for a 500
+_TRANSIENT_STATUS = re.compile(r'\b(?:408|50[0234])\b')
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an exception from the LLM client means the request was throttled (HTTP 429)"""
+    
+    if getattr(error, 'code', None) == 429 or getattr(error, 'status_code', None) == 429:
+        return True
+    
+    # google.api_core raises ResourceExhausted; wrapped errors only keep the message
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in ('resourceexhausted', 'resource_exhausted', 'resource exhausted',
+                                                '429', 'rate limit', 'too many requests'))
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether an exception is worth retrying as is: timeouts, dropped connections and 5xx (not 429)"""
+    
+    if is_rate_limit_error(error):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    if isinstance(code, int):
+        return code == 408 or 500 <= code < 600
+    
+    # google.api_core raises ServiceUnavailable, DeadlineExceeded, InternalServerError...
+    message = f"{type(error).__name__} {error}".lower()
+    if any(marker in message for marker in ('serviceunavailable', 'service unavailable', 'deadlineexceeded',
+                                            'deadline exceeded', 'internalservererror', 'internal error',
+                                            'timed out', 'timeout')):
+        return True
+    return _TRANSIENT_STATUS.search(message) is not None
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at a fixed rate up to a burst capacity"""
+    
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate_per_second = rate_per_second
+        self.capacity = max(1, capacity)
+        
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+    
+    def acquire(self) -> float:
+        """Take one token, waiting until one is available; returns the seconds waited"""
+        waited = 0.0
+        
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate_per_second
+            
+            time.sleep(delay)
+            waited += delay
+    
+    def drain(self):
+        """Empty the bucket, so every caller slows down after the API pushed back"""
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+
+class RateLimiter:
+    """
+    Paces calls with a token bucket matched to the API quota and retries
+    throttled calls with exponential backoff and jitter
+    """
+    
+    def __init__(self, requests_per_minute: float = None, burst: int = None, max_retries: int = None,
+                 backoff_base_seconds: float = None, backoff_max_seconds: float = None):
+        settings = Config.LLM_RATE_LIMIT_SETTINGS
+        
+        self.requests_per_minute = requests_per_minute or settings['requests_per_minute']
+        self.max_retries = settings['max_retries'] if max_retries is None else max_retries
+        self.backoff_base_seconds = backoff_base_seconds or settings['backoff_base_seconds']
+        self.backoff_max_seconds = backoff_max_seconds or settings['backoff_max_seconds']
+        self.bucket = TokenBucket(self.requests_per_minute / 60.0, burst or settings['burst'])
+        
+        self._lock = threading.Lock()
+        self.stats = {
+            'calls': 0,
+            'rate_limited': 0,
+            'retries': 0,
+            'failed_calls': 0,
+            'throttle_wait_seconds': 0.0,
+            'backoff_seconds': 0.0
+        }
+    
+    def _record(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        # Equal jitter: at least half the exponential delay, so retries stay spread out
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+    
+    def call(self, func: Callable, *args, **kwargs):
+        """Call func within the rate limit, retrying it while the API answers 429"""
+        
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire()
+            self._record(calls=1, throttle_wait_seconds=waited)
+            
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    self._record(failed_calls=1)
+                    raise
+                
+                self._record(rate_limited=1)
+                if attempt == self.max_retries:
+                    self._record(failed_calls=1)
+                    logger.error(f"Still rate limited after {self.max_retries} retries: {e}")
+                    raise
+                
+                delay = self._backoff_delay(attempt)
+                self.bucket.drain()
+                self._record(retries=1, backoff_seconds=delay)
+                logger.warning(f"Rate limited (attempt {attempt + 1}/{self.max_retries + 1}), "
+                               f"retrying in {delay:.2f}s")
+                time.sleep(delay)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = self.stats.copy()
+        
+        stats.update({
+            'requests_per_minute': self.requests_per_minute,
+            'burst': self.bucket.capacity,
+            'throttle_wait_seconds': round(stats['throttle_wait_seconds'], 3),
+            'backoff_seconds': round(stats['backoff_seconds'], 3)
+        })
+        return stats
+
+# Global limiter shared by every LLM caller in the process, since they share one quota
+_llm_rate_limiter = None
+_llm_rate_limiter_lock = threading.Lock()
+
+def get_llm_rate_limiter() -> RateLimiter:
+    """Get or create the global LLM rate limiter"""
+    global _llm_rate_limiter
+    with _llm_rate_limiter_lock:
+        if _llm_rate_limiter is None:
+            _llm_rate_limiter = RateLimiter()
+    return _llm_rate_limiter
+
+# Example usage: synthetic categorization run against a local fake LLM with latency and 429s
+if __name__ == "__main__":
+    import re
+    import json
+    from langchain.schema import Document
+    from document_categorizer import DocumentCategorizer
+    
+    logging.basicConfig(level=logging.ERROR)
+    
+    class FakeRateLimitError(Exception):
+        code = 429
+    
+    class FakeResponse:
+        def __init__(self, content):
+            self.content = content
+    
+    class FakeLLM:
+        """Answers the category named in the document, after 50-300 ms, with 20% 429s"""
+        
+        def __init__(self, seed: int = 7):
+            self._random = random.Random(seed)
+            self._lock = threading.Lock()
+        
+        def invoke(self, prompt):
+            with self._lock:
+                latency = self._random.uniform(0.05, 0.3)
+                throttled = self._random.random() < 0.2
+            time.sleep(latency)
+            if throttled:
+                raise FakeRateLimitError("429 Resource has been exhausted (e.g. check quota).")
+            
+            category = re.findall(r'Expected category: (\w+)', prompt)[-1]
+            return FakeResponse(json.dumps({'category': category, 'confidence': 0.9, 'explanation': 'fake'}))
+    
+    Config.CATEGORIZATION_SETTINGS.update({'use_cache': False, 'batch_size': 1})
+    categories = ['contract', 'policy', 'employment', 'privacy_policy', 'financial', 'license']
+    documents = [
+        Document(page_content=f"Document {i}. Expected category: {categories[i % len(categories)]}. " * 3,
+                 metadata={'source': f'synthetic_{i}.pdf'})
+        for i in range(24)
+    ]
+    
+    for concurrency in (1, 4):
+        Config.CATEGORIZATION_SETTINGS['max_concurrency'] = concurrency
+        limiter = RateLimiter(requests_per_minute=600, burst=4, backoff_base_seconds=0.1, backoff_max_seconds=1.0)
+        categorizer = DocumentCategorizer(llm=FakeLLM(), rate_limiter=limiter)
+        
+        started = time.perf_counter()
+        results = categorizer.categorize_documents(documents)
+        elapsed = time.perf_counter() - started
+        
+        in_order = all(result['category'] == categories[i % len(categories)] for i, result in enumerate(results))
+        print(f"max_concurrency={concurrency}: {len(results)} documents in {elapsed:.2f}s, "
+              f"results in input order: {in_order}")
+        print(f"  limiter: {limiter.get_stats()}")
\ No newline at end of file
@@ -170,7 +170,7 @@ class CategoryAwareLegalRAGChain:
                         },
                         return_source_documents=True,
                         verbose=True,
-                        max_tokens_limit=4000
+                        max_tokens_limit=self.config.RETRIEVAL_MAX_TOKENS
                     )
                     
                     self.category_chains[category] = chain
@@ -391,6 +391,10 @@ class CategoryAwareLegalRAGChain:
                 "content_preview": self._create_content_preview(doc.page_content),
                 "upload_date": doc.metadata.get("upload_date"),
                 "chunk_id": doc.metadata.get("chunk_id"),
+                "section_path": doc.metadata.get("section_path"),  # Set by the 'clauses' chunking strategy
+                "start_index": doc.metadata.get("start_index"),  # Set by the 'spans' chunking strategy
+                "end_index": doc.metadata.get("end_index"),
+                "duplicate_sources": doc.metadata.get("duplicate_sources", []),  # Copies dropped before embedding
                 "confidence": doc.metadata.get("category_confidence")
             }
             
@@ -499,10 +503,10 @@ class CategoryAwareLegalRAGChain:
 class LegalDocumentAnalyzer:
     """High-level interface for category-aware legal document analysis with comparison features"""
     
-    def __init__(self):
+    def __init__(self, category_store_manager: CategoryVectorStoreManager = None):
         self.config = Config()
         self.rag_chain = CategoryAwareLegalRAGChain()
-        self.category_store_manager = CategoryVectorStoreManager()
+        self.category_store_manager = category_store_manager or CategoryVectorStoreManager()
         self._is_ready = False
         self._available_categories = []
         # Use the same LLM as the RAG chain for direct document comparison
@@ -517,9 +521,17 @@ class LegalDocumentAnalyzer:
         else:
             return str(response)
     
-    def setup_with_category_stores(self, store_prefix: str = "legal_docs"):
-        """Setup analyzer with category-based vector stores"""
+    def setup_with_category_stores(self, store_prefix: str = "legal_docs", rebuild_chains: bool = False):
+        """
+        Setup analyzer with category-based vector stores
+        
+        rebuild_chains recreates chains for categories that already have one, which is
+        needed after their stores changed on disk (e.g. an incremental sync).
+        """
         try:
+            if rebuild_chains:
+                self.rag_chain.category_chains = {}
+
             # Load category stores
             load_results = self.category_store_manager.load_category_stores(store_prefix)
             
@@ -0,0 +1,180 @@
+# services.py - Process-wide Service Registry with Lifecycle Hooks
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+class ServiceRegistry:
+    """
+    Builds each shared service once per process and hands out that instance
+    
+    Services are registered by name with a factory, which receives the registry
+    so a service can get the services it depends on, and an optional close hook.
+    start() builds services eagerly (e.g. at app startup); shutdown() runs the
+    close hooks in reverse construction order, then the shutdown hooks.
+    """
+    
+    def __init__(self):
+        self._factories = {}  # {name: factory(registry)}
+        self._closers = {}  # {name: close(instance)}
+        self._instances = {}
+        self._construction_order = []
+        self._startup_hooks = []
+        self._shutdown_hooks = []
+        self._build_seconds = {}
+        
+        # Reentrant: a factory calls get() for its dependencies while the lock is held
+        self._lock = threading.RLock()
+    
+    def register(self, name: str, factory: Callable[['ServiceRegistry'], Any], close: Callable[[Any], None] = None):
+        """Register (or replace, before it is built) the factory of a service"""
+        with self._lock:
+            if name in self._instances:
+                raise ValueError(f"Service '{name}' is already built")
+            self._factories[name] = factory
+            if close is not None:
+                self._closers[name] = close
+    
+    def provide(self, name: str, instance: Any, close: Callable[[Any], None] = None):
+        """Register an already built instance, e.g. a fake in a synthetic run"""
+        with self._lock:
+            self._factories[name] = lambda registry: instance
+            self._instances[name] = instance
+            self._construction_order.append(name)
+            if close is not None:
+                self._closers[name] = close
+    
+    def get(self, name: str) -> Any:
+        """The shared instance of a service, built on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            if name not in self._factories:
+                raise KeyError(f"Unknown service: {name}")
+            
+            started = time.perf_counter()
+            instance = self._factories[name](self)
+            self._build_seconds[name] = round(time.perf_counter() - started, 3)
+            
+            self._instances[name] = instance
+            self._construction_order.append(name)
+            logger.info(f"Service '{name}' built in {self._build_seconds[name]:.2f}s")
+            return instance
+    
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+    
+    def on_startup(self, hook: Callable[['ServiceRegistry'], None]):
+        """Run hook after start() has built the services"""
+        self._startup_hooks.append(hook)
+    
+    def on_shutdown(self, hook: Callable[['ServiceRegistry'], None]):
+        """Run hook after shutdown() has closed the services"""
+        self._shutdown_hooks.append(hook)
+    
+    def start(self, names: List[str] = None) -> Dict[str, float]:
+        """Build the named services (default: all registered) and run the startup hooks"""
+        for name in names or list(self._factories):
+            self.get(name)
+        
+        for hook in self._startup_hooks:
+            hook(self)
+        
+        return dict(self._build_seconds)
+    
+    def shutdown(self):
+        """Close built services in reverse construction order and forget them"""
+        with self._lock:
+            for name in reversed(self._construction_order):
+                close = self._closers.get(name)
+                if close is None:
+                    continue
+                try:
+                    close(self._instances[name])
+                except Exception as e:
+                    logger.warning(f"Error closing service '{name}': {e}")
+            
+            self._instances.clear()
+            self._construction_order.clear()
+        
+        for hook in self._shutdown_hooks:
+            try:
+                hook(self)
+            except Exception as e:
+                logger.warning(f"Shutdown hook failed: {e}")
+        
+        logger.info("Services shut down")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'registered': sorted(self._factories),
+            'built': list(self._construction_order),
+            'build_seconds': dict(self._build_seconds)
+        }
+
+# Factories import their modules when first called, so importing this module stays cheap
+def _build_categorizer(registry: ServiceRegistry):
+    from document_categorizer import DocumentCategorizer
+    return DocumentCategorizer()
+
+def _build_document_processor(registry: ServiceRegistry):
+    from document_processor import DocumentProcessor
+    return DocumentProcessor(categorizer=registry.get('categorizer'))
+
+def _build_category_store_manager(registry: ServiceRegistry):
+    from category_vector_store_manager import CategoryVectorStoreManager
+    return CategoryVectorStoreManager()
+
+def _build_analyzer(registry: ServiceRegistry):
+    from retrieval_chain import LegalDocumentAnalyzer
+    return LegalDocumentAnalyzer(category_store_manager=registry.get('category_store_manager'))
+
+def _build_duplicate_filter(registry: ServiceRegistry):
+    from deduplication import NearDuplicateFilter
+    return NearDuplicateFilter()
+
+def register_default_services(registry: ServiceRegistry) -> ServiceRegistry:
+    """Register the pipeline's shared services"""
+    registry.register('categorizer', _build_categorizer, close=lambda categorizer: categorizer.close())
+    registry.register('document_processor', _build_document_processor)
+    registry.register('category_store_manager', _build_category_store_manager)
+    registry.register('analyzer', _build_analyzer)
+    registry.register('duplicate_filter', _build_duplicate_filter)
+    return registry
+
+# Global registry shared by every pipeline in the process
+_services = None
+_services_lock = threading.Lock()
+
+def get_services() -> ServiceRegistry:
+    """Get or create the global service registry"""
+    global _services
+    with _services_lock:
+        if _services is None:
+            _services = register_default_services(ServiceRegistry())
+    return _services
+
+# Example usage: two pipelines share one categorizer, built once
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    services = get_services()
+    print(f"Startup build times: {services.start()}")
+    
+    from main_pipeline import LegalRAGPipeline
+    
+    first = LegalRAGPipeline(services)
+    second = LegalRAGPipeline(services)
+    print(f"Categorizer shared: {first.categorizer is second.categorizer is first.document_processor.categorizer}")
+    print(f"Store manager shared with the analyzer: "
+          f"{first.category_store_manager is first.analyzer.category_store_manager}")
+    print(services.get_stats())
+    
+    services.shutdown()
\ No newline at end of file
@@ -0,0 +1,472 @@
+# text_chunker.py - Offset-based Chunking of Cleaned Page Text
+
+import re
+import math
+import logging
+from array import array
+from typing import List, Dict, Any, Iterator, Tuple
+
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+# Word runs and single punctuation marks, the units the token estimate is built from
+_TOKEN_PIECE = re.compile(r'\w+|[^\w\s]')
+
+# Whitespace after a sentence or clause terminator
+_CLAUSE_BOUNDARY = re.compile(r'(?<=[.;:])\s+')
+
+_WORD_SPAN = re.compile(r'\S+')
+
+# Clause and section headings inline in whitespace-collapsed text: "ARTICLE V",
+# and "Section 4.2", "4.2 Termination" or "1. Term" at the start of a sentence
+# or right after an upper-case heading title
+_HEADING = re.compile(
+    r'\bARTICLE\s+(?P<article>[IVXLC]+|\d+)\b'
+    r'|(?:^|(?<=[.:;)] ))(?:Section|SECTION)\s+(?P<section>\d{1,3}(?:\.\d{1,3})*)\b'
+    r'|(?:^|(?<=[.:;)] )|(?<=[A-Z][A-Z] ))(?P<number>\d{1,2}(?:\.\d{1,2})*)\.?(?= [A-Z])'
+)
+
+# Capitalized words that open a sentence rather than continue a heading title
+_SENTENCE_OPENERS = {
+    'The', 'This', 'These', 'That', 'Each', 'Either', 'Neither', 'In', 'If', 'For', 'Any',
+    'All', 'No', 'Upon', 'Unless', 'Except', 'Subject', 'Notwithstanding', 'Nothing', 'A', 'An'
+}
+
+_TITLE_CONNECTORS = {'of', 'and', 'or', 'to', 'for', 'from', 'the', 'in', 'on', 'by', 'with', '&'}
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the subword token count of text without a model tokenizer
+    
+    Each punctuation mark is one token and each word about one token per four
+    characters, which tracks SentencePiece-style tokenizers on English legal text.
+    """
+    return sum(
+        math.ceil(len(piece) / 4) if piece[0].isalnum() or piece[0] == '_' else 1
+        for piece in _TOKEN_PIECE.findall(text)
+    )
+
+def count_headings(text: str) -> int:
+    """Count the article, section and numbered clause headings in text"""
+    return sum(1 for _ in _HEADING.finditer(text))
+
+class ChunkSpans:
+    """
+    Chunks recorded as (page_id, start, end) character spans into cleaned pages.
+    
+    Chunk text and metadata are only built when a chunk is read, so holding the
+    chunks of a large batch costs three integer arrays instead of a copy of every
+    chunk's text and page metadata.
+    """
+    
+    def __init__(self, pages: List[Document], total_chunks: int = None,
+                 extra_metadata: Dict[int, Dict[str, Any]] = None):
+        self.pages = pages
+        self.page_ids = array('I')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.chunk_ids = array('I')
+        self._total_chunks = total_chunks
+        self.extra_metadata = extra_metadata if extra_metadata is not None else {}  # {chunk_id: metadata}
+    
+    def append(self, page_id: int, start: int, end: int, chunk_id: int = None):
+        """Record a chunk span; chunk ids default to the position in this collection"""
+        self.chunk_ids.append(len(self.page_ids) if chunk_id is None else chunk_id)
+        self.page_ids.append(page_id)
+        self.starts.append(start)
+        self.ends.append(end)
+    
+    @property
+    def total_chunks(self) -> int:
+        """Chunk count of the whole split, which subsets keep reporting"""
+        return self._total_chunks if self._total_chunks is not None else len(self.page_ids)
+    
+    def __len__(self) -> int:
+        return len(self.page_ids)
+    
+    def __getitem__(self, index: int) -> Document:
+        return self.to_document(index)
+    
+    def __iter__(self) -> Iterator[Document]:
+        for index in range(len(self)):
+            yield self.to_document(index)
+    
+    def text(self, index: int) -> str:
+        """Materialize the text of one chunk"""
+        return self.pages[self.page_ids[index]].page_content[self.starts[index]:self.ends[index]]
+    
+    def metadata(self, index: int) -> Dict[str, Any]:
+        """Build the metadata of one chunk from its page metadata"""
+        start, end = self.starts[index], self.ends[index]
+        
+        metadata = dict(self.pages[self.page_ids[index]].metadata)
+        metadata.update({
+            'chunk_id': self.chunk_ids[index],
+            'chunk_size': end - start,
+            'total_chunks': self.total_chunks,
+            'start_index': start,  # Character offsets into the cleaned page text
+            'end_index': end
+        })
+        metadata.update(self.extra_metadata.get(self.chunk_ids[index], {}))
+        return metadata
+    
+    def set_extra_metadata(self, index: int, values: Dict[str, Any]):
+        """Attach chunk-level metadata that does not come from the page"""
+        self.extra_metadata.setdefault(self.chunk_ids[index], {}).update(values)
+    
+    def to_document(self, index: int) -> Document:
+        """Materialize one chunk as a LangChain Document"""
+        return Document(page_content=self.text(index), metadata=self.metadata(index))
+    
+    def texts(self) -> List[str]:
+        """Materialize all chunk texts, e.g. right before embedding"""
+        return [self.text(index) for index in range(len(self))]
+    
+    def metadatas(self) -> List[Dict[str, Any]]:
+        """Materialize all chunk metadata dicts, e.g. right before indexing"""
+        return [self.metadata(index) for index in range(len(self))]
+    
+    def subset(self, indices: List[int]) -> 'ChunkSpans':
+        """Select chunks by position, keeping their original chunk ids"""
+        selected = ChunkSpans(self.pages, total_chunks=self.total_chunks, extra_metadata=self.extra_metadata)
+        
+        for index in indices:
+            selected.append(self.page_ids[index], self.starts[index], self.ends[index], self.chunk_ids[index])
+        
+        return selected
+    
+    def group_by_category(self) -> Dict[str, 'ChunkSpans']:
+        """Group chunks by their own category if they have one, else that of their page"""
+        indices_by_category = {}
+        
+        for index, page_id in enumerate(self.page_ids):
+            category = (self.extra_metadata.get(self.chunk_ids[index], {}).get('category')
+                        or self.pages[page_id].metadata.get('category', 'other'))
+            indices_by_category.setdefault(category, []).append(index)
+        
+        grouped = {category: self.subset(indices) for category, indices in indices_by_category.items()}
+        
+        for category, spans in grouped.items():
+            logger.info(f"Category '{category}': {len(spans)} documents")
+        
+        return grouped
+
+class _SpanSplitter:
+    """Base for splitters that describe chunks as character spans over page text"""
+    
+    def split_text(self, text: str) -> List[Tuple[int, int]]:
+        raise NotImplementedError
+    
+    def split_pages(self, pages: List[Document]) -> ChunkSpans:
+        """Split every page into spans without copying any text"""
+        chunks = ChunkSpans(pages)
+        
+        for page_id, page in enumerate(pages):
+            for start, end in self.split_text(page.page_content):
+                chunks.append(page_id, start, end)
+        
+        return chunks
+
+class SpanChunker(_SpanSplitter):
+    """Splits cleaned page text into overlapping chunks, recording only character offsets"""
+    
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+    
+    def split_text(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Return (start, end) spans over text
+        
+        Chunks end at the last sentence break ('. ') in the window when there is
+        one past the window's midpoint, otherwise at the last space, and never
+        start in the middle of a word.
+        """
+        spans = []
+        length = len(text)
+        start = self._skip_spaces(text, 0)
+        
+        while start < length:
+            end = min(start + self.chunk_size, length)
+            
+            if end < length:
+                sentence_break = text.rfind('. ', start, end)
+                if sentence_break > start + self.chunk_size // 2:
+                    end = sentence_break + 1
+                else:
+                    word_break = text.rfind(' ', start, end + 1)
+                    if word_break > start:
+                        end = word_break
+            
+            spans.append((start, end))
+            
+            if end >= length:
+                break
+            
+            # Step back by the overlap, then forward to the next word start
+            next_start = max(end - self.chunk_overlap, start + 1)
+            if next_start > 0 and text[next_start - 1] != ' ':
+                word_start = text.find(' ', next_start, end)
+                next_start = word_start + 1 if word_start != -1 else end
+            start = self._skip_spaces(text, next_start)
+        
+        return spans
+    
+    @staticmethod
+    def _skip_spaces(text: str, position: int) -> int:
+        while position < len(text) and text[position] == ' ':
+            position += 1
+        return position
+
+class TokenChunker(_SpanSplitter):
+    """
+    Packs whole sentences and clauses into chunks of up to target_tokens estimated tokens
+    
+    A chunk that ends on a clause boundary starts the next chunk cleanly, so no
+    overlap is added there; overlap is only used when a single clause is longer
+    than the target and has to be cut mid-sentence.
+    """
+    
+    def __init__(self, target_tokens: int, overlap_tokens: int):
+        if overlap_tokens >= target_tokens:
+            raise ValueError("overlap_tokens must be smaller than target_tokens")
+        
+        self.target_tokens = target_tokens
+        self.overlap_tokens = overlap_tokens
+    
+    def _clauses(self, text: str) -> Iterator[Tuple[int, int]]:
+        start = 0
+        for boundary in _CLAUSE_BOUNDARY.finditer(text):
+            if boundary.start() > start:
+                yield start, boundary.start()
+            start = boundary.end()
+        
+        end = len(text.rstrip())
+        if end > start:
+            yield start, end
+    
+    def split_text(self, text: str) -> List[Tuple[int, int]]:
+        """Return (start, end) spans over text, each within the token target"""
+        spans = []
+        chunk_start, chunk_end, chunk_tokens = None, None, 0
+        
+        for clause_start, clause_end in self._clauses(text):
+            clause_tokens = estimate_tokens(text[clause_start:clause_end])
+            
+            if chunk_start is not None and chunk_tokens + clause_tokens > self.target_tokens:
+                spans.append((chunk_start, chunk_end))
+                chunk_start, chunk_end, chunk_tokens = None, None, 0
+            
+            if clause_tokens > self.target_tokens:
+                # The clause tail stays open so following clauses can pack onto it
+                pieces = self._split_long_clause(text, clause_start, clause_end)
+                spans.extend(pieces[:-1])
+                chunk_start, chunk_end = pieces[-1]
+                chunk_tokens = estimate_tokens(text[chunk_start:chunk_end])
+                continue
+            
+            if chunk_start is None:
+                chunk_start = clause_start
+            chunk_end = clause_end
+            chunk_tokens += clause_tokens
+        
+        if chunk_start is not None:
+            spans.append((chunk_start, chunk_end))
+        
+        return spans
+    
+    def _split_long_clause(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Cut an oversized clause at word boundaries, overlapping consecutive pieces"""
+        words = [(match.start(), match.end(), estimate_tokens(match.group()))
+                 for match in _WORD_SPAN.finditer(text, start, end)]
+        
+        spans = []
+        first = 0
+        while first < len(words):
+            last, tokens = first, 0
+            while last < len(words) and (last == first or tokens + words[last][2] <= self.target_tokens):
+                tokens += words[last][2]
+                last += 1
+            
+            spans.append((words[first][0], words[last - 1][1]))
+            if last >= len(words):
+                break
+            
+            # Step back over roughly overlap_tokens worth of words, always moving forward
+            next_first, overlap = last, 0
+            while next_first - 1 > first and overlap + words[next_first - 1][2] <= self.overlap_tokens:
+                next_first -= 1
+                overlap += words[next_first][2]
+            first = next_first
+        
+        return spans
+
+class ClauseChunker(_SpanSplitter):
+    """
+    Emits one chunk per detected clause or section, merging clauses shorter than
+    min_chars into their neighbours and sub-splitting clauses longer than max_chars
+    
+    Every chunk carries 'section_path' metadata such as
+    "ARTICLE V TERMINATION > 5.2 Termination for Cause". The heading stack is carried
+    across the pages of a source, so a clause continuing onto the next page keeps
+    its path.
+    """
+    
+    def __init__(self, min_chars: int, max_chars: int, chunk_overlap: int):
+        if min_chars >= max_chars:
+            raise ValueError("min_chars must be smaller than max_chars")
+        
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._sub_splitter = SpanChunker(chunk_size=max_chars, chunk_overlap=chunk_overlap)
+    
+    @staticmethod
+    def _heading(match: re.Match, text: str) -> Tuple[int, str]:
+        """Return (nesting level, label) for a heading match"""
+        following = text[match.end():match.end() + 120].split()
+        
+        if match.group('article'):
+            title = []
+            for word in following:
+                if len(word) < 2 or not word.isupper():
+                    break
+                title.append(word)
+            return 0, ' '.join([f"ARTICLE {match.group('article')}"] + title[:6])
+        
+        number = match.group('section') or match.group('number')
+        level = number.count('.') + 1
+        
+        title = []
+        for word in following[:8]:
+            bare = word.rstrip('.:;,')
+            if not bare or (title and bare in _SENTENCE_OPENERS):
+                break
+            if not (bare[0].isupper() or bare in _TITLE_CONNECTORS):
+                break
+            title.append(bare)
+            if bare != word:
+                break
+        
+        # A trailing connector ("Payment of") belongs to the sentence, not the title
+        while title and title[-1] in _TITLE_CONNECTORS:
+            title.pop()
+        
+        prefix = f"Section {number}" if match.group('section') else number
+        return level, ' '.join([prefix] + title)
+    
+    def _clauses(self, text: str, stack: List[Tuple[int, str]]) -> List[Tuple[int, int, str]]:
+        """Cut text at headings into (start, end, section_path), updating stack in place"""
+        clauses = []
+        start = 0
+        
+        for match in _HEADING.finditer(text):
+            if text[start:match.start()].strip():
+                clauses.append((start, match.start(), ' > '.join(label for _, label in stack)))
+            
+            level, label = self._heading(match, text)
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, label))
+            start = match.start()
+        
+        if text[start:].strip():
+            clauses.append((start, len(text), ' > '.join(label for _, label in stack)))
+        
+        # Trim surrounding spaces so spans start and end on text
+        trimmed = []
+        for clause_start, clause_end, path in clauses:
+            segment = text[clause_start:clause_end]
+            clause_start += len(segment) - len(segment.lstrip())
+            clause_end -= len(segment) - len(segment.rstrip())
+            trimmed.append((clause_start, clause_end, path))
+        return trimmed
+    
+    def _pack(self, text: str, clauses: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+        """Merge small clauses and sub-split oversized ones"""
+        packed = []
+        current = None  # (start, end, section_path, length of the clause that set the path)
+        
+        for start, end, path in clauses:
+            if end - start > self.max_chars:
+                if current is not None:
+                    packed.append(current[:3])
+                    current = None
+                for sub_start, sub_end in self._sub_splitter.split_text(text[start:end]):
+                    packed.append((start + sub_start, start + sub_end, path))
+                continue
+            
+            if current is not None:
+                current_small = current[1] - current[0] < self.min_chars
+                if (current_small or end - start < self.min_chars) and end - current[0] <= self.max_chars:
+                    # A merged chunk takes the section path of its longest clause, so a
+                    # bare heading merged into its first clause reports that clause
+                    if end - start > current[3]:
+                        current = (current[0], end, path, end - start)
+                    else:
+                        current = (current[0], end, current[2], current[3])
+                    continue
+                packed.append(current[:3])
+            
+            current = (start, end, path, end - start)
+        
+        if current is not None:
+            packed.append(current[:3])
+        
+        return packed
+    
+    def split_text(self, text: str) -> List[Tuple[int, int]]:
+        """Return (start, end) clause spans over a single text"""
+        return [(start, end) for start, end, _ in self._pack(text, self._clauses(text, []))]
+    
+    def split_pages(self, pages: List[Document]) -> ChunkSpans:
+        """Split pages into clause spans, recording each chunk's section_path"""
+        chunks = ChunkSpans(pages)
+        stack = []
+        source = None
+        
+        for page_id, page in enumerate(pages):
+            if page.metadata.get('source') != source:
+                source = page.metadata.get('source')
+                stack = []
+            
+            text = page.page_content
+            for start, end, path in self._pack(text, self._clauses(text, stack)):
+                chunks.append(page_id, start, end)
+                chunks.set_extra_metadata(len(chunks) - 1, {'section_path': path})
+        
+        return chunks
+
+# Example usage
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    sample_page = Document(
+        page_content=("1. Term. This Agreement starts on the Effective Date. " * 20).strip(),
+        metadata={"source": "sample_contract.pdf", "page_number": 1, "category": "contract"}
+    )
+    
+    chunker = SpanChunker(chunk_size=200, chunk_overlap=40)
+    chunks = chunker.split_pages([sample_page])
+    
+    print(f"Created {len(chunks)} chunk spans")
+    for index in range(min(3, len(chunks))):
+        print(f"  Chunk {index}: page {chunks.page_ids[index]}, "
+              f"chars {chunks.starts[index]}-{chunks.ends[index]}: {chunks.text(index)[:60]}...")
+    
+    token_chunks = TokenChunker(target_tokens=60, overlap_tokens=10).split_pages([sample_page])
+    print(f"Created {len(token_chunks)} token-budgeted chunk spans: "
+          f"{[estimate_tokens(text) for text in token_chunks.texts()]} estimated tokens")
+    
+    contract_page = Document(
+        page_content=("ARTICLE V TERMINATION 5.1 Termination for Convenience. Either party may terminate "
+                      "this Agreement on 30 days notice. 5.2 Termination for Cause. Either party may "
+                      "terminate immediately upon a material breach."),
+        metadata={"source": "sample_contract.pdf", "page_number": 2}
+    )
+    clause_chunks = ClauseChunker(min_chars=60, max_chars=400, chunk_overlap=40).split_pages([contract_page])
+    for metadata in clause_chunks.metadatas():
+        print(f"  Clause chunk {metadata['chunk_id']}: {metadata['section_path']}")
\ No newline at end of file
@@ -0,0 +1,101 @@
+# text_normalizer.py - Compiled Text Normalization for Legal Documents
+
+import re
+
+# Whitespace runs collapse to one space and each PDF artifact character becomes
+# one space, in a single scan. Both alternatives share the same replacement.
+_WHITESPACE_OR_ARTIFACT = re.compile(r'\s+|[^\w\s.,;:!?()"\'-]')
+
+# Runs of three dots are already '...', so only longer runs need rewriting
+_LONG_ELLIPSIS = re.compile(r'\.{4,}')
+
+# After the first pass the only whitespace left is ' '
+_SCATTERED_LETTERS = re.compile(r'\b(\w) +(\w)\b')
+
+def normalize_text(text: str) -> str:
+    """
+    Clean page text for legal documents
+    
+    Produces exactly the output of reference_normalize_text in two regex passes
+    (three when the page contains long dot leaders) instead of six.
+    """
+    text = _WHITESPACE_OR_ARTIFACT.sub(' ', text)
+    
+    if '....' in text:
+        text = _LONG_ELLIPSIS.sub('...', text)
+    
+    # Fix common OCR issues in legal documents (scattered letters)
+    text = _SCATTERED_LETTERS.sub(r'\1\2', text)
+    
+    # The original newline passes are no-ops: every newline is gone after the first pass
+    return text.strip()
+
+def reference_normalize_text(text: str) -> str:
+    """Original six-pass implementation, kept as the golden reference for normalize_text"""
+    
+    # Normalize whitespace
+    text = re.sub(r'\s+', ' ', text)
+    
+    # Remove excessive punctuation
+    text = re.sub(r'[.]{3,}', '...', text)
+    
+    # Clean up common PDF artifacts and special characters
+    text = re.sub(r'[^\w\s.,;:!?()"\'-]', ' ', text)
+    
+    # Fix common OCR issues in legal documents
+    text = re.sub(r'\b(\w)\s+(\w)\b', r'\1\2', text)  # Fix scattered letters
+    
+    # Normalize legal document formatting
+    text = re.sub(r'\n+', '\n', text)  # Multiple newlines to single
+    text = re.sub(r'\s*\n\s*', '\n', text)  # Clean up newline spacing
+    
+    return text.strip()
+
+# Golden-output check and micro-benchmark
+if __name__ == "__main__":
+    import glob
+    import random
+    import timeit
+    from pypdf import PdfReader
+    
+    from config import Config
+    
+    print("🧹 Text Normalizer - Golden Output Check and Benchmark")
+    print("=" * 60)
+    
+    # Raw page text from the sample PDFs
+    pages = []
+    for pdf_path in sorted(glob.glob(f"{Config.UPLOAD_FOLDER}/*.pdf")):
+        for page in PdfReader(pdf_path).pages:
+            pages.append(page.extract_text() or "")
+    
+    print(f"Loaded {len(pages)} pages from {Config.UPLOAD_FOLDER}/")
+    
+    # Hand-picked edge cases plus random strings over an adversarial alphabet
+    samples = list(pages) + [
+        "", "   ", "a b c d e", "I am a b", "Section 4 . 2 ..... end....",
+        "a \n§ b", "x\t\ty\x0b\x1c z", "non breaking　space",
+        "café – naïve “quotes” ‘single’ …", "A.\n\n\nB  ...  .... ....."
+    ]
+    alphabet = list("ab c.\n\t\x0b\x1c  é_9§-'\"(),;:!?…　x1 ") + ['...', '....']
+    rng = random.Random(42)
+    for _ in range(20000):
+        samples.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))))
+    
+    mismatches = [s for s in samples if normalize_text(s) != reference_normalize_text(s)]
+    if mismatches:
+        print(f"❌ {len(mismatches)} of {len(samples)} samples differ, first: {mismatches[0]!r}")
+    else:
+        print(f"✅ Identical output on {len(samples)} samples")
+    
+    # Benchmark on the sample pages repeated into a long document
+    corpus = " ".join(pages) * 50
+    runs = 5
+    
+    reference_time = min(timeit.repeat(lambda: reference_normalize_text(corpus), number=runs, repeat=3)) / runs
+    normalized_time = min(timeit.repeat(lambda: normalize_text(corpus), number=runs, repeat=3)) / runs
+    
+    print(f"\nBenchmark over {len(corpus):,} characters:")
+    print(f"  reference_normalize_text: {reference_time * 1000:.2f} ms")
+    print(f"  normalize_text:           {normalized_time * 1000:.2f} ms")
+    print(f"  Speedup:                  {reference_time / normalized_time:.2f}x")
\ No newline at end of file